@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+A fake AWS Lambda invoke endpoint to benchmark the LambdaLoadTest orchestrator
+without AWS. Every invocation waits for the configured latency and then returns a
+synthetic LocustLoadTest result of roughly the configured size, in the same format
+as the Lambda function in lambda_locust.py.
+
+Prints the port it is listening on as the first line of stdout. Point a boto3 Lambda
+client at it with endpoint_url.
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+import sys
+import json
+import time
+import random
+import argparse
+import gevent
+from gevent.server import StreamServer
+
+RESPONSE_HEADERS = (
+    "HTTP/1.1 200 OK\r\n"
+    "Content-Type: application/json\r\n"
+    "X-Amz-Executed-Version: $LATEST\r\n"
+    "Content-Length: {0}\r\n"
+    "Connection: keep-alive\r\n"
+    "\r\n"
+)
+
+
+def synthetic_requests(payload_size):
+    """
+    Returns per task statistics with enough tasks to make a result of about
+    payload_size bytes
+    """
+    requests = {}
+    size = 0
+    while size < payload_size or not requests:
+        name = "/item/{0}".format(len(requests))
+        response_times = {
+            str(r_time): random.randint(1, 100) for r_time in range(10, 500, 10)
+        }
+        task = {
+            "request_type": "GET",
+            "num_requests": sum(response_times.values()),
+            "num_failures": 0,
+            "min_response_time": 10,
+            "median_response_time": 250,
+            "avg_response_time": 250,
+            "max_response_time": 490,
+            "response_times": response_times,
+            "response_time_percentiles": {
+                "55": 270,
+                "65": 320,
+                "75": 370,
+                "85": 420,
+                "95": 470,
+            },
+            "total_rps": 10.0,
+            "total_rpm": 600.0,
+        }
+        requests["GET_" + name] = task
+        size += len(json.dumps(task))
+    return requests
+
+
+def create_result(requests, latency, received_time):
+    num_requests = sum(task["num_requests"] for task in requests.values())
+    result = {
+        "requests": requests,
+        "failures": {},
+        "num_requests": num_requests,
+        "num_requests_fail": 0,
+        "start_time": received_time,
+        "end_time": received_time + latency,
+        "remaining_time": 300000 - int(latency * 1000),
+        "memory_limit": 128,
+        "aws_request_id": "fake",
+        "fake_received_time": received_time,
+        "fake_sent_time": time.time(),
+    }
+    # the Lambda function returns the results as a JSON string
+    return json.dumps(json.dumps(result)).encode("utf-8")
+
+
+def create_handler(latency, jitter, payload_size):
+    requests = synthetic_requests(payload_size)
+
+    def handle(sock, address):
+        """
+        Answers every invocation on a keep-alive connection after the latency.
+        Request bodies are read and discarded using the Content-Length header.
+        """
+        buffer = b""
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            buffer += data
+            while b"\r\n\r\n" in buffer:
+                received_time = time.time()
+                headers, _, buffer = buffer.partition(b"\r\n\r\n")
+                content_length = 0
+                for line in headers.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        content_length = int(value)
+                while len(buffer) < content_length:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    buffer += data
+                buffer = buffer[content_length:]
+
+                invocation_latency = max(0, latency + random.uniform(-jitter, jitter))
+                gevent.sleep(invocation_latency)
+                body = create_result(requests, invocation_latency, received_time)
+                sock.sendall(RESPONSE_HEADERS.format(len(body)).encode("utf-8") + body)
+        sock.close()
+
+    return handle
+
+
+def parse_arguments():
+    p = argparse.ArgumentParser(description="Runs a fake AWS Lambda invoke endpoint")
+    p.add_argument("--host", help="Address to listen on", default="127.0.0.1")
+    p.add_argument("--port", help="Port to listen on", default=0, type=int)
+    p.add_argument(
+        "--latency", help="Seconds each invocation takes", default=5.0, type=float
+    )
+    p.add_argument(
+        "--jitter",
+        help="Maximum random seconds added to or removed from the latency",
+        default=0.0,
+        type=float,
+    )
+    p.add_argument(
+        "--payload_size",
+        help="Approximate size of each result in bytes",
+        default=10000,
+        type=int,
+    )
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    server = StreamServer(
+        (args.host, args.port),
+        create_handler(args.latency, args.jitter, args.payload_size),
+        backlog=8192,
+    )
+    server.start()
+    print(server.server_port)
+    sys.stdout.flush()
+    server.serve_forever()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Measures how efficiently LocustLoadTest generates load against a fast local target
+server, without any network access.
+
+Each combination of user class and number of users is run in a fresh process so the
+memory usage of each run can be measured. Results are appended as JSON lines to the
+output file so runs before and after a change (or a Locust upgrade) can be compared.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+USER_CLASSES = ["HttpUser", "FastHttpUser"]
+
+
+def print_stat(user_class, num_users, rps, cpu, rps_per_core, overhead, rss, change):
+    return "%-13s %6s %10s %6s %13s %13s %9s %8s" % (
+        user_class,
+        num_users,
+        rps,
+        cpu,
+        rps_per_core,
+        overhead,
+        rss,
+        change,
+    )
+
+
+def parse_arguments():
+    p = argparse.ArgumentParser(
+        description="Benchmarks LocustLoadTest load generation against a local server"
+    )
+    p.add_argument(
+        "-u",
+        "--users",
+        help="Comma separated list of user counts to benchmark",
+        default="1,10,50,100",
+    )
+    p.add_argument(
+        "-c",
+        "--user_classes",
+        help="Comma separated list of user classes to benchmark",
+        default=",".join(USER_CLASSES),
+    )
+    p.add_argument(
+        "-t", "--run_time", help="Run time of each benchmark run", default="10s"
+    )
+    p.add_argument(
+        "-o",
+        "--output",
+        help="File to append JSON line results to",
+        default=os.path.join(BENCHMARK_DIR, "loadtest_benchmark.jsonl"),
+    )
+    p.add_argument("-b", "--baseline", help="JSON line results file to compare against")
+    p.add_argument("--run_one", help=argparse.SUPPRESS, action="store_true")
+    p.add_argument("--user_class", help=argparse.SUPPRESS)
+    p.add_argument("--num_users", help=argparse.SUPPRESS, type=int)
+    p.add_argument("--host", help=argparse.SUPPRESS)
+    return p.parse_args()
+
+
+def get_peak_rss_mb():
+    import resource
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak_rss / 1024.0 / 1024.0
+    return peak_rss / 1024.0
+
+
+def get_git_commit():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=REPO_DIR,
+                stderr=subprocess.DEVNULL,
+            )
+            .decode("utf-8")
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_one(user_class_name, num_users, run_time, host):
+    """
+    Runs a single benchmark in this process and returns the measurements in a dict
+    """
+    sys.path.insert(0, REPO_DIR)
+
+    import locust
+    from locust import HttpUser, FastHttpUser, constant, task
+    from invokust import create_settings, LocustLoadTest
+
+    class BenchmarkHttpUser(HttpUser):
+        wait_time = constant(0)
+
+        @task
+        def get_root(self):
+            self.client.get("/")
+
+    class BenchmarkFastHttpUser(FastHttpUser):
+        wait_time = constant(0)
+
+        @task
+        def get_root(self):
+            self.client.get("/")
+
+    user_class = {
+        "HttpUser": BenchmarkHttpUser,
+        "FastHttpUser": BenchmarkFastHttpUser,
+    }[user_class_name]
+
+    settings = create_settings(
+        classes=[user_class],
+        host=host,
+        num_users=num_users,
+        spawn_rate=num_users,
+        run_time=run_time,
+    )
+    loadtest = LocustLoadTest(settings)
+    loadtest.run()
+    stats = loadtest.stats()
+
+    duration = stats["end_time"] - stats["start_time"]
+    num_requests = stats["num_requests"]
+    cpu_percent = stats["generator"]["cpu_percent"]
+    cpu_seconds = cpu_percent / 100.0 * duration
+
+    return {
+        "timestamp": time.time(),
+        "git_commit": get_git_commit(),
+        "locust_version": locust.__version__,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "user_class": user_class_name,
+        "num_users": num_users,
+        "run_time": run_time,
+        "duration": duration,
+        "num_requests": num_requests,
+        "num_requests_fail": stats["num_requests_fail"],
+        "rps": num_requests / duration if duration else 0,
+        "cpu_percent": cpu_percent,
+        "rps_per_core": num_requests / cpu_seconds if cpu_seconds else 0,
+        "client_overhead_us": (
+            cpu_seconds / num_requests * 1000000 if num_requests else 0
+        ),
+        "peak_rss_mb": get_peak_rss_mb(),
+        "avg_response_time": (
+            stats["requests"]["GET_/"]["avg_response_time"] if num_requests else None
+        ),
+        "generator_saturated": stats["generator"]["saturated"],
+    }
+
+
+def start_target_server():
+    """
+    Starts the local target server in a new process and returns the process and host
+    """
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARK_DIR, "target_server.py")],
+        stdout=subprocess.PIPE,
+    )
+    port = int(process.stdout.readline())
+    return process, "http://127.0.0.1:{0}".format(port)
+
+
+def run_benchmark_process(user_class, num_users, run_time, host):
+    """
+    Runs a single benchmark in a new process and returns the measurements in a dict
+    """
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--run_one",
+            "--user_class",
+            user_class,
+            "--num_users",
+            str(num_users),
+            "--run_time",
+            run_time,
+            "--host",
+            host,
+        ],
+        stderr=subprocess.DEVNULL,
+    )
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def load_baseline(path):
+    baseline = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                baseline[(record["user_class"], record["num_users"])] = record
+    return baseline
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    if args.run_one:
+        print(
+            json.dumps(
+                run_one(args.user_class, args.num_users, args.run_time, args.host)
+            )
+        )
+        sys.exit(0)
+
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    server, host = start_target_server()
+
+    print(
+        print_stat(
+            "USER CLASS",
+            "USERS",
+            "REQS/SEC",
+            "CPU%",
+            "REQS/SEC/CORE",
+            "OVERHEAD(us)",
+            "RSS(MB)",
+            "CHANGE",
+        )
+    )
+    try:
+        with open(args.output, "a") as output:
+            for user_class in args.user_classes.split(","):
+                for num_users in [int(u) for u in args.users.split(",")]:
+                    record = run_benchmark_process(
+                        user_class, num_users, args.run_time, host
+                    )
+                    output.write(json.dumps(record) + "\n")
+                    output.flush()
+
+                    change = ""
+                    previous = baseline.get((user_class, num_users))
+                    if previous and previous["rps_per_core"]:
+                        change = "{0:+.1f}%".format(
+                            (record["rps_per_core"] / previous["rps_per_core"] - 1)
+                            * 100
+                        )
+
+                    print(
+                        print_stat(
+                            user_class,
+                            num_users,
+                            round(record["rps"], 1),
+                            round(record["cpu_percent"]),
+                            round(record["rps_per_core"], 1),
+                            round(record["client_overhead_us"], 1),
+                            round(record["peak_rss_mb"], 1),
+                            change,
+                        )
+                    )
+    finally:
+        server.terminate()
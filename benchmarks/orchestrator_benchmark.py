@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Measures the overhead of the LambdaLoadTest orchestrator when driving many
+concurrent Lambda invocations, using a fake Lambda invoke endpoint
+(benchmarks/fake_lambda_server.py) instead of AWS.
+
+Each number of concurrent slots (threads) is run in a fresh process so the memory
+usage of each run can be measured. Results are appended as JSON lines to the output
+file so runs before and after a change can be compared.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import threading
+import subprocess
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+
+sys.path.insert(0, BENCHMARK_DIR)
+from loadtest_benchmark import get_git_commit, get_peak_rss_mb  # noqa: E402
+
+
+def print_stat(
+    slots, invocations, cpu, rss, dispatch_p50, dispatch_p99, return_p99, lag, lock
+):
+    return "%6s %14s %6s %9s %13s %13s %12s %12s %13s" % (
+        slots,
+        invocations,
+        cpu,
+        rss,
+        dispatch_p50,
+        dispatch_p99,
+        return_p99,
+        lag,
+        lock,
+    )
+
+
+def parse_arguments():
+    p = argparse.ArgumentParser(
+        description="Benchmarks the LambdaLoadTest orchestrator against a fake Lambda endpoint"
+    )
+    p.add_argument(
+        "-s",
+        "--slots",
+        help="Comma separated list of concurrent slot (thread) counts to benchmark",
+        default="10,100,1000,5000",
+    )
+    p.add_argument(
+        "-t",
+        "--run_time",
+        help="Seconds to run each benchmark for before ramping down",
+        default=30,
+        type=int,
+    )
+    p.add_argument(
+        "-l",
+        "--latency",
+        help="Seconds each fake invocation takes",
+        default=5.0,
+        type=float,
+    )
+    p.add_argument(
+        "-p",
+        "--payload_size",
+        help="Approximate size of each fake result in bytes",
+        default=10000,
+        type=int,
+    )
+    p.add_argument(
+        "-d",
+        "--print_stats_delay",
+        help="Seconds between iterations of the statistics loop",
+        default=3,
+        type=float,
+    )
+    p.add_argument(
+        "-o",
+        "--output",
+        help="File to append JSON line results to",
+        default=os.path.join(BENCHMARK_DIR, "orchestrator_benchmark.jsonl"),
+    )
+    p.add_argument("-b", "--baseline", help="JSON line results file to compare against")
+    p.add_argument("--run_one", help=argparse.SUPPRESS, action="store_true")
+    p.add_argument("--num_slots", help=argparse.SUPPRESS, type=int)
+    p.add_argument("--endpoint_url", help=argparse.SUPPRESS)
+    return p.parse_args()
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent))]
+
+
+class TimedLock(object):
+    """
+    A lock that adds up the time spent waiting to acquire it
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wait_time = 0
+        self.max_wait_time = 0
+        self.acquisitions = 0
+
+    def acquire(self, *args, **kwargs):
+        start_time = time.perf_counter()
+        acquired = self.lock.acquire(*args, **kwargs)
+        wait_time = time.perf_counter() - start_time
+        if acquired:
+            # updated while holding the lock
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+            self.acquisitions += 1
+        return acquired
+
+    def release(self):
+        self.lock.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, *args):
+        self.release()
+
+
+def run_one(num_slots, run_time, endpoint_url, print_stats_delay):
+    """
+    Runs a single benchmark in this process and returns the measurements in a dict
+    """
+    sys.path.insert(0, REPO_DIR)
+
+    import logging
+    import resource
+
+    # the default Lambda client is created on import but not used
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+
+    # invokust imports Locust, which monkey patches ssl before boto3 imports it
+    from invokust.aws_lambda import LambdaLoadTest
+    from boto3.session import Session
+    from botocore.client import Config
+
+    # log like invokr.py does, the benchmark process discards stderr
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)-6s %(threadName)-11s %(message)s",
+    )
+
+    lambda_client = Session(
+        aws_access_key_id="fake",
+        aws_secret_access_key="fake",
+        region_name="eu-west-1",
+    ).client(
+        "lambda",
+        endpoint_url=endpoint_url,
+        config=Config(
+            max_pool_connections=num_slots,
+            retries={"max_attempts": 0},
+            read_timeout=310,
+        ),
+    )
+
+    dispatch_latencies = []
+    return_latencies = []
+    call_times = threading.local()
+
+    class TimedLambdaClient(object):
+        """
+        Records when each thread calls invoke, to measure the dispatch latency
+        """
+
+        def invoke(self, **kwargs):
+            call_times.start = time.time()
+            return lambda_client.invoke(**kwargs)
+
+    class BenchmarkLambdaLoadTest(LambdaLoadTest):
+        """
+        Records the time between iterations of the statistics loop
+        """
+
+        def __init__(self, *args, **kwargs):
+            super(BenchmarkLambdaLoadTest, self).__init__(*args, **kwargs)
+            self.lock = TimedLock()
+            self.loop_times = []
+
+        def get_stats(self):
+            self.loop_times.append(time.time())
+            return super(BenchmarkLambdaLoadTest, self).get_stats()
+
+    def record_latencies(results):
+        # called in the thread that invoked the function, after decoding the result
+        dispatch_latencies.append(results["fake_received_time"] - call_times.start)
+        return_latencies.append(time.time() - results["fake_sent_time"])
+
+    load_test = BenchmarkLambdaLoadTest(
+        "fake",
+        num_slots,
+        0,
+        run_time,
+        {"num_users": 1, "run_time": "{0}s".format(run_time)},
+        lambda_client=TimedLambdaClient(),
+        print_stats_delay=print_stats_delay,
+        # starts all threads at once instead of one per statistics loop
+        start_lead_time=1,
+    )
+    load_test.add_result_handler(record_latencies)
+
+    start_time = time.time()
+    start_usage = resource.getrusage(resource.RUSAGE_SELF)
+    load_test.run()
+    end_usage = resource.getrusage(resource.RUSAGE_SELF)
+    duration = time.time() - start_time
+    cpu_seconds = (end_usage.ru_utime - start_usage.ru_utime) + (
+        end_usage.ru_stime - start_usage.ru_stime
+    )
+
+    loop_lags = [
+        max(0, later - earlier - print_stats_delay)
+        for earlier, later in zip(load_test.loop_times, load_test.loop_times[1:])
+    ]
+    summary_stats = load_test.get_summary_stats()
+
+    return {
+        "timestamp": time.time(),
+        "git_commit": get_git_commit(),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "num_slots": num_slots,
+        "run_time": run_time,
+        "print_stats_delay": print_stats_delay,
+        "duration": duration,
+        "invocations": summary_stats["lambda_invocation_count"],
+        "invocation_error_ratio": summary_stats["invocation_error_ratio"],
+        "invocations_per_second": (
+            summary_stats["lambda_invocation_count"] / duration if duration else 0
+        ),
+        "cpu_percent": cpu_seconds / duration * 100 if duration else 0,
+        "cpu_us_per_invocation": (
+            cpu_seconds / summary_stats["lambda_invocation_count"] * 1000000
+            if summary_stats["lambda_invocation_count"]
+            else 0
+        ),
+        "peak_rss_mb": get_peak_rss_mb(),
+        "dispatch_latency_p50_ms": percentile(dispatch_latencies, 0.5) * 1000,
+        "dispatch_latency_p99_ms": percentile(dispatch_latencies, 0.99) * 1000,
+        "return_latency_p50_ms": percentile(return_latencies, 0.5) * 1000,
+        "return_latency_p99_ms": percentile(return_latencies, 0.99) * 1000,
+        "stats_loop_lag_max_ms": max(loop_lags, default=0) * 1000,
+        "stats_loop_lag_avg_ms": (
+            sum(loop_lags) / len(loop_lags) * 1000 if loop_lags else 0
+        ),
+        "lock_wait_total_ms": load_test.lock.wait_time * 1000,
+        "lock_wait_max_ms": load_test.lock.max_wait_time * 1000,
+        "lock_acquisitions": load_test.lock.acquisitions,
+    }
+
+
+def start_fake_lambda_server(latency, payload_size):
+    """
+    Starts the fake Lambda endpoint in a new process and returns the process and URL
+    """
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(BENCHMARK_DIR, "fake_lambda_server.py"),
+            "--latency",
+            str(latency),
+            "--payload_size",
+            str(payload_size),
+        ],
+        stdout=subprocess.PIPE,
+    )
+    port = int(process.stdout.readline())
+    return process, "http://127.0.0.1:{0}".format(port)
+
+
+def run_benchmark_process(num_slots, run_time, endpoint_url, print_stats_delay):
+    """
+    Runs a single benchmark in a new process and returns the measurements in a dict
+    """
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--run_one",
+            "--num_slots",
+            str(num_slots),
+            "--run_time",
+            str(run_time),
+            "--endpoint_url",
+            endpoint_url,
+            "--print_stats_delay",
+            str(print_stats_delay),
+        ],
+        stderr=subprocess.DEVNULL,
+    )
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def load_baseline(path):
+    baseline = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                baseline[record["num_slots"]] = record
+    return baseline
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    if args.run_one:
+        print(
+            json.dumps(
+                run_one(
+                    args.num_slots,
+                    args.run_time,
+                    args.endpoint_url,
+                    args.print_stats_delay,
+                )
+            )
+        )
+        sys.exit(0)
+
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    server, endpoint_url = start_fake_lambda_server(args.latency, args.payload_size)
+
+    print(
+        print_stat(
+            "SLOTS",
+            "INVOCATIONS/S",
+            "CPU%",
+            "RSS(MB)",
+            "DISPATCH P50",
+            "DISPATCH P99",
+            "RETURN P99",
+            "LOOP LAG",
+            "LOCK WAIT",
+        )
+    )
+    try:
+        with open(args.output, "a") as output:
+            for num_slots in [int(s) for s in args.slots.split(",")]:
+                record = run_benchmark_process(
+                    num_slots, args.run_time, endpoint_url, args.print_stats_delay
+                )
+                record["latency"] = args.latency
+                record["payload_size"] = args.payload_size
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+
+                previous = baseline.get(num_slots)
+                print(
+                    print_stat(
+                        num_slots,
+                        round(record["invocations_per_second"], 1),
+                        round(record["cpu_percent"]),
+                        round(record["peak_rss_mb"], 1),
+                        round(record["dispatch_latency_p50_ms"], 1),
+                        round(record["dispatch_latency_p99_ms"], 1),
+                        round(record["return_latency_p99_ms"], 1),
+                        round(record["stats_loop_lag_max_ms"], 1),
+                        round(record["lock_wait_total_ms"], 1),
+                    )
+                )
+                if previous and previous["cpu_us_per_invocation"]:
+                    print(
+                        "       CPU per invocation: {0:.0f}us ({1:+.1f}% against baseline)".format(
+                            record["cpu_us_per_invocation"],
+                            (
+                                record["cpu_us_per_invocation"]
+                                / previous["cpu_us_per_invocation"]
+                                - 1
+                            )
+                            * 100,
+                        )
+                    )
+    finally:
+        server.terminate()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+A deliberately fast HTTP server to use as a local load test target. It returns a
+small fixed response for every request so that benchmarks measure the load
+generator and not the target.
+
+Prints the port it is listening on as the first line of stdout.
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+import sys
+import argparse
+from gevent.server import StreamServer
+
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: text/plain\r\n"
+    b"Content-Length: 2\r\n"
+    b"Connection: keep-alive\r\n"
+    b"\r\n"
+    b"ok"
+)
+
+
+def handle(sock, address):
+    """
+    Answers every request on a keep-alive connection with a single write. Request
+    bodies are read and discarded using the Content-Length header.
+    """
+    buffer = b""
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            break
+        buffer += data
+        while b"\r\n\r\n" in buffer:
+            headers, _, buffer = buffer.partition(b"\r\n\r\n")
+            content_length = 0
+            for line in headers.split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    content_length = int(value)
+            while len(buffer) < content_length:
+                data = sock.recv(65536)
+                if not data:
+                    return
+                buffer += data
+            buffer = buffer[content_length:]
+            sock.sendall(RESPONSE)
+    sock.close()
+
+
+def parse_arguments():
+    p = argparse.ArgumentParser(description="Runs a fast local HTTP target server")
+    p.add_argument("--host", help="Address to listen on", default="127.0.0.1")
+    p.add_argument("--port", help="Port to listen on", default=0, type=int)
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    server = StreamServer((args.host, args.port), handle)
+    server.start()
+    print(server.server_port)
+    sys.stdout.flush()
+    server.serve_forever()
@@ -4,7 +4,19 @@ import argparse
 import logging
 import sys
 import json
-from invokust.aws_lambda import LambdaLoadTest, results_aggregator
+import threading
+from invokust.aws_lambda import (
+    InvocationTracer,
+    LambdaLoadTest,
+    RollingStats,
+    calibrate_users,
+    capacity_search,
+    fan_out_load_test,
+    finalize_aggregate,
+    memory_sweep,
+    partial_aggregate,
+    results_aggregator_by_target,
+)
 
 
 def print_stat(type, name, req_count, median, avg, min, max, rps):
@@ -24,7 +36,7 @@ def parse_arguments():
     p = argparse.ArgumentParser(
         description="Runs a Locust load tests on AWS Lambda in parallel"
     )
-    p.add_argument("-n", "--function_name", help="Lambda function name", required=True)
+    p.add_argument("-n", "--function_name", help="Lambda function name")
     p.add_argument("-f", "--locust_file", help="Locust file", required=True)
     p.add_argument("-o", "--locust_host", help="Locust host", required=True)
     p.add_argument(
@@ -39,21 +51,235 @@ def parse_arguments():
     p.add_argument(
         "-l", "--time_limit", help="Time limit for run time (seconds)", type=int
     )
-    return p.parse_args()
+    p.add_argument(
+        "--results_file", help="File to write the aggregated results to as JSON"
+    )
+    p.add_argument(
+        "--partial_results_file",
+        help="File to write a partial aggregate to as JSON, to merge with the results of other hosts",
+    )
+    p.add_argument(
+        "--trace_file",
+        help="File to write a timeline of the invocations of each thread to, in Chrome trace format",
+    )
+    p.add_argument(
+        "--results_sink",
+        help="Invoke the function asynchronously and collect its results from this sink, "
+        "an S3 URL (s3://bucket/prefix/) or a directory",
+    )
+    p.add_argument(
+        "--checkpoint_sink",
+        help="Sink that invocations write checkpoints of their statistics to, an S3 URL "
+        "(s3://bucket/prefix/) or a directory. The statistics of failed invocations are "
+        "recovered from their checkpoints",
+    )
+    p.add_argument(
+        "--checkpoint_interval",
+        help="Seconds between checkpoints with --checkpoint_sink",
+        default=30,
+        type=int,
+    )
+    p.add_argument(
+        "--targets_file",
+        help="JSON file with a list of Lambda functions/regions to spread the load across, "
+        'e.g. [{"function_name": "lambda_locust", "region": "eu-west-1", "weight": 2, "max_threads": 100}]',
+    )
+    p.add_argument(
+        "--sweep",
+        help="Comma separated list of memory sizes (MB) and/or aliases to run the load test against, one after another",
+    )
+    p.add_argument(
+        "--handoff_overlap",
+        help="Start the next invocation of each thread this many seconds before the current one ends, "
+        "so the load doesn't dip between invocations",
+        default=0,
+        type=int,
+    )
+    p.add_argument(
+        "--start_lead_time",
+        help="Start all threads at once and all users this many seconds later, for spike tests",
+        default=0,
+        type=int,
+    )
+    p.add_argument(
+        "--coordinators",
+        help="Run the threads from this many coordinator invocations of the Lambda function "
+        "instead of from this machine, for very large load tests",
+        type=int,
+    )
+    p.add_argument(
+        "--coordinator_function_name",
+        help="Lambda function that runs the coordinators, by default --function_name",
+    )
+    p.add_argument(
+        "--arrival_rate",
+        help="Requests (tasks) per second to start across all threads regardless of response times, "
+        "instead of running --locust_users users per thread",
+        type=float,
+    )
+    p.add_argument(
+        "--max_in_flight",
+        help="Maximum concurrently running tasks per thread with --arrival_rate",
+        default=100,
+        type=int,
+    )
+    p.add_argument(
+        "--capacity",
+        help="Comma separated list of load levels to step through until the SLOs are violated",
+    )
+    p.add_argument(
+        "--capacity_mode",
+        help="Load level of --capacity: number of threads or target requests per minute",
+        choices=["threads", "rpm"],
+        default="threads",
+    )
+    p.add_argument(
+        "--slo_p95", help="Highest allowed p95 response time (ms)", type=float
+    )
+    p.add_argument(
+        "--slo_p99", help="Highest allowed p99 response time (ms)", type=float
+    )
+    p.add_argument(
+        "--slo_failure_ratio", help="Highest allowed request failure ratio", type=float
+    )
+    p.add_argument(
+        "--binary_search_steps",
+        help="Extra load tests to narrow down the capacity between the last passing and first failing level",
+        default=0,
+        type=int,
+    )
+    p.add_argument(
+        "--calibrate",
+        help="Find the number of users per invocation with short probe invocations before the load test",
+        action="store_true",
+    )
+    p.add_argument(
+        "--calibration_users",
+        help="Comma separated list of numbers of users to probe with --calibrate",
+    )
+    p.add_argument(
+        "--probe_time",
+        help="Seconds each --calibrate probe invocation runs for",
+        default=20,
+        type=int,
+    )
+    p.add_argument(
+        "--target_rpm",
+        help="Total requests per minute to reach, sets the number of threads with --calibrate",
+        type=float,
+    )
+    p.add_argument(
+        "--reset_stats",
+        help="Reset the statistics of each invocation once all users are spawned",
+        action="store_true",
+    )
+    p.add_argument(
+        "--warmup_time",
+        help="Seconds at the start of each invocation to report separately from the steady state",
+        default=0,
+        type=float,
+    )
+    p.add_argument(
+        "--dns_cache",
+        help="Resolve the target host once before each invocation's load test",
+        action="store_true",
+    )
+    p.add_argument(
+        "--warmup_connect",
+        help="Open a connection to the target host before each invocation's load test",
+        action="store_true",
+    )
+    p.add_argument(
+        "--template_names",
+        help="Replace IDs in request names with placeholders, e.g. /item/123 becomes /item/<n>",
+        action="store_true",
+    )
+    p.add_argument(
+        "--max_names",
+        help="Distinct request names each invocation records, further names are counted in an <other> entry (0 for no limit)",
+        type=int,
+    )
+    p.add_argument(
+        "--live",
+        help="Show a live console of per endpoint statistics",
+        action="store_true",
+    )
+    p.add_argument(
+        "--live_window",
+        help="Rolling window of the live console (seconds)",
+        default=180,
+        type=int,
+    )
+    args = p.parse_args()
+    if not args.function_name and not args.targets_file:
+        p.error("one of --function_name or --targets_file is required")
+    if args.sweep and not args.function_name:
+        p.error("--sweep requires --function_name")
+    if args.capacity and not args.time_limit:
+        p.error("--capacity requires --time_limit, the duration of each step")
+    if args.coordinators:
+        if not args.function_name:
+            p.error("--coordinators requires --function_name")
+        # the coordinators run plain load invocations of one function
+        for option in [
+            "arrival_rate",
+            "targets_file",
+            "results_sink",
+            "checkpoint_sink",
+            "trace_file",
+            "live",
+        ]:
+            if getattr(args, option):
+                p.error("--{0} can't be used with --coordinators".format(option))
+    return args
+
 
+def live_console(load_test_state, rolling_stats, stop_event, refresh_interval=2):
+    """
+    Redraws the rolling statistics on the terminal until stop_event is set
+    """
+    while not stop_event.is_set():
+        sys.stdout.write("\033[H\033[J")
+        sys.stdout.write(rolling_stats.render(load_test_state.get_stats()) + "\n")
+        sys.stdout.flush()
+        stop_event.wait(refresh_interval)
 
-def print_stats_exit(load_test_state):
+
+def print_stats_exit(
+    load_test_state, results_file=None, partial_results_file=None, trace_file=None
+):
+    logging.getLogger().setLevel(logging.INFO)
     summ_stats = load_test_state.get_summary_stats()
-    agg_results = results_aggregator(load_test_state.get_locust_results())
+    partial = partial_aggregate(load_test_state.get_locust_results())
+    agg_results = finalize_aggregate(partial)
     agg_results["request_fail_ratio"] = summ_stats["request_fail_ratio"]
     agg_results["invocation_error_ratio"] = summ_stats["invocation_error_ratio"]
+    agg_results["saturated_invocation_count"] = summ_stats["saturated_invocation_count"]
     agg_results["locust_settings"] = load_test_state.lambda_payload
     agg_results["lambda_function_name"] = load_test_state.lambda_function_name
     agg_results["threads"] = load_test_state.threads
     agg_results["ramp_time"] = load_test_state.ramp_time
     agg_results["time_limit"] = load_test_state.time_limit
+    if len(load_test_state.targets) > 1:
+        agg_results["targets"] = [t["name"] for t in load_test_state.targets]
+        agg_results["by_region"] = results_aggregator_by_target(
+            load_test_state.get_locust_results(), key="region"
+        )
+    if load_test_state.tracer:
+        agg_results["trace"] = load_test_state.tracer.stats()
     logging.info("Aggregated results: {0}".format(json.dumps(agg_results)))
 
+    if results_file:
+        with open(results_file, "w") as f:
+            json.dump(agg_results, f)
+
+    if partial_results_file:
+        with open(partial_results_file, "w") as f:
+            json.dump(partial, f)
+
+    if trace_file:
+        load_test_state.tracer.write(trace_file)
+
     logging.info(
         "\n============================================================"
         f"\nRamp up time: {agg_results['ramp_time']}s"
@@ -61,11 +287,69 @@ def print_stats_exit(load_test_state):
         f"\nThread count: {agg_results['threads']}"
         f"\nLambda invocation count: {agg_results['lambda_invocations']}"
         f"\nLambda invocation error ratio: {agg_results['invocation_error_ratio']}"
+        f"\nLambda invocations with saturated load generator: {agg_results['saturated_invocation_count']}"
         f"\nCumulative lambda execution time: {agg_results['total_lambda_execution_time']}ms"
         f"\nTotal requests sent: {agg_results['num_requests']}"
         f"\nTotal requests failed: {agg_results['num_requests_fail']}"
-        f"\nTotal request failure ratio: {agg_results['request_fail_ratio']}\n"
+        f"\nTotal request failure ratio: {agg_results['request_fail_ratio']}"
+        f"\nApproximate cost: ${agg_results['approximate_cost']:.6f}"
+        f"\nRequests per GB-second: {agg_results['requests_per_gb_second']:.2f}"
+        f"\nRequests per dollar: {agg_results['requests_per_dollar']:.0f}\n"
     )
+    if "arrivals" in agg_results:
+        logging.info(
+            "Arrivals: {arrivals}, dropped: {dropped}, late: {late}, "
+            "dropped ratio: {dropped_ratio:.4f}".format(**agg_results["arrivals"])
+        )
+    if "warmup" in agg_results:
+        logging.info(
+            "Warm-up (excluded): requests: {num_requests}, failed: {num_requests_fail}, "
+            "max resolve time: {resolve_time_max}ms, max connect time: {connect_time_max}ms".format(
+                **agg_results["warmup"]
+            )
+        )
+    if "recovered" in agg_results:
+        logging.warning(
+            "Recovered {num_requests} requests of {invocations} failed invocations "
+            "from {checkpoints} checkpoints".format(**agg_results["recovered"])
+        )
+    if agg_results.get("names", {}).get("overflow_requests"):
+        logging.warning(
+            "{overflow_requests} requests in {overflow_invocations} invocations exceeded "
+            "the limit of {max_names} request names, e.g. {overflow_examples}".format(
+                **agg_results["names"]
+            )
+        )
+    if "trace" in agg_results:
+        for phase, phase_stats in agg_results["trace"]["phases"].items():
+            if phase_stats["count"]:
+                logging.info(
+                    "Orchestrator {0}: count {1}, p50 {2}ms, p99 {3}ms, max {4}ms".format(
+                        phase,
+                        phase_stats["count"],
+                        phase_stats["percentiles"][50],
+                        phase_stats["percentiles"][99],
+                        phase_stats["max"],
+                    )
+                )
+    if "memory" in agg_results:
+        logging.info(
+            "Memory: peak {peak_rss_mb_max:.0f}MB, lowest headroom {headroom_mb_min}MB, "
+            "throttled invocations: {throttled_invocations}, "
+            "stopped early: {stopped_invocations}".format(**agg_results["memory"])
+        )
+    if "start_skew" in agg_results:
+        logging.info(
+            "Start skew of {invocations} invocations: min {min:.3f}s, max {max:.3f}s, "
+            "spread {spread:.3f}s".format(**agg_results["start_skew"])
+        )
+    for region, region_results in agg_results.get("by_region", {}).items():
+        logging.info(
+            f"Region {region}: invocations: {region_results['lambda_invocations']}, "
+            f"requests: {region_results['num_requests']}, "
+            f"failed: {region_results['num_requests_fail']}"
+        )
+
     logging.info(
         "==========================================================================================================================="
     )
@@ -101,6 +385,122 @@ def print_stats_exit(load_test_state):
     sys.exit(0)
 
 
+def print_fan_out_exit(fan_out_results, results_file=None, partial_results_file=None):
+    agg_results = finalize_aggregate(fan_out_results["partial"])
+    agg_results["summary"] = fan_out_results["summary"]
+    agg_results["coordinators"] = fan_out_results["coordinators"]
+
+    if results_file:
+        with open(results_file, "w") as f:
+            json.dump(agg_results, f)
+
+    if partial_results_file:
+        with open(partial_results_file, "w") as f:
+            json.dump(fan_out_results["partial"], f)
+
+    logging.info(
+        "\n============================================================"
+        f"\nCoordinator count: {len(agg_results['coordinators'])}"
+        f"\nCoordinator errors: {agg_results['summary']['coordinator_errors']}"
+        f"\nLambda invocation count: {agg_results['lambda_invocations']}"
+        f"\nLambda invocation errors: {agg_results['summary']['lambda_invocation_errors']}"
+        f"\nTotal requests sent: {agg_results['num_requests']}"
+        f"\nTotal requests failed: {agg_results['num_requests_fail']}"
+        f"\nApproximate cost: ${agg_results['approximate_cost']:.6f}\n"
+    )
+    for task, task_stats in agg_results["requests"].items():
+        logging.info(
+            "{0}: {1} requests, median {2}ms, p95 {3}ms".format(
+                task,
+                task_stats["num_requests"],
+                task_stats["median_response_time"],
+                task_stats["response_time_percentiles"][95],
+            )
+        )
+
+    logging.info("Exiting...")
+    sys.exit(0)
+
+
+def print_sweep_exit(sweep_results, results_file=None):
+    if results_file:
+        with open(results_file, "w") as f:
+            json.dump(sweep_results, f)
+
+    logging.info(
+        "%-20s %10s %10s %12s %14s %14s"
+        % (
+            "CONFIGURATION",
+            "#REQUESTS",
+            "FAIL RATIO",
+            "COST ($)",
+            "REQS/GB-SEC",
+            "REQS/$",
+        )
+    )
+    for sweep_result in sweep_results:
+        agg_results = sweep_result["results"]
+        logging.info(
+            "%-20s %10s %10s %12s %14s %14s"
+            % (
+                sweep_result["configuration"],
+                agg_results["num_requests"],
+                round(sweep_result["summary_stats"]["request_fail_ratio"], 4),
+                round(agg_results["approximate_cost"], 6),
+                round(agg_results["requests_per_gb_second"], 2),
+                round(agg_results["requests_per_dollar"]),
+            )
+        )
+    if sweep_results:
+        logging.info(
+            "Most requests per dollar: {0}".format(sweep_results[0]["configuration"])
+        )
+
+    logging.info("Exiting...")
+    sys.exit(0)
+
+
+def print_capacity_exit(capacity_results, results_file=None):
+    if results_file:
+        with open(results_file, "w") as f:
+            json.dump(capacity_results, f)
+
+    logging.info(
+        "%-12s %-8s %10s %10s %10s %10s %10s  %s"
+        % ("LEVEL", "SEARCH", "#REQUESTS", "RPM", "P95", "P99", "FAIL RATIO", "RESULT")
+    )
+    for step in capacity_results["steps"]:
+        logging.info(
+            "%-12s %-8s %10s %10s %10s %10s %10s  %s"
+            % (
+                step["level"],
+                step["search"],
+                step["stats"]["num_requests"],
+                round(step["stats"]["rpm"]),
+                step["stats"]["p95"],
+                step["stats"]["p99"],
+                round(step["stats"]["failure_ratio"], 4),
+                (
+                    "passed"
+                    if step["passed"]
+                    else "failed: "
+                    + ", ".join(
+                        "{slo} {value} > {limit}".format(**v)
+                        for v in step["violations"]
+                    )
+                ),
+            )
+        )
+    logging.info(
+        "Highest load level that met the SLOs ({0}): {1}".format(
+            capacity_results["mode"], capacity_results["max_passing_level"]
+        )
+    )
+
+    logging.info("Exiting...")
+    sys.exit(0)
+
+
 if __name__ == "__main__":
     args = parse_arguments()
 
@@ -120,6 +520,95 @@ if __name__ == "__main__":
         "spawn_rate": 10,
         "run_time": lambda_runtime,
     }
+    if args.arrival_rate:
+        lambda_payload["max_in_flight"] = args.max_in_flight
+    for warmup_setting in ["reset_stats", "warmup_time", "dns_cache", "warmup_connect"]:
+        if getattr(args, warmup_setting):
+            lambda_payload[warmup_setting] = getattr(args, warmup_setting)
+    if args.template_names:
+        lambda_payload["template_names"] = True
+    if args.max_names is not None:
+        lambda_payload["max_names"] = args.max_names
+
+    if args.sweep:
+        configurations = [int(c) if c.isdigit() else c for c in args.sweep.split(",")]
+        sweep_results = memory_sweep(
+            args.function_name,
+            configurations,
+            args.threads,
+            args.ramp_time,
+            args.time_limit,
+            lambda_payload,
+        )
+        print_sweep_exit(sweep_results, args.results_file)
+
+    targets = None
+    if args.targets_file:
+        with open(args.targets_file) as f:
+            targets = json.load(f)
+
+    if args.calibrate:
+        calibration = calibrate_users(
+            args.function_name,
+            lambda_payload,
+            user_levels=(
+                [int(u) for u in args.calibration_users.split(",")]
+                if args.calibration_users
+                else None
+            ),
+            probe_time=args.probe_time,
+            target_rpm=args.target_rpm,
+            targets=targets,
+        )
+        lambda_payload["num_users"] = calibration["num_users"]
+        if calibration["threads"]:
+            args.threads = calibration["threads"]
+        logging.info(
+            "Calibrated {0} users per invocation, {1} rpm per invocation, {2} threads".format(
+                calibration["num_users"],
+                round(calibration["rpm_per_invocation"]),
+                args.threads,
+            )
+        )
+
+    if args.capacity:
+        if args.capacity_mode == "rpm":
+            lambda_payload["max_in_flight"] = args.max_in_flight
+        capacity_results = capacity_search(
+            args.function_name,
+            (
+                [float(level) for level in args.capacity.split(",")]
+                if args.capacity_mode == "rpm"
+                else [int(level) for level in args.capacity.split(",")]
+            ),
+            args.threads,
+            args.ramp_time,
+            args.time_limit,
+            lambda_payload,
+            mode=args.capacity_mode,
+            max_p95=args.slo_p95,
+            max_p99=args.slo_p99,
+            max_failure_ratio=args.slo_failure_ratio,
+            binary_search_steps=args.binary_search_steps,
+            targets=targets,
+        )
+        print_capacity_exit(capacity_results, args.results_file)
+
+    if args.coordinators:
+        fan_out_results = fan_out_load_test(
+            args.function_name,
+            args.coordinators,
+            args.threads,
+            args.ramp_time,
+            args.time_limit,
+            lambda_payload,
+            coordinator_function_name=args.coordinator_function_name,
+            start_lead_time=args.start_lead_time,
+            handoff_overlap=args.handoff_overlap,
+        )
+        print_fan_out_exit(
+            fan_out_results, args.results_file, args.partial_results_file
+        )
 
     load_test_state = LambdaLoadTest(
         args.function_name,
@@ -127,12 +616,46 @@ if __name__ == "__main__":
         args.ramp_time,
         args.time_limit,
         lambda_payload,
+        targets=targets,
+        handoff_overlap=args.handoff_overlap,
+        start_lead_time=args.start_lead_time,
+        arrival_rate=args.arrival_rate,
+        tracer=InvocationTracer() if args.trace_file else None,
+        results_sink=args.results_sink,
+        checkpoint_sink=args.checkpoint_sink,
+        checkpoint_interval=args.checkpoint_interval,
     )
 
+    live_stop_event = threading.Event()
+    if args.live:
+        # only warnings are logged so they don't scroll the live console away
+        logging.getLogger().setLevel(logging.WARNING)
+        rolling_stats = RollingStats(window=args.live_window)
+        load_test_state.add_result_handler(rolling_stats.add_result)
+        console = threading.Thread(
+            name="live_console",
+            target=live_console,
+            args=(load_test_state, rolling_stats, live_stop_event),
+        )
+        console.daemon = True
+        console.start()
+
     try:
         load_test_state.run()
 
     except KeyboardInterrupt:
-        print_stats_exit(load_test_state)
+        live_stop_event.set()
+        print_stats_exit(
+            load_test_state,
+            args.results_file,
+            args.partial_results_file,
+            args.trace_file,
+        )
     else:
-        print_stats_exit(load_test_state)
+        live_stop_event.set()
+        print_stats_exit(
+            load_test_state,
+            args.results_file,
+            args.partial_results_file,
+            args.trace_file,
+        )
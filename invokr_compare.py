@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import argparse
+from invokust.aws_lambda.results_compare import compare_results, load_results
+
+
+def print_stat(task, p50, p95, p99, rps, p_value):
+    return "%-50s %16s %16s %16s %9s %9s" % (task, p50, p95, p99, rps, p_value)
+
+
+def format_change(change):
+    return "{0:+.1%}".format(change)
+
+
+def parse_arguments():
+    p = argparse.ArgumentParser(
+        description="Compares aggregated invokr results and fails on significant regressions"
+    )
+    p.add_argument(
+        "results",
+        help="Aggregated results files or result directories. The first is the baseline",
+        nargs="+",
+    )
+    p.add_argument(
+        "-a", "--alpha", help="Significance level of tests", default=0.01, type=float
+    )
+    p.add_argument(
+        "-p",
+        "--max_latency_increase",
+        help="Largest allowed relative increase of p50/p95/p99 response times",
+        default=0.1,
+        type=float,
+    )
+    p.add_argument(
+        "-r",
+        "--max_throughput_decrease",
+        help="Largest allowed relative decrease of requests per second",
+        default=0.1,
+        type=float,
+    )
+    p.add_argument(
+        "-e",
+        "--max_failure_ratio_increase",
+        help="Largest allowed absolute increase of the request failure ratio",
+        default=0.01,
+        type=float,
+    )
+    p.add_argument(
+        "-j", "--json", help="Print comparisons as JSON", action="store_true"
+    )
+    args = p.parse_args()
+    if len(args.results) < 2:
+        p.error("at least two results are required")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    baseline = load_results(args.results[0])
+    regressions = 0
+
+    for path in args.results[1:]:
+        comparison = compare_results(
+            baseline,
+            load_results(path),
+            alpha=args.alpha,
+            max_latency_increase=args.max_latency_increase,
+            max_throughput_decrease=args.max_throughput_decrease,
+            max_failure_ratio_increase=args.max_failure_ratio_increase,
+        )
+        regressions += len(comparison["regressions"])
+
+        if args.json:
+            print(
+                json.dumps(
+                    {"baseline": args.results[0], "candidate": path, **comparison}
+                )
+            )
+            continue
+
+        print(f"\n{args.results[0]} -> {path}")
+        print(print_stat("TASK", "P50", "P95", "P99", "RPS", "P-VALUE"))
+        for task, task_comparison in comparison["tasks"].items():
+            if "missing_from" in task_comparison:
+                print(f"{task:<50} missing from {task_comparison['missing_from']}")
+                continue
+            percentiles = task_comparison["response_time_percentiles"]
+            print(
+                print_stat(
+                    task,
+                    *[
+                        "{0} ({1})".format(
+                            percentiles[p]["candidate"],
+                            format_change(percentiles[p]["change"]),
+                        )
+                        for p in [50, 95, 99]
+                    ],
+                    format_change(task_comparison["total_rps_change"]),
+                    "{0:.3g}".format(task_comparison["mann_whitney_p_value"]),
+                )
+            )
+        for regression in comparison["regressions"]:
+            print(
+                "REGRESSION {type} {task}: {change}{note}".format(
+                    type=regression["type"],
+                    task=regression["task"] or "all tasks",
+                    change=format_change(regression["change"]),
+                    note=(
+                        " (threshold only, not tested for significance)"
+                        if regression.get("threshold_only")
+                        else ""
+                    ),
+                )
+            )
+
+    sys.exit(1 if regressions else 0)
@@ -1,5 +1,18 @@
 # -*- coding: utf-8 -*-
 
 from .runtime_info import get_lambda_runtime_info
-from .lambda_load_test import LambdaLoadTest
-from .results_aggregator import results_aggregator
+from .lambda_load_test import LambdaLoadTest, get_lambda_client
+from .results_aggregator import (
+    results_aggregator,
+    results_aggregator_by_target,
+    partial_aggregate,
+    merge_partial_aggregates,
+    finalize_aggregate,
+)
+from .results_compare import compare_results, load_results
+from .live_stats import RollingStats
+from .sweep import memory_sweep
+from .capacity import capacity_search
+from .calibration import calibrate_users
+from .tracing import InvocationTracer
+from .fan_out import fan_out_load_test, coordinator_handler
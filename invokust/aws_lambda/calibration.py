@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+import math
+import logging
+from .lambda_load_test import LambdaLoadTest
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_USERS = [1, 2, 5, 10, 20, 50, 100, 200, 500]
+
+
+def get_probe_stats(results):
+    """
+    Returns the mean requests per minute, CPU utilisation and failure ratio of the
+    results of the probe invocations of a level, and whether any load generator was
+    saturated
+    """
+    rpms = [
+        r["num_requests"] / ((r["end_time"] - r["start_time"]) / 60.0)
+        for r in results
+        if r.get("end_time") and r.get("start_time") and r["end_time"] > r["start_time"]
+    ]
+    generators = [r["generator"] for r in results if r.get("generator")]
+    num_requests = sum([r["num_requests"] for r in results])
+    return {
+        "invocations": len(results),
+        "rpm": sum(rpms) / len(rpms) if rpms else 0,
+        "cpu_percent": (
+            max([g["cpu_percent"] for g in generators]) if generators else None
+        ),
+        "saturated": any([g["saturated"] for g in generators]),
+        "failure_ratio": (
+            sum([r["num_requests_fail"] for r in results]) / float(num_requests)
+            if num_requests
+            else 0
+        ),
+    }
+
+
+def calibrate_users(
+    lambda_function_name,
+    lambda_payload,
+    user_levels=None,
+    probe_time=20,
+    probe_warmup_time=5,
+    probe_invocations=1,
+    min_scaling=0.5,
+    max_failure_ratio=0.01,
+    target_rpm=None,
+    lambda_timeout=300000,
+    lambda_client=None,
+    **load_test_kwargs
+):
+    """
+    Runs short probe invocations with an increasing number of users until the
+    throughput of an invocation stops scaling with the number of users, its load
+    generator is saturated or too many of its requests fail. Returns a dict with the highest number of users before
+    that point, the requests per minute of an invocation with it and, if target_rpm
+    is given, the number of threads needed for the target load.
+
+    arguments
+
+    user_levels: list of numbers of users to probe, in increasing order
+    probe_time: seconds each probe invocation runs for
+    probe_warmup_time: seconds at the start of each probe that are not measured,
+                       while users are starting
+    probe_invocations: number of concurrent invocations of each probe, whose
+                       throughput is averaged
+    min_scaling: a level stops scaling if its throughput increased by less than this
+                 fraction of the relative increase in users, e.g. with 0.5 doubling
+                 the users must increase the throughput by at least 50%
+    max_failure_ratio: a level fails if more than this fraction of its requests
+                       failed, as the throughput of failing requests isn't useful load
+    target_rpm: total requests per minute the load test should reach
+
+    The other arguments are the same as for LambdaLoadTest.
+    """
+    if probe_warmup_time >= probe_time:
+        raise ValueError("probe_warmup_time must be shorter than probe_time")
+
+    probes = []
+    selected = None
+    for num_users in user_levels or CALIBRATION_USERS:
+        load_test = LambdaLoadTest(
+            lambda_function_name,
+            probe_invocations,
+            0,
+            1,
+            dict(
+                lambda_payload,
+                num_users=num_users,
+                spawn_rate=num_users,
+                run_time="{0}s".format(probe_time),
+                warmup_time=probe_warmup_time,
+            ),
+            lambda_timeout=lambda_timeout,
+            lambda_client=lambda_client,
+            # starts all probe invocations at once, with all of their users
+            start_lead_time=1,
+            **load_test_kwargs
+        )
+        load_test.run()
+        probe = get_probe_stats(load_test.get_locust_results())
+        probe["num_users"] = num_users
+
+        previous = selected
+        if previous and previous["rpm"]:
+            probe["scaling"] = (probe["rpm"] / previous["rpm"] - 1) / (
+                num_users / float(previous["num_users"]) - 1
+            )
+        else:
+            probe["scaling"] = None
+        probes.append(probe)
+
+        logger.info(
+            "Calibration with {0} users: {1} rpm per invocation, cpu: {2}%, saturated: {3}, failures: {4}%".format(
+                num_users,
+                round(probe["rpm"]),
+                probe["cpu_percent"] and round(probe["cpu_percent"]),
+                probe["saturated"],
+                round(probe["failure_ratio"] * 100, 1),
+            )
+        )
+
+        if not probe["invocations"]:
+            logger.error("Calibration probe with {0} users failed".format(num_users))
+            break
+        if probe["saturated"]:
+            break
+        if probe["failure_ratio"] > max_failure_ratio:
+            break
+        if probe["scaling"] is not None and probe["scaling"] < min_scaling:
+            break
+        selected = probe
+
+    if selected is None:
+        if not probes or not probes[0]["invocations"]:
+            raise Exception("Calibration failed, no probe invocation returned results")
+        logger.warning(
+            "Load generator saturated or requests failing with the lowest number of users, {0}".format(
+                probes[0]["num_users"]
+            )
+        )
+        selected = probes[0]
+
+    threads = None
+    if target_rpm and selected["rpm"]:
+        threads = int(math.ceil(target_rpm / selected["rpm"]))
+
+    return {
+        "num_users": selected["num_users"],
+        "rpm_per_invocation": selected["rpm"],
+        "threads": threads,
+        "target_rpm": target_rpm,
+        "probes": probes,
+    }
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from .lambda_load_test import LambdaLoadTest
+from .results_aggregator import (
+    results_aggregator,
+    merge_response_time_counts,
+    response_time_percentile,
+)
+
+logger = logging.getLogger(__name__)
+
+CAPACITY_MODES = ["threads", "rpm"]
+
+
+def get_step_stats(agg_results, duration):
+    """
+    Returns the response time percentiles, failure ratio and throughput of a step
+    from its aggregated results. Response times of all tasks are merged. With an
+    arrival rate the response times are measured from the intended start times.
+    """
+    if "arrivals" in agg_results:
+        tasks = agg_results["arrivals"]["intended_response_times"].values()
+    else:
+        tasks = agg_results["requests"].values()
+    counts = merge_response_time_counts(
+        [task["response_time_counts"] for task in tasks]
+    )
+    arrivals = agg_results.get("arrivals", {})
+    return {
+        "num_requests": agg_results["num_requests"],
+        "num_requests_fail": agg_results["num_requests_fail"],
+        "failure_ratio": agg_results["num_requests_fail"]
+        / float(max(agg_results["num_requests"], 1)),
+        "dropped_ratio": arrivals.get("dropped_ratio", 0),
+        "p95": response_time_percentile(counts, 0.95),
+        "p99": response_time_percentile(counts, 0.99),
+        "rpm": agg_results["num_requests"] / (duration / 60.0) if duration else 0,
+    }
+
+
+def evaluate_slos(step_stats, max_p95=None, max_p99=None, max_failure_ratio=None):
+    """
+    Returns a list of the SLOs that the statistics of a step violate
+
+    arguments
+
+    step_stats: dict from get_step_stats
+    max_p95, max_p99: highest allowed 95th and 99th percentile response times (ms)
+    max_failure_ratio: highest allowed ratio of failed requests, and of dropped
+                       arrivals with an arrival rate
+    """
+    violations = []
+    for slo, limit, value in [
+        ("p95", max_p95, step_stats["p95"]),
+        ("p99", max_p99, step_stats["p99"]),
+        ("failure_ratio", max_failure_ratio, step_stats["failure_ratio"]),
+        ("dropped_ratio", max_failure_ratio, step_stats["dropped_ratio"]),
+    ]:
+        if limit is not None and value > limit:
+            violations.append({"slo": slo, "limit": limit, "value": value})
+    if not step_stats["num_requests"]:
+        violations.append({"slo": "num_requests", "limit": 1, "value": 0})
+    return violations
+
+
+def capacity_search(
+    lambda_function_name,
+    levels,
+    threads,
+    ramp_time,
+    time_limit,
+    lambda_payload,
+    mode="threads",
+    max_p95=None,
+    max_p99=None,
+    max_failure_ratio=None,
+    binary_search_steps=0,
+    lambda_timeout=300000,
+    lambda_client=None,
+    print_stats_delay=3,
+    **load_test_kwargs
+):
+    """
+    Runs a load test for each load level in increasing order until one violates the
+    SLOs, optionally followed by a binary search between the highest passing and
+    the lowest failing level. Returns a dict with the highest passing level and the
+    statistics and aggregated results of every step as evidence.
+
+    arguments
+
+    levels: list of load levels to step through
+    mode: "threads" to use each level as the number of threads (concurrent Lambda
+          invocations), or "rpm" to use each level as a target number of requests
+          per minute across the threads, with an arrival rate
+    max_p95, max_p99: highest allowed 95th and 99th percentile response times (ms)
+    max_failure_ratio: highest allowed ratio of failed requests
+    binary_search_steps: number of extra load tests to narrow down the boundary
+
+    The other arguments are the same as for LambdaLoadTest. time_limit is the
+    duration of each step.
+    """
+    if mode not in CAPACITY_MODES:
+        raise ValueError(
+            "mode must be one of {0}, not {1}".format(", ".join(CAPACITY_MODES), mode)
+        )
+
+    steps = []
+
+    def run_step(level, search):
+        step_threads = level if mode == "threads" else threads
+        arrival_rate = level / 60.0 if mode == "rpm" else None
+        load_test = LambdaLoadTest(
+            lambda_function_name,
+            step_threads,
+            ramp_time,
+            time_limit,
+            lambda_payload,
+            lambda_timeout=lambda_timeout,
+            lambda_client=lambda_client,
+            print_stats_delay=print_stats_delay,
+            arrival_rate=arrival_rate,
+            **load_test_kwargs
+        )
+        load_test.run()
+
+        results = load_test.get_locust_results()
+        agg_results = results_aggregator(results, lambda_timeout=lambda_timeout)
+        duration = max([r["end_time"] or 0 for r in results], default=0) - min(
+            [r["start_time"] or 0 for r in results], default=0
+        )
+        step_stats = get_step_stats(agg_results, duration)
+        violations = evaluate_slos(step_stats, max_p95, max_p99, max_failure_ratio)
+        steps.append(
+            {
+                "level": level,
+                "search": search,
+                "passed": not violations,
+                "violations": violations,
+                "stats": step_stats,
+                "summary_stats": load_test.get_summary_stats(),
+                "results": agg_results,
+            }
+        )
+        logger.info(
+            "Capacity level {0}: {1}, p95: {2}ms, p99: {3}ms, failure ratio: {4}, rpm: {5}".format(
+                level,
+                "passed" if not violations else "failed",
+                step_stats["p95"],
+                step_stats["p99"],
+                round(step_stats["failure_ratio"], 4),
+                round(step_stats["rpm"]),
+            )
+        )
+        return not violations
+
+    max_passing_level = None
+    min_failing_level = None
+    for level in sorted(levels):
+        if run_step(level, "step"):
+            max_passing_level = level
+        else:
+            min_failing_level = level
+            break
+
+    if max_passing_level is not None and min_failing_level is not None:
+        for _ in range(binary_search_steps):
+            level = (max_passing_level + min_failing_level) / 2.0
+            if mode == "threads":
+                level = int(level)
+            if level in (max_passing_level, min_failing_level):
+                break
+            if run_step(level, "binary"):
+                max_passing_level = level
+            else:
+                min_failing_level = level
+
+    return {
+        "mode": mode,
+        "slos": {
+            "max_p95": max_p95,
+            "max_p99": max_p99,
+            "max_failure_ratio": max_failure_ratio,
+        },
+        "max_passing_level": max_passing_level,
+        "min_failing_level": min_failing_level,
+        "steps": steps,
+    }
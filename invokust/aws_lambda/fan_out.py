@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import logging
+import threading
+from botocore.client import Config
+from locust.util.timespan import parse_timespan
+from .lambda_load_test import LambdaLoadTest, config, get_lambda_client, session
+from ..failures import cap_failures
+from .results_aggregator import merge_partial_aggregates, partial_aggregate
+
+logger = logging.getLogger(__name__)
+
+# key of the event of a coordinator invocation that holds its configuration
+COORDINATOR_KEY = "coordinator"
+
+# the longest timeout of a Lambda function in milliseconds
+MAX_LAMBDA_TIMEOUT = 900000
+
+# summary statistics of the coordinators that are added up
+SUMMARY_COUNTS = [
+    "lambda_invocation_count",
+    "lambda_invocation_errors",
+    "total_lambda_execution_time",
+    "requests_total",
+    "saturated_invocation_count",
+]
+
+
+def split_threads(threads, coordinators):
+    """
+    Returns the number of threads of each coordinator, spreading the remainder over
+    the first coordinators
+    """
+    return [
+        threads // coordinators + (1 if i < threads % coordinators else 0)
+        for i in range(coordinators)
+    ]
+
+
+def coordinator_handler(event, context=None, lambda_client=None):
+    """
+    Runs a LambdaLoadTest of load invocations inside a coordinator invocation and
+    returns its results as a partial aggregate, with the summary statistics of the
+    coordinator. Called by the Lambda handler when the event has a "coordinator" key
+    with the configuration from fan_out_load_test. The failures of the partial
+    aggregate are capped at max_failures of the configuration (default 50), to keep
+    the response within the Lambda response size limit.
+
+    arguments
+
+    event: the event of the coordinator invocation
+    context: the Lambda context of the coordinator invocation
+    lambda_client: boto3 Lambda client used for the load invocations, or a stand-in
+                   with the same methods
+    """
+    coordinator = event[COORDINATOR_KEY]
+    start_lead_time = 0
+    if coordinator.get("start_at"):
+        # all coordinators start their load invocations at the same time
+        start_lead_time = max(1, coordinator["start_at"] - time.time())
+
+    load_test = LambdaLoadTest(
+        coordinator["function_name"],
+        coordinator["threads"],
+        coordinator["ramp_time"],
+        coordinator["time_limit"],
+        coordinator["lambda_payload"],
+        lambda_timeout=coordinator["lambda_timeout"],
+        lambda_client=lambda_client or get_lambda_client(coordinator.get("region")),
+        handoff_overlap=coordinator.get("handoff_overlap", 0),
+        start_lead_time=start_lead_time,
+        print_stats_delay=coordinator.get("print_stats_delay", 3),
+    )
+    load_test.run()
+
+    summary = load_test.get_summary_stats()
+    summary["lambda_invocation_errors"] = load_test.lambda_invocation_errors
+    summary["threads"] = coordinator["threads"]
+    if context:
+        summary["aws_request_id"] = context.aws_request_id
+    partial = partial_aggregate(
+        load_test.get_locust_results(), load_test.lambda_timeout
+    )
+    partial["failures"] = cap_failures(
+        partial["failures"], coordinator.get("max_failures", 50)
+    )
+    return {"partial": partial, "summary": summary}
+
+
+def invoke_coordinator(lambda_client, function_name, coordinator):
+    """
+    Invokes a coordinator and returns its decoded results, or a dict with the error
+    if the invocation failed
+    """
+    try:
+        response = lambda_client.invoke(
+            FunctionName=function_name,
+            Payload=json.dumps({COORDINATOR_KEY: coordinator}),
+        )
+        if "FunctionError" in response:
+            return {
+                "error": "{0}: {1}".format(
+                    response["FunctionError"], response["Payload"].read()
+                )
+            }
+        payload_json_str = json.loads(response["Payload"].read().decode("utf-8"))
+        if not payload_json_str:
+            return {"error": "No results in payload"}
+        return json.loads(payload_json_str)
+    except Exception as e:
+        return {"error": repr(e)}
+
+
+def fan_out_load_test(
+    lambda_function_name,
+    coordinators,
+    threads,
+    ramp_time,
+    time_limit,
+    lambda_payload,
+    coordinator_function_name=None,
+    lambda_timeout=300000,
+    coordinator_timeout=None,
+    start_lead_time=0,
+    handoff_overlap=0,
+    region=None,
+    lambda_client=None,
+    print_stats_delay=3,
+):
+    """
+    Runs a load test through coordinator invocations. Each coordinator runs a
+    LambdaLoadTest with its share of the threads inside a Lambda function and returns
+    a partial aggregate of its load invocations. Returns a dict with the merged
+    partial aggregate, the added up summary statistics and the results of each
+    coordinator.
+
+    arguments
+
+    coordinators: number of coordinator invocations
+    threads: total number of threads, split evenly between the coordinators
+    coordinator_function_name: Lambda function that runs the coordinators, by default
+                               the load test function itself (see lambda_locust.py)
+    coordinator_timeout: timeout of the coordinator function in milliseconds, read
+                         from its configuration by default. A coordinator runs for
+                         time_limit plus the run time of the last load invocations.
+    start_lead_time: seconds from now at which all coordinators start their load
+                     invocations at once, to ramp up a large fleet quickly
+    region: region of the load test function, used by the coordinators
+    lambda_client: boto3 Lambda client used to invoke the coordinators, or a stand-in
+                   with the same methods
+
+    The other arguments are the same as for LambdaLoadTest.
+    """
+    coordinator_function_name = coordinator_function_name or lambda_function_name
+    if lambda_client is None:
+        lambda_client = session.client(
+            "lambda",
+            region_name=region,
+            config=config.merge(Config(read_timeout=MAX_LAMBDA_TIMEOUT / 1000 + 10)),
+        )
+    if coordinator_timeout is None:
+        coordinator_timeout = (
+            lambda_client.get_function_configuration(
+                FunctionName=coordinator_function_name
+            )["Timeout"]
+            * 1000
+        )
+    run_time = parse_timespan(str(lambda_payload["run_time"]))
+    if (time_limit + run_time) * 1000 >= coordinator_timeout:
+        raise ValueError(
+            "time_limit plus the run_time of the Lambda payload must be shorter than "
+            "the timeout of the coordinator function, {0}s".format(
+                coordinator_timeout / 1000
+            )
+        )
+
+    start_at = time.time() + start_lead_time if start_lead_time else None
+    coordinator_results = []
+    lock = threading.Lock()
+
+    def run_coordinator(index, coordinator_threads):
+        results = invoke_coordinator(
+            lambda_client,
+            coordinator_function_name,
+            {
+                "function_name": lambda_function_name,
+                "region": region,
+                "threads": coordinator_threads,
+                "ramp_time": ramp_time,
+                "time_limit": time_limit,
+                "lambda_payload": lambda_payload,
+                "lambda_timeout": lambda_timeout,
+                "handoff_overlap": handoff_overlap,
+                "start_at": start_at,
+                "print_stats_delay": print_stats_delay,
+            },
+        )
+        results["coordinator"] = index
+        if "error" in results:
+            logger.error("Coordinator {0} failed: {1}".format(index, results["error"]))
+        else:
+            logger.info(
+                "Coordinator {0} finished: {1} invocations, {2} requests".format(
+                    index,
+                    results["summary"]["lambda_invocation_count"],
+                    results["summary"]["requests_total"],
+                )
+            )
+        with lock:
+            coordinator_results.append(results)
+
+    logger.info(
+        "Starting {0} coordinators with {1} threads in total".format(
+            coordinators, threads
+        )
+    )
+    coordinator_threads = [
+        threading.Thread(
+            name="coordinator_{0}".format(index),
+            target=run_coordinator,
+            args=(index, count),
+        )
+        for index, count in enumerate(split_threads(threads, coordinators))
+        if count
+    ]
+    for thread in coordinator_threads:
+        thread.start()
+    for thread in coordinator_threads:
+        thread.join()
+
+    coordinator_results.sort(key=lambda r: r["coordinator"])
+    succeeded = [r for r in coordinator_results if "error" not in r]
+    summary = {
+        key: sum([r["summary"][key] for r in succeeded]) for key in SUMMARY_COUNTS
+    }
+    summary["coordinator_errors"] = len(coordinator_results) - len(succeeded)
+    return {
+        "partial": merge_partial_aggregates([r["partial"] for r in succeeded]),
+        "summary": summary,
+        "coordinators": [
+            {key: value for key, value in r.items() if key != "partial"}
+            for r in coordinator_results
+        ],
+    }
@@ -3,10 +3,15 @@
 import os
 import json
 import time
+import uuid
 import logging
 import threading
 from boto3.session import Session
 from botocore.client import Config
+from botocore.exceptions import ClientError
+from locust.util.timespan import parse_timespan
+from ..checkpoint import checkpoint_prefix, merge_checkpoints
+from ..sinks import ResultsCollector, create_sink
 
 logger = logging.getLogger(__name__)
 
@@ -14,19 +19,75 @@ logging.getLogger("botocore").setLevel(logging.CRITICAL)
 
 session = Session()
 config = Config(
-    connect_timeout=os.environ.get('BOTO_CONFIG_CONNECT_TIMEOUT', 10),
-    read_timeout=os.environ.get('BOTO_CONFIG_READ_TIMEOUT', 310),
-    retries=json.loads(
-        os.environ.get('BOTO_CONFIG_RETRIES', '{"max_attempts": 3}')
-    )
+    connect_timeout=os.environ.get("BOTO_CONFIG_CONNECT_TIMEOUT", 10),
+    read_timeout=os.environ.get("BOTO_CONFIG_READ_TIMEOUT", 310),
+    retries=json.loads(os.environ.get("BOTO_CONFIG_RETRIES", '{"max_attempts": 3}')),
 )
 client = session.client("lambda", config=config)
+regional_clients = {}
+
+
+def get_lambda_client(region=None):
+    """
+    Returns a Lambda client for a region. The default client is returned if no region
+    is given.
+    """
+    if region is None:
+        return client
+    if region not in regional_clients:
+        regional_clients[region] = session.client(
+            "lambda", region_name=region, config=config
+        )
+    return regional_clients[region]
 
 
 class LambdaLoadTest(object):
     """
     An object to run and collect statistics and results from multiple parallel locust load
     tests running on AWS Lambda
+
+    The load can be spread across several Lambda functions, e.g. in different regions,
+    with targets. This is a list of dicts with the keys:
+
+        function_name: name of the Lambda function
+        region: AWS region of the function (optional)
+        weight: relative share of the threads (optional, default 1)
+        max_threads: maximum concurrent threads for this target (optional)
+        lambda_client: client to invoke the function with (optional)
+        name: name to tag results with (optional, default region/function_name)
+
+    With handoff_overlap (seconds) each thread starts its next invocation this long
+    before the current one is expected to end, instead of after it has returned, so
+    that long load tests don't dip between Lambda invocations. These handoff
+    invocations start with the time the current invocation is expected to end, and
+    wait for it before they spawn all of their users, so the load stays flat.
+
+    With start_lead_time (seconds) all threads are started at once and the first
+    invocation of each thread waits until start_lead_time seconds after the start of
+    the load test before it spawns all of its users, for spike tests.
+
+    With arrival_rate (tasks per second) the invocations run tasks at a constant
+    arrival rate instead of with a number of users. The rate is split evenly across
+    the threads.
+
+    With a tracer (InvocationTracer) the round trip, Lambda execution, decode, record
+    and sleep phases of each thread are recorded as spans.
+
+    With results_sink (a sink or its URL, see sinks.py) the function is invoked
+    asynchronously (InvocationType Event) and writes its results to the sink, where
+    a collector thread polls for them every sink_poll_interval seconds. Threads wait
+    for their results without holding a connection open. An invocation whose results
+    haven't arrived results_timeout seconds after lambda_timeout is counted as an
+    error. Lambda retries of the asynchronous invocations are turned off while the
+    load test runs, as a retried invocation would add its results twice. Results that
+    arrive after their invocation timed out are deleted when the load test ends.
+
+    With checkpoint_sink (a sink or its URL) each invocation writes the statistics
+    recorded since its previous checkpoint to the sink every checkpoint_interval
+    seconds. If an invocation fails, e.g. it times out or runs out of memory, the
+    statistics in its checkpoints are recovered and added to the results. The
+    checkpoints of successful invocations are deleted, and any checkpoints of the
+    load test left in the sink are deleted when it ends.
     """
 
     def __init__(
@@ -37,6 +98,18 @@ class LambdaLoadTest(object):
         time_limit,
         lambda_payload,
         lambda_timeout=300000,
+        lambda_client=None,
+        print_stats_delay=3,
+        targets=None,
+        handoff_overlap=0,
+        start_lead_time=0,
+        arrival_rate=None,
+        tracer=None,
+        results_sink=None,
+        sink_poll_interval=1,
+        results_timeout=60,
+        checkpoint_sink=None,
+        checkpoint_interval=30,
     ):
         self.lock = threading.Lock()
         self.start_time = time.time()
@@ -48,18 +121,141 @@ class LambdaLoadTest(object):
         )
         self.lambda_function_name = lambda_function_name
         self.lambda_payload = lambda_payload
+        if arrival_rate:
+            self.lambda_payload = dict(
+                lambda_payload, arrival_rate=arrival_rate / float(threads)
+            )
         self.lambda_invocation_errors = 0
         self.lambda_invocation_count = 0
+        self.lambda_saturated_count = 0
+        self.lambda_recovered_count = 0
         self.lambda_invocation_error_threshold = 20
         self.lambda_total_execution_time = 0
         self.requests_fail = 0
         self.request_fail_ratio_threshold = 0.5
         self.requests_total = 0
         self.locust_results = []
+        self.result_handlers = []
         self.thread_data = {}
-        self.print_stats_delay = 3
+        self.print_stats_delay = print_stats_delay
         self.exit_threads = False
         self.lambda_timeout = lambda_timeout
+        self.client = lambda_client or client
+        self.targets = self.create_targets(targets)
+        self.thread_counter = 0
+        self.handoff_overlap = handoff_overlap
+        if handoff_overlap:
+            self.run_time = parse_timespan(str(lambda_payload["run_time"]))
+            if handoff_overlap >= self.run_time:
+                raise ValueError(
+                    "handoff_overlap must be shorter than the run_time of the Lambda payload"
+                )
+            # handoff invocations wait for the overlap before running for run_time
+            if handoff_overlap + self.run_time >= lambda_timeout / 1000.0:
+                raise ValueError(
+                    "handoff_overlap plus the run_time of the Lambda payload must be shorter than lambda_timeout"
+                )
+        if start_lead_time and "run_time" in lambda_payload:
+            # invocations wait for the start before running for run_time
+            run_time = parse_timespan(str(lambda_payload["run_time"]))
+            if start_lead_time + run_time >= lambda_timeout / 1000.0:
+                raise ValueError(
+                    "start_lead_time plus the run_time of the Lambda payload must be shorter than lambda_timeout"
+                )
+        self.start_lead_time = start_lead_time
+        self.start_at = None
+        self.tracer = tracer
+        if isinstance(results_sink, str):
+            results_sink = create_sink(results_sink)
+        self.results_sink = results_sink
+        self.results_timeout = results_timeout
+        # the invocation and checkpoint IDs of this load test start with it, so only
+        # its results and checkpoints are listed in the sinks
+        self.run_id = uuid.uuid4().hex
+        self.event_invoke_configs = {}
+        self.results_collector = (
+            ResultsCollector(
+                results_sink,
+                poll_interval=sink_poll_interval,
+                prefix=self.run_id + "-",
+            )
+            if results_sink
+            else None
+        )
+        if isinstance(checkpoint_sink, str):
+            checkpoint_sink = create_sink(checkpoint_sink)
+        self.checkpoint_sink = checkpoint_sink
+        self.checkpoint_interval = checkpoint_interval
+
+    def get_handoff_payload(self, start_at):
+        """
+        Returns the payload of a handoff invocation, which starts all of its users at
+        start_at, when the current invocation of its thread is expected to end
+        """
+        return dict(self.lambda_payload, start_at=start_at)
+
+    def get_start_payload(self):
+        """
+        Returns the payload of the first invocation of a thread, with the time to
+        start at if the synchronised start is still to come
+        """
+        if self.start_at and self.start_at > time.time():
+            return dict(self.lambda_payload, start_at=self.start_at)
+        return self.lambda_payload
+
+    def create_targets(self, targets):
+        """
+        Returns a list of targets with default values filled in
+        """
+        if not targets:
+            targets = [
+                {
+                    "function_name": self.lambda_function_name,
+                    "lambda_client": self.client,
+                }
+            ]
+
+        created_targets = []
+        for target in targets:
+            region = target.get("region")
+            created_targets.append(
+                {
+                    "function_name": target["function_name"],
+                    "region": region,
+                    "weight": target.get("weight", 1),
+                    "max_threads": target.get("max_threads"),
+                    "lambda_client": target.get("lambda_client")
+                    or get_lambda_client(region),
+                    "name": target.get("name")
+                    or "{0}/{1}".format(region or "default", target["function_name"]),
+                    "thread_count": 0,
+                }
+            )
+        return created_targets
+
+    def select_target(self):
+        """
+        Returns the target with the fewest threads relative to its weight that has not
+        reached its thread limit, or None if all targets are at their limit
+        """
+        with self.lock:
+            available = [
+                t
+                for t in self.targets
+                if t["max_threads"] is None or t["thread_count"] < t["max_threads"]
+            ]
+            if not available:
+                return None
+            target = min(available, key=lambda t: (t["thread_count"] + 1) / t["weight"])
+            target["thread_count"] += 1
+            return target
+
+    def release_target(self, target):
+        """
+        Decreases the thread count of a target when a thread finishes
+        """
+        with self.lock:
+            target["thread_count"] -= 1
 
     def update_thread_data(self, thread_id, key, value):
         """
@@ -74,7 +270,7 @@ class LambdaLoadTest(object):
         """
         Returns number of load test threads running
         """
-        return len([t for t in threading.enumerate() if t.getName() != "MainThread"])
+        return len([t for t in threading.enumerate() if t.name.startswith("thread_")])
 
     def get_time_elapsed(self):
         """
@@ -96,6 +292,20 @@ class LambdaLoadTest(object):
         with self.lock:
             self.lambda_invocation_count += 1
 
+    def increase_lambda_recovered_count(self):
+        """
+        Increase Lambda recovered invocation count
+        """
+        with self.lock:
+            self.lambda_recovered_count += 1
+
+    def increase_lambda_saturated_count(self):
+        """
+        Increases the count of Lambda invocations where the load generator was saturated
+        """
+        with self.lock:
+            self.lambda_saturated_count += 1
+
     def get_invocation_error_ratio(self):
         """
         Returns ratio of Lambda invocations to invocation errors
@@ -134,6 +344,15 @@ class LambdaLoadTest(object):
         """
         with self.lock:
             self.locust_results.append(results)
+        for handler in self.result_handlers:
+            handler(results)
+
+    def add_result_handler(self, handler):
+        """
+        Adds a function that is called with the results of each Lambda invocation as
+        they arrive
+        """
+        self.result_handlers.append(handler)
 
     def get_summary_stats(self):
         """
@@ -145,6 +364,8 @@ class LambdaLoadTest(object):
             "requests_total": self.requests_total,
             "request_fail_ratio": self.get_request_fail_ratio(),
             "invocation_error_ratio": self.get_invocation_error_ratio(),
+            "saturated_invocation_count": self.lambda_saturated_count,
+            "recovered_invocation_count": self.lambda_recovered_count,
         }
 
     def get_stats(self):
@@ -210,7 +431,7 @@ class LambdaLoadTest(object):
         Returns True if a new thread should be started when ramping up over time
         """
         result = False
-        if self.get_thread_count() < self.threads:
+        if self.get_thread_count() < self.threads and self.target_available():
             next_thread_interval = (
                 self.ramp_time / self.threads
             ) * self.get_thread_count()
@@ -218,6 +439,15 @@ class LambdaLoadTest(object):
                 result = True
         return result
 
+    def target_available(self):
+        """
+        Returns True if any target has not reached its thread limit
+        """
+        return any(
+            t["max_threads"] is None or t["thread_count"] < t["max_threads"]
+            for t in self.targets
+        )
+
     def stop_threads(self):
         """
         Sets a boolean to stop threads
@@ -227,21 +457,40 @@ class LambdaLoadTest(object):
 
     def start_new_thread(self):
         """
-        Creates a new load test thread
+        Creates a new load test thread for the next target
         """
-        t_name = "thread_{0}".format(threading.activeCount())
-        t = threading.Thread(name=t_name, target=self.thread)
+        target = self.select_target()
+        if target is None:
+            return
+        self.thread_counter += 1
+        t_name = "thread_{0}".format(self.thread_counter)
+        t = threading.Thread(name=t_name, target=self.thread, args=(target,))
         t.daemon = True
         t.start()
 
-    def thread(self):
+    def thread(self, target):
         """
         This method is a single thread and performs the actual execution of the Lambda function and logs the statistics/results
         """
-        self.logger.info("thread started")
+        try:
+            self.invocation_loop(target)
+        finally:
+            self.release_target(target)
+
+    def invocation_loop(self, target):
+        """
+        Invokes the target Lambda function repeatedly until the threads are stopped
+        """
+        self.logger.info("thread started, target: {0}".format(target["name"]))
         thread_start_time = time.time()
         thread_id = threading.current_thread().getName()
         self.update_thread_data(thread_id, "start_time", thread_start_time)
+
+        if self.handoff_overlap:
+            self.handoff_loop(target, thread_id)
+            self.logger.info("thread finished")
+            return
+
         while True:
             thread_run_time = time.time() - thread_start_time
 
@@ -253,67 +502,428 @@ class LambdaLoadTest(object):
             else:
                 sleep_time = round(max(0, self.ramp_time - thread_run_time) / 30)
 
-            function_start_time = time.time()
+            payload = self.get_start_payload()
+            if self.invoke_lambda(target, thread_id, payload) is None:
+                self.sleep(thread_id, 2)
+                continue
 
-            try:
-                self.logger.info("Invoking lambda...")
-                response = client.invoke(
-                    FunctionName=self.lambda_function_name,
-                    Payload=json.dumps(self.lambda_payload),
+            self.logger.info("sleeping: {0}s".format(sleep_time))
+            self.sleep(thread_id, sleep_time)
+
+        self.logger.info("thread finished")
+
+    def handoff_loop(self, target, thread_id):
+        """
+        Starts each invocation handoff_overlap seconds before the previous one is
+        expected to end. Waits for all invocations to return once the threads are
+        stopped.
+        """
+        invocations = []
+        payload = self.get_start_payload()
+        while not self.exit_threads:
+            invocation_start_time = time.time()
+            invocation = threading.Thread(
+                name="handoff_{0}".format(thread_id),
+                target=self.invoke_lambda,
+                args=(target, thread_id, payload),
+            )
+            invocation.daemon = True
+            invocation.start()
+            invocations = [i for i in invocations if i.is_alive()] + [invocation]
+            load_start_time = max(invocation_start_time, payload.get("start_at", 0))
+            load_end_time = load_start_time + self.run_time
+            handoff_time = load_end_time - self.handoff_overlap
+            # the next invocation is warm but idle until this one ends
+            payload = self.get_handoff_payload(load_end_time)
+
+            # returns early if the invocation fails so that the next one starts now
+            invocation.join(max(0, handoff_time - time.time()))
+            if not invocation.is_alive():
+                payload = self.lambda_payload
+                if time.time() - invocation_start_time < 2:
+                    self.sleep(thread_id, 2)
+
+        for invocation in invocations:
+            invocation.join()
+
+    def sleep(self, thread_id, seconds):
+        """
+        Sleeps between invocations of a thread and traces the sleep
+        """
+        sleep_start_time = time.time()
+        time.sleep(seconds)
+        if self.tracer and seconds:
+            self.tracer.span((thread_id, 0), "sleep", sleep_start_time, time.time())
+
+    def trace_invocation(self, lane, *args, **kwargs):
+        """
+        Records the spans of an invocation if tracing is enabled
+        """
+        if lane is None:
+            return
+        self.tracer.add_invocation(lane, *args, **kwargs)
+
+    def request_results(self, target, lambda_payload, lane, function_start_time):
+        """
+        Invokes the target Lambda function synchronously. Returns the results and the
+        times the invocation returned and its results were decoded, or None if the
+        invocation failed.
+        """
+        try:
+            self.logger.info("Invoking lambda...")
+            response = target["lambda_client"].invoke(
+                FunctionName=target["function_name"],
+                Payload=json.dumps(lambda_payload),
+            )
+        except Exception as e:
+            self.logger.critical("Lambda invocation failed: {0}".format(repr(e)))
+            self.trace_invocation(lane, function_start_time, time.time(), error=repr(e))
+            return None
+
+        function_end_time = time.time()
+
+        self.increase_lambda_invocation_count()
+
+        if "FunctionError" in response:
+            logger.error(
+                "error {0}: {1}".format(
+                    response["FunctionError"], response["Payload"].read()
                 )
-            except Exception as e:
-                self.logger.critical("Lambda invocation failed: {0}".format(repr(e)))
-                time.sleep(2)
-                continue
+            )
+            self.increase_lambda_invocation_error()
+            self.trace_invocation(
+                lane,
+                function_start_time,
+                function_end_time,
+                error=response["FunctionError"],
+            )
+            return None
+
+        payload = response["Payload"].read()
+        payload_json_str = json.loads(payload.decode("utf-8"))
+
+        if not payload_json_str:
+            logger.error("No results in payload")
+            self.increase_lambda_invocation_error()
+            self.trace_invocation(
+                lane, function_start_time, function_end_time, error="No results"
+            )
+            return None
 
-            function_end_time = time.time()
+        results = json.loads(payload_json_str)
+        return results, function_end_time, time.time()
 
-            self.increase_lambda_invocation_count()
+    def configure_event_invocations(self):
+        """
+        Turns off the retries of asynchronous invocations of the targets and drops
+        events that wait in the queue for longer than results_timeout, as their
+        results would no longer be collected. The previous configurations are kept
+        so restore_event_invocations can put them back.
+        """
+        # the shortest and longest event age that Lambda accepts
+        maximum_event_age = min(max(int(self.results_timeout), 60), 21600)
+        for target in self.targets:
+            if target["name"] in self.event_invoke_configs:
+                continue
+            client = target["lambda_client"]
+            try:
+                try:
+                    previous = client.get_function_event_invoke_config(
+                        FunctionName=target["function_name"]
+                    )
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "ResourceNotFoundException":
+                        raise
+                    previous = None
+                client.put_function_event_invoke_config(
+                    FunctionName=target["function_name"],
+                    MaximumRetryAttempts=0,
+                    MaximumEventAgeInSeconds=maximum_event_age,
+                )
+            except Exception as e:
+                self.restore_event_invocations()
+                raise Exception(
+                    "Turning off the retries of asynchronous invocations of {0} failed, "
+                    "lambda:GetFunctionEventInvokeConfig, lambda:PutFunctionEventInvokeConfig "
+                    "and lambda:DeleteFunctionEventInvokeConfig are needed with a results sink: {1}".format(
+                        target["name"], repr(e)
+                    )
+                )
+            self.event_invoke_configs[target["name"]] = (target, previous)
 
-            if "FunctionError" in response:
+    def restore_event_invocations(self):
+        """
+        Puts back the asynchronous invocation configurations that
+        configure_event_invocations replaced, or deletes the configuration if the
+        function had none
+        """
+        for target, previous in self.event_invoke_configs.values():
+            client = target["lambda_client"]
+            try:
+                if previous is None:
+                    client.delete_function_event_invoke_config(
+                        FunctionName=target["function_name"]
+                    )
+                else:
+                    client.put_function_event_invoke_config(
+                        FunctionName=target["function_name"],
+                        **{
+                            key: previous[key]
+                            for key in [
+                                "MaximumRetryAttempts",
+                                "MaximumEventAgeInSeconds",
+                                "DestinationConfig",
+                            ]
+                            if key in previous
+                        },
+                    )
+            except Exception as e:
                 logger.error(
-                    "error {0}: {1}".format(
-                        response["FunctionError"], response["Payload"].read()
+                    "Restoring the asynchronous invocation configuration of {0} failed: {1}".format(
+                        target["name"], repr(e)
                     )
                 )
-                self.increase_lambda_invocation_error()
-                time.sleep(2)
-                continue
+        self.event_invoke_configs = {}
 
-            payload = response["Payload"].read()
-            payload_json_str = json.loads(payload.decode("utf-8"))
+    def delete_late_results(self):
+        """
+        Deletes the results of this load test that are still in the results sink,
+        which arrived after their invocation timed out. Returns how many were deleted.
+        """
+        keys = []
+        try:
+            keys = self.results_sink.list_keys(self.results_collector.prefix)
+            for key in keys:
+                self.results_sink.delete(key)
+        except Exception as e:
+            logger.error("Deleting late results failed: {0}".format(repr(e)))
+        if keys:
+            logger.warning(
+                "Deleted {0} results that arrived after their invocation timed out".format(
+                    len(keys)
+                )
+            )
+        return len(keys)
 
-            if not payload_json_str:
-                logger.error("No results in payload")
-                self.increase_lambda_invocation_error()
-                time.sleep(2)
-                continue
+    def request_event_results(self, target, lambda_payload, lane, function_start_time):
+        """
+        Invokes the target Lambda function asynchronously and waits for its results
+        to arrive in the results sink. Returns the results and the time they arrived
+        twice, or None if the invocation failed.
+        """
+        invocation_id = "{0}-{1}".format(self.run_id, uuid.uuid4().hex)
+        self.results_collector.expect(invocation_id)
+
+        try:
+            self.logger.info("Invoking lambda asynchronously...")
+            target["lambda_client"].invoke(
+                FunctionName=target["function_name"],
+                InvocationType="Event",
+                Payload=json.dumps(
+                    dict(
+                        lambda_payload,
+                        results_sink=self.results_sink.url,
+                        invocation_id=invocation_id,
+                    )
+                ),
+            )
+        except Exception as e:
+            self.results_collector.forget(invocation_id)
+            self.logger.critical("Lambda invocation failed: {0}".format(repr(e)))
+            self.trace_invocation(lane, function_start_time, time.time(), error=repr(e))
+            return None
+
+        results = self.results_collector.wait(
+            invocation_id, timeout=self.lambda_timeout / 1000.0 + self.results_timeout
+        )
+        function_end_time = time.time()
+
+        self.increase_lambda_invocation_count()
 
-            results = json.loads(payload_json_str)
-            function_duration = function_end_time - function_start_time
-            total_rpm = results["num_requests"] / (function_duration / 60)
-            lambda_execution_time = self.lambda_timeout - results["remaining_time"]
-
-            self.append_locust_results(results)
-            self.increase_requests_fail(results["num_requests_fail"])
-            self.increase_requests_total(results["num_requests"])
-            self.update_thread_data(thread_id, "rpm", total_rpm)
-            self.update_thread_data(
-                thread_id, "lambda_execution_time", lambda_execution_time
+        if results is None or "error" in results:
+            error = results["error"] if results else "No results in sink"
+            logger.error("error in invocation {0}: {1}".format(invocation_id, error))
+            self.increase_lambda_invocation_error()
+            self.trace_invocation(
+                lane, function_start_time, function_end_time, error=error
             )
-            self.increase_lambda_execution_time(lambda_execution_time)
-
-            logger.info(
-                "Lambda invocation complete. Requests (errors): {0} ({1}), execution time: {2}ms, sleeping: {3}s".format(
-                    results["num_requests"],
-                    results["num_requests_fail"],
-                    lambda_execution_time,
-                    sleep_time,
+            return None
+
+        return results, function_end_time, function_end_time
+
+    def collect_checkpoints(self, checkpoint_id):
+        """
+        Returns the checkpoints of an invocation and deletes them from the sink
+        """
+        checkpoints = []
+        try:
+            keys = self.checkpoint_sink.list_keys(checkpoint_prefix(checkpoint_id))
+            for key in keys:
+                checkpoints.append(self.checkpoint_sink.get(key))
+                self.checkpoint_sink.delete(key)
+        except Exception as e:
+            logger.error("Collecting checkpoints failed: {0}".format(repr(e)))
+        return checkpoints
+
+    def delete_checkpoints(self, checkpoint_id):
+        """
+        Deletes the checkpoints of an invocation from the sink without reading them.
+        With the run ID of the load test it deletes the checkpoints of all of its
+        invocations, as their checkpoint IDs start with it.
+        """
+        try:
+            for key in self.checkpoint_sink.list_keys(checkpoint_prefix(checkpoint_id)):
+                self.checkpoint_sink.delete(key)
+        except Exception as e:
+            logger.error("Deleting checkpoints failed: {0}".format(repr(e)))
+
+    def recover_checkpoints(self, target, checkpoint_id, function_start_time):
+        """
+        Adds the statistics in the checkpoints of a failed invocation to the results.
+        Returns the recovered results, or None if the invocation wrote no checkpoints.
+
+        If the invocation failed on the client side, e.g. the connection was lost,
+        the function may still be running and write further checkpoints. Their
+        statistics are not recovered, and the checkpoints are deleted at the end of
+        the load test unless they are written after it.
+        """
+        checkpoints = self.collect_checkpoints(checkpoint_id)
+        if not checkpoints:
+            return None
+
+        results = merge_checkpoints(checkpoints)
+        # the invocation is billed until it failed, usually at the Lambda timeout
+        lambda_execution_time = min(
+            self.lambda_timeout, (time.time() - function_start_time) * 1000
+        )
+        results["remaining_time"] = self.lambda_timeout - lambda_execution_time
+        # the memory size is unknown if the function didn't add it to the checkpoints
+        results.setdefault("memory_limit", 0)
+        results["target"] = {
+            "name": target["name"],
+            "function_name": target["function_name"],
+            "region": target["region"],
+        }
+
+        self.append_locust_results(results)
+        self.increase_requests_fail(results["num_requests_fail"])
+        self.increase_requests_total(results["num_requests"])
+        self.increase_lambda_execution_time(lambda_execution_time)
+        self.increase_lambda_recovered_count()
+        logger.warning(
+            "Recovered {0} requests of a failed invocation from {1} checkpoints".format(
+                results["num_requests"], len(checkpoints)
+            )
+        )
+        return results
+
+    def invoke_lambda(self, target, thread_id, lambda_payload):
+        """
+        Invokes the target Lambda function once and logs the results. Returns the
+        results, or None if the invocation failed.
+        """
+        lane = self.tracer.acquire_lane(thread_id) if self.tracer else None
+        try:
+            return self.invoke_lambda_traced(target, thread_id, lambda_payload, lane)
+        finally:
+            # freed even if the invocation raised, so later spans reuse the lane
+            if lane is not None:
+                self.tracer.release_lane(lane)
+
+    def invoke_lambda_traced(self, target, thread_id, lambda_payload, lane):
+        """
+        Invokes the target Lambda function once, records its spans in the lane and
+        logs the results. Returns the results, or None if the invocation failed.
+        """
+        function_start_time = time.time()
+
+        checkpoint_id = None
+        if self.checkpoint_sink:
+            checkpoint_id = "{0}-{1}".format(self.run_id, uuid.uuid4().hex)
+            lambda_payload = dict(
+                lambda_payload,
+                checkpoint_sink=self.checkpoint_sink.url,
+                checkpoint_id=checkpoint_id,
+                checkpoint_interval=self.checkpoint_interval,
+            )
+
+        if self.results_sink:
+            response = self.request_event_results(
+                target, lambda_payload, lane, function_start_time
+            )
+        else:
+            response = self.request_results(
+                target, lambda_payload, lane, function_start_time
+            )
+        if response is None:
+            if checkpoint_id:
+                self.recover_checkpoints(target, checkpoint_id, function_start_time)
+            return None
+        results, function_end_time, decode_end_time = response
+        if checkpoint_id:
+            self.delete_checkpoints(checkpoint_id)
+
+        results["target"] = {
+            "name": target["name"],
+            "function_name": target["function_name"],
+            "region": target["region"],
+        }
+        function_duration = function_end_time - function_start_time
+        if self.handoff_overlap and results.get("end_time"):
+            # invocations of a thread overlap, so the rpm is measured over the load
+            # test itself rather than the whole invocation
+            function_duration = results["end_time"] - results["start_time"]
+        total_rpm = results["num_requests"] / (max(function_duration, 0.001) / 60)
+        lambda_execution_time = self.lambda_timeout - results["remaining_time"]
+
+        self.append_locust_results(results)
+        self.increase_requests_fail(results["num_requests_fail"])
+        self.increase_requests_total(results["num_requests"])
+        self.update_thread_data(thread_id, "rpm", total_rpm)
+        self.update_thread_data(
+            thread_id, "lambda_execution_time", lambda_execution_time
+        )
+        self.increase_lambda_execution_time(lambda_execution_time)
+
+        if results.get("generator", {}).get("saturated"):
+            self.increase_lambda_saturated_count()
+            logger.warning(
+                "Load generator saturated in invocation {0}, cpu: {1}%, event loop lag p95: {2}ms. "
+                "Response times are inflated by the client.".format(
+                    results.get("aws_request_id"),
+                    round(results["generator"]["cpu_percent"]),
+                    round(results["generator"]["loop_lag_p95"]),
                 )
             )
-            time.sleep(sleep_time)
 
-        self.logger.info("thread finished")
+        if results.get("memory", {}).get("stopped_early"):
+            logger.warning(
+                "Invocation {0} stopped early at {1}MB of its {2}MB memory budget".format(
+                    results.get("aws_request_id"),
+                    round(results["memory"]["peak_rss_mb"]),
+                    results["memory"]["budget_mb"],
+                )
+            )
+
+        self.trace_invocation(
+            lane,
+            function_start_time,
+            function_end_time,
+            decode_end_time,
+            time.time(),
+            lambda_execution_time,
+            aws_request_id=results.get("aws_request_id"),
+            target=target["name"],
+        )
+
+        logger.info(
+            "Lambda invocation complete. Requests (errors): {0} ({1}), execution time: {2}ms".format(
+                results["num_requests"],
+                results["num_requests_fail"],
+                lambda_execution_time,
+            )
+        )
+        return results
 
     def run(self):
         """
@@ -322,45 +932,69 @@ class LambdaLoadTest(object):
         self.logger.info(
             "\nStarting load test..."
             f"\nFunction name: {self.lambda_function_name}"
+            f"\nTargets: {', '.join(t['name'] for t in self.targets)}"
             f"\nRamp time: {self.ramp_time}s"
             f"\nThreads: {self.threads}"
             f"\nLambda payload: {self.lambda_payload}"
             f"\nStart ramping down after: {self.time_limit}s"
         )
 
-        self.start_new_thread()
+        if self.results_collector:
+            self.configure_event_invocations()
+            self.results_collector.start()
 
-        while True:
-            self.logger.info(
-                "threads: {thread_count}, rpm: {rpm}, time elapsed: {time_elapsed}s, total requests from finished threads: {requests_total}, "
-                "request fail ratio: {request_fail_ratio}, invocation error ratio: {invocation_error_ratio}".format(
-                    **self.get_stats()
+        try:
+            if self.start_lead_time:
+                self.start_at = time.time() + self.start_lead_time
+                self.logger.info(
+                    "Starting all threads, load starts in {0}s".format(
+                        self.start_lead_time
+                    )
                 )
-            )
-
-            if self.thread_required():
+                for _ in range(self.threads):
+                    self.start_new_thread()
+            else:
                 self.start_new_thread()
 
-            if self.check_error_threshold():
-                self.stop_threads()
-                self.logger.info("Waiting for threads to exit...")
-                while self.get_thread_count() > 0:
-                    time.sleep(1)
-                else:
-                    break
-
-            if self.time_limit and self.get_time_elapsed() > self.time_limit:
-                self.logger.info("Time limit reached. Starting ramp down...")
-                self.stop_threads()
-
+            while True:
                 self.logger.info(
-                    "Waiting for all Lambdas to return. This may take up to {0}.".format(
-                        self.lambda_payload["run_time"]
+                    "threads: {thread_count}, rpm: {rpm}, time elapsed: {time_elapsed}s, total requests from finished threads: {requests_total}, "
+                    "request fail ratio: {request_fail_ratio}, invocation error ratio: {invocation_error_ratio}".format(
+                        **self.get_stats()
                     )
                 )
-                while self.get_thread_count() > 0:
-                    time.sleep(1)
-                else:
-                    break
 
-            time.sleep(self.print_stats_delay)
+                if self.thread_required():
+                    self.start_new_thread()
+
+                if self.check_error_threshold():
+                    self.stop_threads()
+                    self.logger.info("Waiting for threads to exit...")
+                    while self.get_thread_count() > 0:
+                        time.sleep(1)
+                    else:
+                        break
+
+                if self.time_limit and self.get_time_elapsed() > self.time_limit:
+                    self.logger.info("Time limit reached. Starting ramp down...")
+                    self.stop_threads()
+
+                    self.logger.info(
+                        "Waiting for all Lambdas to return. This may take up to {0}.".format(
+                            self.lambda_payload["run_time"]
+                        )
+                    )
+                    while self.get_thread_count() > 0:
+                        time.sleep(1)
+                    else:
+                        break
+
+                time.sleep(self.print_stats_delay)
+        finally:
+            if self.results_collector:
+                self.results_collector.stop()
+                self.delete_late_results()
+                self.restore_event_invocations()
+            if self.checkpoint_sink:
+                # checkpoints written after their invocation was recovered
+                self.delete_checkpoints(self.run_id)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+from collections import deque
+from .results_aggregator import response_time_percentile
+
+
+def print_stat(type, name, rps, fail_ratio, p50, p95, p99):
+    return "%-7s %-50s %10s %9s %9s %9s %9s" % (
+        type,
+        name,
+        rps,
+        fail_ratio,
+        p50,
+        p95,
+        p99,
+    )
+
+
+class RollingStats(object):
+    """
+    Per task statistics over a rolling window of the most recent Lambda invocation
+    results.
+
+    Each result is added to running totals when it arrives and subtracted again when
+    it leaves the window, so the cost of adding a result does not depend on how many
+    results have been received.
+    """
+
+    def __init__(self, window=180):
+        self.window = window
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.results = deque()
+        self.tasks = {}
+
+    def _apply(self, task_results, sign):
+        for task, (num_requests, num_failures, response_times) in task_results.items():
+            totals = self.tasks.setdefault(
+                task, {"num_requests": 0, "num_failures": 0, "response_times": {}}
+            )
+            totals["num_requests"] += sign * num_requests
+            totals["num_failures"] += sign * num_failures
+            counts = totals["response_times"]
+            for response_time, count in response_times.items():
+                counts[response_time] = counts.get(response_time, 0) + sign * count
+                if not counts[response_time]:
+                    del counts[response_time]
+            if not totals["num_requests"]:
+                del self.tasks[task]
+
+    def _expire(self, now):
+        while self.results and self.results[0][0] < now - self.window:
+            _, task_results = self.results.popleft()
+            self._apply(task_results, -1)
+
+    def add_result(self, results, timestamp=None):
+        """
+        Adds the results of a single LocustLoadTest to the window
+        """
+        now = timestamp or time.time()
+        task_results = {}
+        for task, data in results["requests"].items():
+            task_results[task] = (
+                data["num_requests"],
+                data.get("num_failures", 0),
+                {
+                    int(float(key)): value
+                    for key, value in (data["response_times"] or {}).items()
+                },
+            )
+
+        with self.lock:
+            self.results.append((now, task_results))
+            self._apply(task_results, 1)
+            self._expire(now)
+
+    def get_stats(self, timestamp=None):
+        """
+        Returns per task requests per second, failure ratio and response time
+        percentiles over the window in a dict
+        """
+        now = timestamp or time.time()
+        with self.lock:
+            self._expire(now)
+            window = max(min(self.window, now - self.start_time), 1)
+            stats = {}
+            for task, totals in self.tasks.items():
+                counts = totals["response_times"]
+                stats[task] = {
+                    "rps": totals["num_requests"] / float(window),
+                    "fail_ratio": totals["num_failures"]
+                    / float(max(totals["num_requests"], 1)),
+                    "p50": response_time_percentile(counts, 0.5),
+                    "p95": response_time_percentile(counts, 0.95),
+                    "p99": response_time_percentile(counts, 0.99),
+                }
+            return stats
+
+    def render(self, summary=None):
+        """
+        Returns the current statistics as a table in a string
+
+        arguments
+
+        summary: optional dict from LambdaLoadTest.get_stats() to show above the table
+        """
+        lines = []
+        if summary:
+            lines.append(
+                "threads: {thread_count}, rpm: {rpm}, time elapsed: {time_elapsed}s, "
+                "total requests: {requests_total}, request fail ratio: {request_fail_ratio}, "
+                "invocation error ratio: {invocation_error_ratio}".format(**summary)
+            )
+        lines.append("Rolling window: {0}s".format(self.window))
+        lines.append(
+            print_stat("TYPE", "NAME", "#REQS/SEC", "FAIL%", "P50", "P95", "P99")
+        )
+        for task, stats in sorted(self.get_stats().items()):
+            type, _, name = task.partition("_")
+            lines.append(
+                print_stat(
+                    type,
+                    name,
+                    round(stats["rps"], 2),
+                    round(stats["fail_ratio"] * 100, 2),
+                    stats["p50"],
+                    stats["p95"],
+                    stats["p99"],
+                )
+            )
+        return "\n".join(lines)
@@ -1,122 +1,611 @@
 # -*- coding: utf-8 -*-
 
+import math
 from numpy import histogram
+from ..cardinality import OVERFLOW_EXAMPLES
+from ..failures import cap_failures, merge_failures
+from ..sampling import merge_request_samples
 
+PERCENTILES = [50, 55, 65, 75, 85, 95, 99]
 
-def results_aggregator(results, lambda_timeout=300000):
+# number of IDs of saturated invocations kept, the rest are only counted
+SATURATED_INVOCATION_IDS = 100
+
+# AWS Lambda x86 pricing, billed per 1ms of duration
+DOLLAR_COST_PER_GB_SECOND = 0.0000166667
+DOLLAR_COST_PER_INVOCATION = 0.0000002
+
+
+def merge_response_time_counts(response_times):
     """
-    Takes a list of many individual results and returns a dictionary of aggregated
-    data.
+    Merges a list of LocustLoadTest response_times dicts into a dict of response time
+    to request count. Keys may be strings after a JSON round trip.
+    """
+    counts = {}
+    for r_time in response_times:
+        for key, value in r_time.items():
+            key = int(float(key))
+            counts[key] = counts.get(key, 0) + value
+    return counts
+
+
+def response_time_percentile(counts, percent):
+    """
+    Returns the response time that a percentage of requests finished within. This
+    works the same way as Locust so results are comparable.
 
     arguments
 
-    results: A list of results from LocustLoadTest.stats()
+    counts: A dict of response time to request count
+    percent: The percentile to calculate in the range 0.0 - 1.0
+    """
+    num_requests = sum(counts.values())
+    num_of_request = int(num_requests * percent)
+
+    processed_count = 0
+    for response_time in sorted(counts.keys(), reverse=True):
+        processed_count += counts[response_time]
+        if num_requests - processed_count <= num_of_request:
+            return response_time
+    return 0
+
+
+def calculate_gb_seconds(execution_time, memory_limit):
+    """
+    Returns the billed GB-seconds of a Lambda invocation
+
+    arguments
+
+    execution_time: execution time of the invocation in milliseconds
+    memory_limit: memory size of the function in MB
+    """
+    return math.ceil(execution_time) / 1000.0 * int(memory_limit) / 1024.0
+
+
+def calculate_lambda_cost(
+    gb_seconds,
+    invocation_count,
+    cost_per_gb_second=DOLLAR_COST_PER_GB_SECOND,
+    cost_per_invocation=DOLLAR_COST_PER_INVOCATION,
+):
+    """
+    Returns the approximate dollar cost of Lambda invocations
     """
+    return gb_seconds * cost_per_gb_second + invocation_count * cost_per_invocation
+
+
+def _mean(total, count):
+    return float(total) / max(count, 1)
+
+
+def _min(values):
+    values = [value for value in values if value is not None]
+    return min(values) if values else None
+
+
+def _max(values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
 
-    def _flatten_unique(list_of_lists):
-        l_flat = sum(list_of_lists, [])
-        l_unique = list(set(l_flat))
-        return l_unique
+def _sum_key(data, key):
+    return sum([d[key] for d in data])
 
-    def _mean(numbers):
-        return float(sum(numbers)) / max(len(numbers), 1)
 
-    def _merge_response_times(response_times):
-        flat_list = []
-        for r_time in response_times:
-            for key, value in r_time.items():
-                flat_list.extend([int(float(key))] * value)
-        hist, bins = histogram(flat_list)
-        return {
-            "histogram": hist.tolist(),
-            "bins": bins.tolist(),
+def _invocation_partial(stat, lambda_timeout):
+    """
+    Returns the partial aggregate of a single result from LocustLoadTest.stats()
+    """
+    execution_time = lambda_timeout - stat["remaining_time"]
+    gb_seconds = calculate_gb_seconds(execution_time, stat["memory_limit"])
+    requests_per_gb_second = [stat["num_requests"] / gb_seconds] if gb_seconds else []
+
+    partial = {
+        "lambda_invocations": 1,
+        "num_requests": stat["num_requests"],
+        "num_requests_fail": stat["num_requests_fail"],
+        "total_lambda_execution_time": execution_time,
+        "gb_seconds": gb_seconds,
+        "invocation_requests_per_gb_second": {
+            "min": _min(requests_per_gb_second),
+            "max": _max(requests_per_gb_second),
+            "sum": sum(requests_per_gb_second),
+            "count": len(requests_per_gb_second),
+        },
+        "requests": {},
+        "failures": stat["failures"],
+    }
+
+    for task, data in stat["requests"].items():
+        partial["requests"][task] = {
+            "invocations": 1,
+            "num_requests": data["num_requests"],
+            "total_rps_sum": data["total_rps"],
+            # weighted by the number of requests, so that the mean is over all requests
+            "response_time_total": data["avg_response_time"] * data["num_requests"],
+            "min_response_time": data["min_response_time"],
+            "max_response_time": data["max_response_time"],
+            "response_time_counts": merge_response_time_counts(
+                [data["response_times"]] if data["response_times"] is not None else []
+            ),
         }
 
-    def _get_min(data, key):
-        try:
-            return min([r[key] for r in data if r[key] is not None])
-        except ValueError:
-            return 0
-
-    def _get_max(data, key):
-        try:
-            return max([r[key] for r in data if r[key] is not None])
-        except ValueError:
-            return 0
-
-    def _calculate_aws_lambda_cost(
-        total_execution_time, memory_limit, invocation_count
-    ):
-        dollar_cost_per_128mb_100ms = 0.000000208
-        dollar_cost_per_invocation = 0.0000002
-        memory_cost_multiplier = int(memory_limit) / 128.0
-        time_in_100ms_lots = int(total_lambda_execution_time / 100.0)
-        invocation_cost = invocation_count * 0.0000002
-        execution_time_cost = (
-            time_in_100ms_lots * dollar_cost_per_128mb_100ms * memory_cost_multiplier
-        )
-        return invocation_cost + execution_time_cost
+    generator = stat.get("generator")
+    if generator:
+        partial["generator"] = {
+            "invocations": 1,
+            "cpu_percent_sum": generator["cpu_percent"],
+            "cpu_percent_max": generator["cpu_percent_max"],
+            "loop_lag_avg_sum": generator["loop_lag_avg"],
+            "loop_lag_max": generator["loop_lag_max"],
+            "scheduling_delay_max": generator["scheduling_delay_max"],
+            "saturated_invocations": 1 if generator["saturated"] else 0,
+            "saturated_invocation_ids": (
+                [stat.get("aws_request_id")] if generator["saturated"] else []
+            ),
+        }
+
+    memory = stat.get("memory")
+    if memory:
+        partial["memory"] = {
+            "invocations": 1,
+            "peak_rss_mb_max": memory["peak_rss_mb"],
+            "headroom_mb_min": memory["headroom_mb"],
+            "headroom_percent_min": memory["headroom_percent"],
+            "throttled_invocations": 1 if memory["throttled"] else 0,
+            "stopped_invocations": 1 if memory["stopped_early"] else 0,
+        }
+
+    if stat.get("request_sample"):
+        partial["request_sample"] = stat["request_sample"]
+
+    arrivals = stat.get("arrivals")
+    if arrivals:
+        partial["arrivals"] = {
+            "arrivals": arrivals["arrivals"],
+            "dropped": arrivals["dropped"],
+            "late": arrivals["late"],
+            "max_lateness": arrivals["max_lateness"],
+            "max_in_flight_reached": arrivals["max_in_flight_reached"],
+            "intended_response_times": {
+                task: merge_response_time_counts([data["response_times"]])
+                for task, data in arrivals["intended_response_times"].items()
+            },
+        }
+
+    names = stat.get("names")
+    if names:
+        partial["names"] = {
+            "max_names": names["max_names"],
+            "templated_requests": names["templated_requests"],
+            "overflow_requests": names["overflow_requests"],
+            "overflow_invocations": 1 if names["overflow_requests"] else 0,
+            "overflow_examples": names["overflow_examples"],
+        }
+
+    warmup = stat.get("warmup")
+    if warmup:
+        partial["warmup"] = {
+            "invocations": 1,
+            "num_requests": warmup.get("num_requests", 0),
+            "num_requests_fail": warmup.get("num_requests_fail", 0),
+            "resolve_time_max": _max(warmup.get("resolve_time", {}).values()),
+            "connect_time_max": _max(warmup.get("connect_time", {}).values()),
+        }
+
+    if stat.get("recovered_checkpoints"):
+        partial["recovered"] = {
+            "invocations": 1,
+            "checkpoints": stat["recovered_checkpoints"],
+            "num_requests": stat["num_requests"],
+        }
+
+    if stat.get("start_skew") is not None:
+        partial["start_skew"] = {
+            "invocations": 1,
+            "min": stat["start_skew"],
+            "max": stat["start_skew"],
+            "sum": stat["start_skew"],
+        }
+
+    profile = stat.get("profile")
+    if profile:
+        partial["profile"] = {
+            "invocations": 1,
+            "samples": profile["samples"],
+            "idle_samples": profile["idle_samples"],
+            "sample_time": profile["sample_time"],
+            "functions": profile["functions"],
+        }
+
+    return partial
+
+
+def _merge_requests(requests_list):
+    merged = {}
+    for requests in requests_list:
+        for task, data in requests.items():
+            merged.setdefault(task, []).append(data)
+    return {
+        task: {
+            "invocations": _sum_key(data, "invocations"),
+            "num_requests": _sum_key(data, "num_requests"),
+            "total_rps_sum": _sum_key(data, "total_rps_sum"),
+            "response_time_total": _sum_key(data, "response_time_total"),
+            "min_response_time": _min([d["min_response_time"] for d in data]),
+            "max_response_time": _max([d["max_response_time"] for d in data]),
+            "response_time_counts": merge_response_time_counts(
+                [d["response_time_counts"] for d in data]
+            ),
+        }
+        for task, data in merged.items()
+    }
+
+
+def _merge_generators(generators):
+    return {
+        "invocations": _sum_key(generators, "invocations"),
+        "cpu_percent_sum": _sum_key(generators, "cpu_percent_sum"),
+        "cpu_percent_max": max([g["cpu_percent_max"] for g in generators]),
+        "loop_lag_avg_sum": _sum_key(generators, "loop_lag_avg_sum"),
+        "loop_lag_max": max([g["loop_lag_max"] for g in generators]),
+        "scheduling_delay_max": max([g["scheduling_delay_max"] for g in generators]),
+        "saturated_invocations": _sum_key(generators, "saturated_invocations"),
+        "saturated_invocation_ids": sum(
+            [g["saturated_invocation_ids"] for g in generators], []
+        )[:SATURATED_INVOCATION_IDS],
+    }
+
+
+def _merge_memory(memory_list):
+    return {
+        "invocations": _sum_key(memory_list, "invocations"),
+        "peak_rss_mb_max": max([m["peak_rss_mb_max"] for m in memory_list]),
+        "headroom_mb_min": _min([m["headroom_mb_min"] for m in memory_list]),
+        "headroom_percent_min": _min([m["headroom_percent_min"] for m in memory_list]),
+        "throttled_invocations": _sum_key(memory_list, "throttled_invocations"),
+        "stopped_invocations": _sum_key(memory_list, "stopped_invocations"),
+    }
+
+
+def _merge_arrivals(arrivals_list):
+    tasks = {}
+    for arrivals in arrivals_list:
+        for task, counts in arrivals["intended_response_times"].items():
+            tasks.setdefault(task, []).append(counts)
+    return {
+        "arrivals": _sum_key(arrivals_list, "arrivals"),
+        "dropped": _sum_key(arrivals_list, "dropped"),
+        "late": _sum_key(arrivals_list, "late"),
+        "max_lateness": max([a["max_lateness"] for a in arrivals_list]),
+        "max_in_flight_reached": max(
+            [a["max_in_flight_reached"] for a in arrivals_list]
+        ),
+        "intended_response_times": {
+            task: merge_response_time_counts(counts) for task, counts in tasks.items()
+        },
+    }
+
+
+def _merge_names(names_list):
+    overflow_examples = []
+    for names in names_list:
+        for name in names["overflow_examples"]:
+            if (
+                name not in overflow_examples
+                and len(overflow_examples) < OVERFLOW_EXAMPLES
+            ):
+                overflow_examples.append(name)
+    return {
+        "max_names": max([names["max_names"] for names in names_list]),
+        "templated_requests": _sum_key(names_list, "templated_requests"),
+        "overflow_requests": _sum_key(names_list, "overflow_requests"),
+        "overflow_invocations": _sum_key(names_list, "overflow_invocations"),
+        "overflow_examples": overflow_examples,
+    }
+
+
+def _merge_warmups(warmups):
+    return {
+        "invocations": _sum_key(warmups, "invocations"),
+        "num_requests": _sum_key(warmups, "num_requests"),
+        "num_requests_fail": _sum_key(warmups, "num_requests_fail"),
+        "resolve_time_max": _max([w["resolve_time_max"] for w in warmups]),
+        "connect_time_max": _max([w["connect_time_max"] for w in warmups]),
+    }
+
+
+def _merge_recovered(recovered_list):
+    return {
+        "invocations": _sum_key(recovered_list, "invocations"),
+        "checkpoints": _sum_key(recovered_list, "checkpoints"),
+        "num_requests": _sum_key(recovered_list, "num_requests"),
+    }
 
-    request_tasks = _flatten_unique([list(stat["requests"].keys()) for stat in results])
-    failed_tasks = _flatten_unique([list(stat["failures"].keys()) for stat in results])
-    total_lambda_execution_time = sum(
-        [(lambda_timeout - stat["remaining_time"]) for stat in results]
+
+def _merge_start_skews(start_skews):
+    return {
+        "invocations": _sum_key(start_skews, "invocations"),
+        "min": min([s["min"] for s in start_skews]),
+        "max": max([s["max"] for s in start_skews]),
+        "sum": _sum_key(start_skews, "sum"),
+    }
+
+
+def _merge_profiles(profiles):
+    functions = {}
+    for profile in profiles:
+        for key, value in profile["functions"].items():
+            if key not in functions:
+                functions[key] = {stat: 0 for stat in value}
+            for stat in value:
+                functions[key][stat] += value[stat]
+    return {
+        "invocations": _sum_key(profiles, "invocations"),
+        "samples": _sum_key(profiles, "samples"),
+        "idle_samples": _sum_key(profiles, "idle_samples"),
+        "sample_time": _sum_key(profiles, "sample_time"),
+        "functions": functions,
+    }
+
+
+# optional parts of a partial aggregate and the functions merging them
+PARTIAL_SECTIONS = [
+    ("generator", _merge_generators),
+    ("memory", _merge_memory),
+    ("request_sample", merge_request_samples),
+    ("arrivals", _merge_arrivals),
+    ("names", _merge_names),
+    ("warmup", _merge_warmups),
+    ("recovered", _merge_recovered),
+    ("start_skew", _merge_start_skews),
+    ("profile", _merge_profiles),
+]
+
+
+def merge_partial_aggregates(partials):
+    """
+    Merges a list of partial aggregates into one partial aggregate.
+
+    Partial aggregates only hold counts, sums, minimums, maximums, response time
+    counts and bottom-k request samples, so they can be merged in any grouping, e.g.
+    per orchestrator host and then across hosts, and finalize_aggregate returns the
+    same results as a single pass over all of the individual results. Partial
+    aggregates can be written to JSON and read back before merging.
+
+    arguments
+
+    partials: A list of partial aggregates from partial_aggregate or this function
+    """
+    merged = {
+        "lambda_invocations": _sum_key(partials, "lambda_invocations"),
+        "num_requests": _sum_key(partials, "num_requests"),
+        "num_requests_fail": _sum_key(partials, "num_requests_fail"),
+        "total_lambda_execution_time": _sum_key(
+            partials, "total_lambda_execution_time"
+        ),
+        "gb_seconds": _sum_key(partials, "gb_seconds"),
+        "invocation_requests_per_gb_second": {
+            "min": _min(
+                [p["invocation_requests_per_gb_second"]["min"] for p in partials]
+            ),
+            "max": _max(
+                [p["invocation_requests_per_gb_second"]["max"] for p in partials]
+            ),
+            "sum": sum(
+                [p["invocation_requests_per_gb_second"]["sum"] for p in partials]
+            ),
+            "count": sum(
+                [p["invocation_requests_per_gb_second"]["count"] for p in partials]
+            ),
+        },
+        "requests": _merge_requests([p["requests"] for p in partials]),
+        "failures": merge_failures([p["failures"] for p in partials]),
+    }
+    for key, merge in PARTIAL_SECTIONS:
+        sections = [p[key] for p in partials if p.get(key)]
+        if sections:
+            merged[key] = merge(sections)
+    return merged
+
+
+def partial_aggregate(results, lambda_timeout=300000):
+    """
+    Takes a list of many individual results and returns a partial aggregate that can
+    be merged with other partial aggregates by merge_partial_aggregates and turned
+    into aggregated results by finalize_aggregate.
+
+    arguments
+
+    results: A list of results from LocustLoadTest.stats()
+    """
+    return merge_partial_aggregates(
+        [_invocation_partial(stat, lambda_timeout) for stat in results]
     )
-    memory_limit = _get_max(results, "memory_limit")
+
+
+def _finalize_counts(counts):
+    counts = merge_response_time_counts([counts])
+    return {
+        "response_time_counts": counts,
+        "response_time_percentiles": {
+            percentile: response_time_percentile(counts, percentile / 100.0)
+            for percentile in PERCENTILES
+        },
+    }
+
+
+def _response_times_histogram(counts):
+    hist, bins = histogram(list(counts.keys()), weights=list(counts.values()))
+    return {
+        "histogram": hist.astype(int).tolist(),
+        "bins": bins.tolist(),
+    }
+
+
+def _finalize_profile(profile, top):
+    functions = profile["functions"]
+    hottest = set()
+    for stat in ["self_time", "cumulative_time"]:
+        hottest.update(
+            sorted(functions, key=lambda k: functions[k][stat], reverse=True)[:top]
+        )
+    return dict(profile, functions={key: functions[key] for key in hottest})
+
+
+def finalize_aggregate(partial, profile_top=20, max_failures=50):
+    """
+    Returns the aggregated results of a partial aggregate, in the same format as
+    results_aggregator. The failures and profile limits are applied here, after all
+    partial aggregates have been merged.
+
+    arguments
+
+    partial: A partial aggregate from partial_aggregate or merge_partial_aggregates
+    profile_top: Number of hottest functions to keep when merging profiles
+    max_failures: Number of most frequent failures to keep, the rest are counted in an "other" entry
+    """
+    num_requests = partial["num_requests"]
+    gb_seconds = partial["gb_seconds"]
+    approximate_cost = calculate_lambda_cost(gb_seconds, partial["lambda_invocations"])
+    requests_per_gb_second = partial["invocation_requests_per_gb_second"]
 
     agg_results = {
-        "requests": {key: {} for key in request_tasks},
-        "failures": {key: {} for key in failed_tasks},
-        "num_requests": sum([stat["num_requests"] for stat in results]),
-        "num_requests_fail": sum([stat["num_requests_fail"] for stat in results]),
-        "total_lambda_execution_time": total_lambda_execution_time,
-        "lambda_invocations": len(results),
-        "approximate_cost": _calculate_aws_lambda_cost(
-            total_lambda_execution_time, memory_limit, len(results)
+        "requests": {},
+        "failures": cap_failures(partial["failures"], max_failures),
+        "num_requests": num_requests,
+        "num_requests_fail": partial["num_requests_fail"],
+        "total_lambda_execution_time": partial["total_lambda_execution_time"],
+        "lambda_invocations": partial["lambda_invocations"],
+        "gb_seconds": gb_seconds,
+        "approximate_cost": approximate_cost,
+        "requests_per_gb_second": (num_requests / gb_seconds if gb_seconds else 0),
+        "requests_per_dollar": (
+            num_requests / approximate_cost if approximate_cost else 0
         ),
+        "invocation_requests_per_gb_second": {
+            "min": requests_per_gb_second["min"] or 0,
+            "mean": _mean(
+                requests_per_gb_second["sum"], requests_per_gb_second["count"]
+            ),
+            "max": requests_per_gb_second["max"] or 0,
+        },
     }
 
-    for task in request_tasks:
-        task_data_results = [
-            stat["requests"][task] for stat in results if task in stat["requests"]
-        ]
+    generator = partial.get("generator")
+    if generator:
+        agg_results["generator"] = {
+            "cpu_percent": _mean(
+                generator["cpu_percent_sum"], generator["invocations"]
+            ),
+            "cpu_percent_max": generator["cpu_percent_max"],
+            "loop_lag_avg": _mean(
+                generator["loop_lag_avg_sum"], generator["invocations"]
+            ),
+            "loop_lag_max": generator["loop_lag_max"],
+            "scheduling_delay_max": generator["scheduling_delay_max"],
+            "saturated_invocations": generator["saturated_invocations"],
+            "saturated_invocation_ids": generator["saturated_invocation_ids"],
+        }
+
+    if partial.get("memory"):
+        agg_results["memory"] = partial["memory"]
 
-        for mean_stat in ["median_response_time", "total_rps", "avg_response_time"]:
-            agg_results["requests"][task][mean_stat] = _mean(
-                [data[mean_stat] for data in task_data_results]
-            )
+    if partial.get("request_sample"):
+        agg_results["request_sample"] = partial["request_sample"]
 
-        agg_results["requests"][task]["max_response_time"] = _get_max(
-            task_data_results, "max_response_time"
-        )
-        agg_results["requests"][task]["min_response_time"] = _get_min(
-            task_data_results, "min_response_time"
-        )
-        agg_results["requests"][task]["response_times"] = _merge_response_times(
-            [
-                data["response_times"]
-                for data in task_data_results
-                if data["response_times"] is not None
-            ]
-        )
-        agg_results["requests"][task]["total_rpm"] = (
-            agg_results["requests"][task]["total_rps"] * 60
-        )
-        agg_results["requests"][task]["num_requests"] = sum(
-            [
-                stat["requests"][task]["num_requests"]
-                for stat in results
-                if task in stat["requests"]
-            ]
+    arrivals = partial.get("arrivals")
+    if arrivals:
+        agg_results["arrivals"] = dict(
+            arrivals,
+            dropped_ratio=arrivals["dropped"] / float(max(arrivals["arrivals"], 1)),
+            intended_response_times={
+                task: _finalize_counts(counts)
+                for task, counts in arrivals["intended_response_times"].items()
+            },
         )
 
-    for task in failed_tasks:
-        task_data_results = [
-            stat["failures"][task] for stat in results if task in stat["failures"]
-        ]
-        agg_results["failures"][task] = task_data_results[0]
-        agg_results["failures"][task]["occurrences"] = sum(
-            [stat["occurrences"] for stat in task_data_results]
+    if partial.get("names"):
+        agg_results["names"] = dict(partial["names"], names=len(partial["requests"]))
+
+    if partial.get("warmup"):
+        agg_results["warmup"] = partial["warmup"]
+
+    if partial.get("recovered"):
+        agg_results["recovered"] = partial["recovered"]
+
+    start_skew = partial.get("start_skew")
+    if start_skew:
+        agg_results["start_skew"] = {
+            "min": start_skew["min"],
+            "mean": _mean(start_skew["sum"], start_skew["invocations"]),
+            "max": start_skew["max"],
+            "spread": start_skew["max"] - start_skew["min"],
+            "invocations": start_skew["invocations"],
+        }
+
+    if partial.get("profile"):
+        agg_results["profile"] = _finalize_profile(partial["profile"], profile_top)
+
+    for task, data in partial["requests"].items():
+        task_results = _finalize_counts(data["response_time_counts"])
+        counts = task_results["response_time_counts"]
+        total_rps = _mean(data["total_rps_sum"], data["invocations"])
+        task_results.update(
+            {
+                "total_rps": total_rps,
+                "avg_response_time": _mean(
+                    data["response_time_total"], data["num_requests"]
+                ),
+                "max_response_time": data["max_response_time"] or 0,
+                "min_response_time": data["min_response_time"] or 0,
+                "median_response_time": response_time_percentile(counts, 0.5),
+                "response_times": _response_times_histogram(counts),
+                "total_rpm": total_rps * 60,
+                "num_requests": data["num_requests"],
+            }
         )
+        agg_results["requests"][task] = task_results
 
     return agg_results
+
+
+def results_aggregator(results, lambda_timeout=300000, profile_top=20, max_failures=50):
+    """
+    Takes a list of many individual results and returns a dictionary of aggregated
+    data.
+
+    arguments
+
+    results: A list of results from LocustLoadTest.stats()
+    profile_top: Number of hottest functions to keep when merging profiles
+    max_failures: Number of most frequent failures to keep, the rest are counted in an "other" entry
+    """
+    return finalize_aggregate(
+        partial_aggregate(results, lambda_timeout=lambda_timeout),
+        profile_top=profile_top,
+        max_failures=max_failures,
+    )
+
+
+def results_aggregator_by_target(results, key="region", **kwargs):
+    """
+    Takes a list of many individual results from LambdaLoadTest and returns a
+    dictionary of aggregated data for each target region, name or function name.
+
+    arguments
+
+    results: A list of results from LambdaLoadTest.get_locust_results()
+    key: The target attribute to group by, one of region, name or function_name
+
+    Other arguments are passed to results_aggregator.
+    """
+    grouped_results = {}
+    for stat in results:
+        group = (stat.get("target") or {}).get(key) or "default"
+        grouped_results.setdefault(group, []).append(stat)
+
+    return {
+        group: results_aggregator(group_results, **kwargs)
+        for group, group_results in grouped_results.items()
+    }
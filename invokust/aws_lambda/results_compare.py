@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import math
+from .results_aggregator import (
+    results_aggregator,
+    merge_response_time_counts,
+    response_time_percentile,
+)
+
+AGGREGATED_RESULTS_PREFIX = "Aggregated results: "
+
+
+def load_results(path):
+    """
+    Returns aggregated results from a file or a directory.
+
+    arguments
+
+    path: A JSON file of aggregated results, a log file containing an "Aggregated
+          results" line from invokr, or a directory of JSON files each containing the
+          results of a single LocustLoadTest which are then aggregated
+    """
+    if os.path.isdir(path):
+        results = []
+        for file_name in sorted(os.listdir(path)):
+            if file_name.endswith(".json"):
+                with open(os.path.join(path, file_name)) as f:
+                    result = json.load(f)
+                # the Lambda function returns the results as a JSON string
+                results.append(
+                    json.loads(result) if isinstance(result, str) else result
+                )
+        return results_aggregator(results)
+
+    with open(path) as f:
+        content = f.read()
+
+    try:
+        return json.loads(content)
+    except ValueError:
+        for line in content.splitlines():
+            if AGGREGATED_RESULTS_PREFIX in line:
+                return json.loads(line.split(AGGREGATED_RESULTS_PREFIX, 1)[1])
+        raise ValueError("No aggregated results found in {0}".format(path))
+
+
+def _get_counts(task_results):
+    if "response_time_counts" in task_results:
+        return merge_response_time_counts([task_results["response_time_counts"]])
+    # aggregated results from older versions only contain a histogram
+    histogram = task_results["response_times"]
+    return merge_response_time_counts(
+        [dict(zip(histogram["bins"], histogram["histogram"]))]
+    )
+
+
+def mann_whitney_u(baseline, candidate):
+    """
+    Returns the Mann-Whitney U statistic and the one sided p-value that response
+    times in candidate are not larger than in baseline.
+
+    arguments
+
+    baseline, candidate: dicts of response time to request count
+    """
+    n_baseline = sum(baseline.values())
+    n_candidate = sum(candidate.values())
+    n_total = n_baseline + n_candidate
+    if not n_baseline or not n_candidate:
+        return 0, 1.0
+
+    rank = 0
+    candidate_rank_sum = 0
+    tie_correction = 0
+    for response_time in sorted(set(baseline) | set(candidate)):
+        ties = baseline.get(response_time, 0) + candidate.get(response_time, 0)
+        average_rank = rank + (ties + 1) / 2.0
+        candidate_rank_sum += average_rank * candidate.get(response_time, 0)
+        tie_correction += ties**3 - ties
+        rank += ties
+
+    u = candidate_rank_sum - n_candidate * (n_candidate + 1) / 2.0
+    mean = n_baseline * n_candidate / 2.0
+    variance = (
+        n_baseline
+        * n_candidate
+        / 12.0
+        * ((n_total + 1) - tie_correction / float(n_total * (n_total - 1) or 1))
+    )
+    if variance <= 0:
+        return u, 1.0
+    z = (u - mean) / math.sqrt(variance)
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def kolmogorov_smirnov(baseline, candidate):
+    """
+    Returns the two sample Kolmogorov-Smirnov statistic and its asymptotic p-value
+
+    arguments
+
+    baseline, candidate: dicts of response time to request count
+    """
+    n_baseline = float(sum(baseline.values()))
+    n_candidate = float(sum(candidate.values()))
+    if not n_baseline or not n_candidate:
+        return 0, 1.0
+
+    d = 0
+    cdf_baseline = 0
+    cdf_candidate = 0
+    for response_time in sorted(set(baseline) | set(candidate)):
+        cdf_baseline += baseline.get(response_time, 0) / n_baseline
+        cdf_candidate += candidate.get(response_time, 0) / n_candidate
+        d = max(d, abs(cdf_baseline - cdf_candidate))
+
+    en = math.sqrt(n_baseline * n_candidate / (n_baseline + n_candidate))
+    lam = (en + 0.12 + 0.11 / en) * d
+    if lam < 0.3:
+        return d, 1.0
+    p = 2 * sum(
+        (-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101)
+    )
+    return d, min(1.0, max(0.0, p))
+
+
+def _relative_change(baseline, candidate):
+    if not baseline:
+        return 0.0 if not candidate else float("inf")
+    return (candidate - baseline) / float(baseline)
+
+
+def _two_proportion_p_value(fail_baseline, n_baseline, fail_candidate, n_candidate):
+    """
+    Returns the one sided p-value that the candidate failure ratio is not larger
+    """
+    if not n_baseline or not n_candidate:
+        return 1.0
+    pooled = (fail_baseline + fail_candidate) / float(n_baseline + n_candidate)
+    variance = pooled * (1 - pooled) * (1.0 / n_baseline + 1.0 / n_candidate)
+    if variance <= 0:
+        return 1.0
+    z = (
+        fail_candidate / float(n_candidate) - fail_baseline / float(n_baseline)
+    ) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare_results(
+    baseline,
+    candidate,
+    alpha=0.01,
+    max_latency_increase=0.1,
+    max_throughput_decrease=0.1,
+    max_failure_ratio_increase=0.01,
+):
+    """
+    Compares two aggregated results and returns a dictionary of per task
+    comparisons and a list of significant regressions.
+
+    A task latency regression requires both a statistically significant shift of the
+    response time distribution (one sided Mann-Whitney U test) and an increase of the
+    median, 95th or 99th percentile larger than max_latency_increase, so that tiny
+    differences in very large samples are not reported.
+
+    Throughput is only compared against max_throughput_decrease. The aggregated
+    results don't keep the requests per second of each invocation, so there is no
+    significance test and throughput regressions are marked "threshold_only".
+
+    arguments
+
+    baseline: Aggregated results from results_aggregator to compare against
+    candidate: Aggregated results from results_aggregator to compare
+    alpha: Significance level of the statistical tests
+    max_latency_increase: Largest allowed relative increase of a response time percentile
+    max_throughput_decrease: Largest allowed relative decrease of requests per second
+    max_failure_ratio_increase: Largest allowed absolute increase of the request failure ratio
+    """
+    comparison = {"tasks": {}, "regressions": []}
+
+    for task in sorted(set(baseline["requests"]) | set(candidate["requests"])):
+        if task not in baseline["requests"] or task not in candidate["requests"]:
+            comparison["tasks"][task] = {
+                "missing_from": (
+                    "baseline" if task not in baseline["requests"] else "candidate"
+                )
+            }
+            continue
+
+        baseline_task = baseline["requests"][task]
+        candidate_task = candidate["requests"][task]
+        baseline_counts = _get_counts(baseline_task)
+        candidate_counts = _get_counts(candidate_task)
+
+        u, u_p_value = mann_whitney_u(baseline_counts, candidate_counts)
+        d, ks_p_value = kolmogorov_smirnov(baseline_counts, candidate_counts)
+        percentiles = {}
+        for percentile in [50, 95, 99]:
+            baseline_value = response_time_percentile(
+                baseline_counts, percentile / 100.0
+            )
+            candidate_value = response_time_percentile(
+                candidate_counts, percentile / 100.0
+            )
+            percentiles[percentile] = {
+                "baseline": baseline_value,
+                "candidate": candidate_value,
+                "change": _relative_change(baseline_value, candidate_value),
+            }
+        rps_change = _relative_change(
+            baseline_task["total_rps"], candidate_task["total_rps"]
+        )
+
+        task_comparison = {
+            "baseline_requests": sum(baseline_counts.values()),
+            "candidate_requests": sum(candidate_counts.values()),
+            "mann_whitney_u": u,
+            "mann_whitney_p_value": u_p_value,
+            "ks_statistic": d,
+            "ks_p_value": ks_p_value,
+            "response_time_percentiles": percentiles,
+            "total_rps_change": rps_change,
+        }
+        comparison["tasks"][task] = task_comparison
+
+        worst_percentile = max(percentiles, key=lambda p: percentiles[p]["change"])
+        if (
+            u_p_value < alpha
+            and percentiles[worst_percentile]["change"] > max_latency_increase
+        ):
+            comparison["regressions"].append(
+                {
+                    "task": task,
+                    "type": "latency",
+                    "percentile": worst_percentile,
+                    "change": percentiles[worst_percentile]["change"],
+                    "p_value": u_p_value,
+                }
+            )
+
+        if rps_change < -max_throughput_decrease:
+            comparison["regressions"].append(
+                {
+                    "task": task,
+                    "type": "throughput",
+                    "change": rps_change,
+                    "threshold_only": True,
+                }
+            )
+
+    baseline_fail_ratio = baseline["num_requests_fail"] / float(
+        max(baseline["num_requests"], 1)
+    )
+    candidate_fail_ratio = candidate["num_requests_fail"] / float(
+        max(candidate["num_requests"], 1)
+    )
+    fail_p_value = _two_proportion_p_value(
+        baseline["num_requests_fail"],
+        baseline["num_requests"],
+        candidate["num_requests_fail"],
+        candidate["num_requests"],
+    )
+    comparison["failure_ratio"] = {
+        "baseline": baseline_fail_ratio,
+        "candidate": candidate_fail_ratio,
+        "p_value": fail_p_value,
+    }
+    if (
+        fail_p_value < alpha
+        and candidate_fail_ratio - baseline_fail_ratio > max_failure_ratio_increase
+    ):
+        comparison["regressions"].append(
+            {
+                "task": None,
+                "type": "failure_ratio",
+                "change": candidate_fail_ratio - baseline_fail_ratio,
+                "p_value": fail_p_value,
+            }
+        )
+
+    return comparison
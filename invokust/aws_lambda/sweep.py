@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+from .lambda_load_test import LambdaLoadTest, client as default_client
+from .results_aggregator import results_aggregator
+
+logger = logging.getLogger(__name__)
+
+
+def wait_for_function_update(lambda_client, function_name, timeout=120):
+    """
+    Waits until a Lambda function configuration update has finished
+    """
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        configuration = lambda_client.get_function_configuration(
+            FunctionName=function_name
+        )
+        if configuration.get("LastUpdateStatus") != "InProgress":
+            return configuration
+        time.sleep(1)
+    raise Exception(
+        "Timed out waiting for update of Lambda function {0}".format(function_name)
+    )
+
+
+def memory_sweep(
+    lambda_function_name,
+    configurations,
+    threads,
+    ramp_time,
+    time_limit,
+    lambda_payload,
+    lambda_timeout=300000,
+    lambda_client=None,
+    print_stats_delay=3,
+):
+    """
+    Runs the same load test once for each Lambda function configuration and returns
+    a list of dicts with the aggregated results of each, ordered by requests per
+    dollar with the most efficient configuration first.
+
+    arguments
+
+    configurations: a list of function memory sizes in MB (int) and/or function
+                    aliases or versions (str). The function memory size is updated
+                    before each test and restored afterwards.
+    lambda_client: boto3 Lambda client, or a stand-in with the same methods
+
+    The other arguments are the same as for LambdaLoadTest.
+    """
+    load_test_client = lambda_client or default_client
+    original_memory_size = None
+    sweep_results = []
+
+    try:
+        for configuration in configurations:
+            function_name = lambda_function_name
+
+            if isinstance(configuration, int):
+                if original_memory_size is None:
+                    original_memory_size = load_test_client.get_function_configuration(
+                        FunctionName=lambda_function_name
+                    )["MemorySize"]
+                logger.info(
+                    "Setting memory size of {0} to {1}MB".format(
+                        lambda_function_name, configuration
+                    )
+                )
+                load_test_client.update_function_configuration(
+                    FunctionName=lambda_function_name, MemorySize=configuration
+                )
+                wait_for_function_update(load_test_client, lambda_function_name)
+            else:
+                function_name = "{0}:{1}".format(lambda_function_name, configuration)
+
+            load_test = LambdaLoadTest(
+                function_name,
+                threads,
+                ramp_time,
+                time_limit,
+                lambda_payload,
+                lambda_timeout=lambda_timeout,
+                lambda_client=load_test_client,
+                print_stats_delay=print_stats_delay,
+            )
+            load_test.run()
+
+            agg_results = results_aggregator(
+                load_test.get_locust_results(), lambda_timeout=lambda_timeout
+            )
+            sweep_results.append(
+                {
+                    "configuration": configuration,
+                    "lambda_function_name": function_name,
+                    "summary_stats": load_test.get_summary_stats(),
+                    "results": agg_results,
+                }
+            )
+            logger.info(
+                "Configuration {0}: {1} requests, {2} requests/GB-second, {3} requests/$".format(
+                    configuration,
+                    agg_results["num_requests"],
+                    round(agg_results["requests_per_gb_second"], 2),
+                    round(agg_results["requests_per_dollar"]),
+                )
+            )
+
+    finally:
+        if original_memory_size is not None:
+            load_test_client.update_function_configuration(
+                FunctionName=lambda_function_name, MemorySize=original_memory_size
+            )
+            wait_for_function_update(load_test_client, lambda_function_name)
+
+    return sorted(
+        sweep_results,
+        key=lambda result: result["results"]["requests_per_dollar"],
+        reverse=True,
+    )
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import threading
+from ..executor import round_response_time
+from .results_aggregator import response_time_percentile
+
+# phases of the orchestrator recorded in the overhead histograms
+TRACE_PHASES = ["invoke", "lambda_execution", "overhead", "decode", "record", "sleep"]
+
+TRACE_PERCENTILES = [50, 95, 99]
+
+
+class InvocationTracer(object):
+    """
+    Records what each slot (load test thread) of LambdaLoadTest is doing over time as
+    spans, and keeps histograms of the duration of each phase.
+
+    An invocation is recorded as an "invoke" span for the whole round trip, with the
+    Lambda execution time (lambda_timeout - remaining_time) inside it, followed by the
+    time taken to decode the response JSON and to record the results. The rest of the
+    round trip is the network and Lambda service overhead. It is split evenly before
+    and after the execution span as the clocks of the Lambda function and the
+    orchestrator can't be compared. Invocations of the same slot that overlap, with
+    handoff_overlap, are shown in separate lanes.
+
+    write() exports the spans in the Chrome trace event format, which can be opened
+    with Perfetto (https://ui.perfetto.dev) or chrome://tracing.
+    """
+
+    def __init__(self, max_events=1000000):
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.max_events = max_events
+        self.events = []
+        self.dropped_events = 0
+        self.lanes = {}
+        self.busy_lanes = set()
+        self.histograms = {phase: {} for phase in TRACE_PHASES}
+
+    def _timestamp(self, t):
+        return int((t - self.start_time) * 1000000)
+
+    def acquire_lane(self, slot):
+        """
+        Returns the lowest free lane of a slot and marks it busy until release_lane
+        """
+        with self.lock:
+            index = 0
+            while (slot, index) in self.busy_lanes:
+                index += 1
+            lane = (slot, index)
+            self.busy_lanes.add(lane)
+            if lane not in self.lanes:
+                self.lanes[lane] = len(self.lanes) + 1
+            return lane
+
+    def release_lane(self, lane):
+        with self.lock:
+            self.busy_lanes.discard(lane)
+
+    def span(self, lane, name, start_time, end_time, **args):
+        """
+        Records a span of a lane from start_time to end_time (Unix timestamps) and
+        adds its duration to the histogram of the phase
+        """
+        duration = max(0, end_time - start_time)
+        with self.lock:
+            if lane not in self.lanes:
+                self.lanes[lane] = len(self.lanes) + 1
+            self.add_to_histogram(name, duration * 1000)
+            if len(self.events) >= self.max_events:
+                self.dropped_events += 1
+                return
+            self.events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "pid": 1,
+                    "tid": self.lanes[lane],
+                    "ts": self._timestamp(start_time),
+                    "dur": int(duration * 1000000),
+                    "args": args,
+                }
+            )
+
+    def add_to_histogram(self, phase, duration):
+        counts = self.histograms.setdefault(phase, {})
+        duration = round_response_time(duration)
+        counts[duration] = counts.get(duration, 0) + 1
+
+    def add_invocation(
+        self,
+        lane,
+        invoke_start_time,
+        invoke_end_time,
+        decode_end_time=None,
+        record_end_time=None,
+        lambda_execution_time=None,
+        **args
+    ):
+        """
+        Records the spans of a single Lambda invocation
+
+        arguments
+
+        lane: lane from acquire_lane
+        invoke_start_time, invoke_end_time: Unix timestamps of the invoke call
+        decode_end_time: Unix timestamp after the response was decoded
+        record_end_time: Unix timestamp after the results were recorded
+        lambda_execution_time: execution time reported by the function (ms)
+        args: extra details shown with the invoke span, e.g. the error
+        """
+        self.span(lane, "invoke", invoke_start_time, invoke_end_time, **args)
+
+        if lambda_execution_time is not None:
+            round_trip = invoke_end_time - invoke_start_time
+            execution_time = min(lambda_execution_time / 1000.0, round_trip)
+            overhead = round_trip - execution_time
+            execution_start_time = invoke_start_time + overhead / 2
+            self.span(
+                lane,
+                "lambda_execution",
+                execution_start_time,
+                execution_start_time + execution_time,
+            )
+            with self.lock:
+                self.add_to_histogram("overhead", overhead * 1000)
+
+        if decode_end_time is not None:
+            self.span(lane, "decode", invoke_end_time, decode_end_time)
+        if record_end_time is not None:
+            self.span(lane, "record", decode_end_time, record_end_time)
+
+    def stats(self):
+        """
+        Returns the count, mean, maximum and percentiles (ms) of each phase in a dict
+        """
+        phases = {}
+        with self.lock:
+            histograms = {
+                phase: dict(counts) for phase, counts in self.histograms.items()
+            }
+            dropped_events = self.dropped_events
+        for phase, counts in histograms.items():
+            count = sum(counts.values())
+            phases[phase] = {
+                "count": count,
+                "mean": (
+                    sum(d * c for d, c in counts.items()) / float(count) if count else 0
+                ),
+                "max": max(counts, default=0),
+                "percentiles": {
+                    percentile: response_time_percentile(counts, percentile / 100.0)
+                    for percentile in TRACE_PERCENTILES
+                },
+                "histogram": counts,
+            }
+        return {"phases": phases, "dropped_events": dropped_events}
+
+    def trace_events(self):
+        """
+        Returns the recorded spans with the names of the lanes in the Chrome trace
+        event format
+        """
+        with self.lock:
+            events = list(self.events)
+            lanes = dict(self.lanes)
+        metadata = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": 1,
+                "args": {"name": "LambdaLoadTest"},
+            }
+        ]
+        for (slot, index), tid in lanes.items():
+            metadata.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": 1,
+                    "tid": tid,
+                    "args": {
+                        "name": slot if not index else "{0} ({1})".format(slot, index)
+                    },
+                }
+            )
+            metadata.append(
+                {
+                    "name": "thread_sort_index",
+                    "ph": "M",
+                    "pid": 1,
+                    "tid": tid,
+                    "args": {"sort_index": tid},
+                }
+            )
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        """
+        Writes the trace to a JSON file
+        """
+        with open(path, "w") as f:
+            json.dump(self.trace_events(), f)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+OVERFLOW_NAME = "<other>"
+
+# Patterns replacing the parts of request names that are unique per request, so
+# that URLs without a name= argument share one statistics entry
+DEFAULT_NAME_PATTERNS = [
+    (
+        r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}",
+        "<uuid>",
+    ),
+    (r"(?<=/)(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{16,}(?=[/?#.;]|$)", "<hex>"),
+    (r"(?<=/)\d+(?=[/?#.;]|$)", "<n>"),
+    (r"([?&][^=&#]+=)[^&#]+", r"\1<v>"),
+]
+
+# number of overflowed names kept as examples
+OVERFLOW_EXAMPLES = 10
+
+
+def compile_name_patterns(patterns=None):
+    """
+    Returns a list of compiled (regex, replacement) tuples. The default patterns are
+    used if patterns is None.
+    """
+    if patterns is None:
+        patterns = DEFAULT_NAME_PATTERNS
+    return [(re.compile(pattern), replacement) for pattern, replacement in patterns]
+
+
+class NameLimiter(object):
+    """
+    Limits the number of distinct request names in Locust statistics.
+
+    Names are turned into templates with the patterns, e.g. /item/123 becomes
+    /item/<n>. Once max_names statistics entries exist, requests with new names are
+    recorded under OVERFLOW_NAME and counted instead.
+    """
+
+    def __init__(self, request_stats, patterns, max_names=500):
+        self.request_stats = request_stats
+        self.patterns = patterns
+        self.max_names = max_names
+        self.templated_requests = 0
+        self.overflow_requests = 0
+        self.overflow_examples = []
+
+    def template(self, name):
+        """
+        Returns the name with the patterns replaced
+        """
+        for pattern, replacement in self.patterns:
+            name = pattern.sub(replacement, name)
+        return name
+
+    def limit(self, method, name):
+        """
+        Returns the name to record a request with
+        """
+        name = self.template(name)
+        if (
+            self.max_names
+            and (name, method) not in self.request_stats.entries
+            and len(self.request_stats.entries) >= self.max_names
+        ):
+            return OVERFLOW_NAME
+        return name
+
+    def install(self):
+        """
+        Wraps log_request and log_error of the Locust RequestStats object so that
+        requests and errors are recorded with limited names
+        """
+        log_request = self.request_stats.log_request
+        log_error = self.request_stats.log_error
+
+        def limited_log_request(method, name, response_time, content_length):
+            limited_name = self.limit(method, name)
+            if limited_name == OVERFLOW_NAME and name != OVERFLOW_NAME:
+                self.overflow_requests += 1
+                if len(self.overflow_examples) < OVERFLOW_EXAMPLES:
+                    self.overflow_examples.append(name)
+            elif limited_name != name:
+                self.templated_requests += 1
+            log_request(method, limited_name, response_time, content_length)
+
+        def limited_log_error(method, name, error):
+            log_error(method, self.limit(method, name), error)
+
+        self.request_stats.log_request = limited_log_request
+        self.request_stats.log_error = limited_log_error
+
+    def stats(self):
+        """
+        Returns the number of names and of templated and overflowed requests in a dict
+        """
+        return {
+            "max_names": self.max_names,
+            "names": len(self.request_stats.entries),
+            "templated_requests": self.templated_requests,
+            "overflow_requests": self.overflow_requests,
+            "overflow_examples": self.overflow_examples,
+        }
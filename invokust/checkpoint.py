@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import time
+import gevent
+import logging
+from locust.stats import calculate_response_time_percentile
+
+logger = logging.getLogger(__name__)
+
+
+def checkpoint_prefix(checkpoint_id):
+    """
+    Returns the prefix of the keys of the checkpoints of a load test in a sink
+    """
+    return "checkpoint-{0}-".format(checkpoint_id)
+
+
+def checkpoint_key(checkpoint_id, sequence):
+    """
+    Returns the key that a checkpoint is stored under in a sink
+    """
+    return "{0}{1:06d}.json".format(checkpoint_prefix(checkpoint_id), sequence)
+
+
+def stats_delta(current, previous=None):
+    """
+    Returns the requests, response times and failures recorded between two results
+    of LocustLoadTest.stats(), or since the start if there is no previous result
+    """
+    previous = previous or {"requests": {}, "failures": {}}
+    delta = {
+        "num_requests": current["num_requests"] - previous.get("num_requests", 0),
+        "num_requests_fail": current["num_requests_fail"]
+        - previous.get("num_requests_fail", 0),
+        "requests": {},
+        "failures": {},
+    }
+
+    for task, data in current["requests"].items():
+        previous_data = previous["requests"].get(task, {})
+        num_requests = data["num_requests"] - previous_data.get("num_requests", 0)
+        if not num_requests:
+            continue
+        previous_times = previous_data.get("response_times", {})
+        delta["requests"][task] = {
+            "request_type": data["request_type"],
+            "num_requests": num_requests,
+            "num_failures": data["num_failures"] - previous_data.get("num_failures", 0),
+            # the minimum and maximum since the start, as they can't be subtracted
+            "min_response_time": data["min_response_time"],
+            "max_response_time": data["max_response_time"],
+            "response_times": {
+                response_time: count - previous_times.get(response_time, 0)
+                for response_time, count in data["response_times"].items()
+                if count > previous_times.get(response_time, 0)
+            },
+        }
+
+    for key, failure in current["failures"].items():
+        occurrences = failure["occurrences"] - previous["failures"].get(key, {}).get(
+            "occurrences", 0
+        )
+        if occurrences > 0:
+            delta["failures"][key] = dict(failure, occurrences=occurrences)
+
+    return delta
+
+
+def merge_checkpoints(checkpoints):
+    """
+    Returns the statistics of a load test, in the format of LocustLoadTest.stats(),
+    recovered from its checkpoints. The response times of the requests since the last
+    checkpoint are missing.
+    """
+    checkpoints = sorted(checkpoints, key=lambda c: c["sequence"])
+    requests = {}
+    failures = {}
+    for checkpoint in checkpoints:
+        for task, data in checkpoint["requests"].items():
+            task_data = requests.setdefault(
+                task,
+                {
+                    "request_type": data["request_type"],
+                    "num_requests": 0,
+                    "num_failures": 0,
+                    "min_response_time": None,
+                    "max_response_time": 0,
+                    "response_times": {},
+                },
+            )
+            task_data["num_requests"] += data["num_requests"]
+            task_data["num_failures"] += data["num_failures"]
+            if task_data["min_response_time"] is None:
+                task_data["min_response_time"] = data["min_response_time"]
+            elif data["min_response_time"] is not None:
+                task_data["min_response_time"] = min(
+                    data["min_response_time"], task_data["min_response_time"]
+                )
+            task_data["max_response_time"] = max(
+                data["max_response_time"], task_data["max_response_time"]
+            )
+            for response_time, count in data["response_times"].items():
+                # response times are strings after a round trip through JSON
+                response_time = int(response_time)
+                task_data["response_times"][response_time] = (
+                    task_data["response_times"].get(response_time, 0) + count
+                )
+        for key, failure in checkpoint["failures"].items():
+            if key in failures:
+                failures[key]["occurrences"] += failure["occurrences"]
+            else:
+                failures[key] = dict(failure)
+
+    start_time = checkpoints[0]["start_time"]
+    end_time = checkpoints[-1]["time"]
+    duration = max(end_time - start_time, 0.001)
+    for data in requests.values():
+        response_times = data["response_times"]
+        count = sum(response_times.values())
+        data["avg_response_time"] = (
+            sum([t * c for t, c in response_times.items()]) / float(count)
+            if count
+            else 0
+        )
+        data["median_response_time"] = (
+            calculate_response_time_percentile(response_times, count, 0.5)
+            if count
+            else 0
+        )
+        data["total_rps"] = data["num_requests"] / duration
+        data["total_rpm"] = data["total_rps"] * 60
+
+    results = dict(checkpoints[-1].get("info") or {})
+    results.update(
+        {
+            "requests": requests,
+            "failures": failures,
+            "num_requests": sum([c["num_requests"] for c in checkpoints]),
+            "num_requests_fail": sum([c["num_requests_fail"] for c in checkpoints]),
+            "start_time": start_time,
+            "end_time": end_time,
+            "recovered_checkpoints": len(checkpoints),
+        }
+    )
+    return results
+
+
+class Checkpointer(object):
+    """
+    Writes the statistics recorded since the previous checkpoint to a sink every
+    interval seconds, so that the results measured so far can be recovered if the
+    load test never returns its results, e.g. when its Lambda function times out or
+    runs out of memory
+    """
+
+    def __init__(self, stats, sink, checkpoint_id, interval=30, info=None):
+        """
+        arguments
+
+        stats: function returning the current statistics, LocustLoadTest.stats
+        sink: sink to write the checkpoints to
+        checkpoint_id: ID the checkpoints are stored under
+        interval: seconds between checkpoints
+        info: dict of details added to each checkpoint
+        """
+        self.stats = stats
+        self.sink = sink
+        self.checkpoint_id = checkpoint_id
+        self.interval = interval
+        self.info = info
+        self.sequence = 0
+        self.previous = None
+        self.greenlet = None
+
+    def start(self):
+        """
+        Starts writing checkpoints in a greenlet
+        """
+        self.greenlet = gevent.spawn(self._checkpoint_loop)
+
+    def stop(self):
+        """
+        Stops writing checkpoints
+        """
+        if self.greenlet is not None:
+            self.greenlet.kill(block=False)
+            self.greenlet = None
+
+    def _checkpoint_loop(self):
+        while True:
+            gevent.sleep(self.interval)
+            try:
+                self.checkpoint()
+            except Exception as e:
+                logger.error("Writing a checkpoint failed: {0}".format(repr(e)))
+
+    def checkpoint(self):
+        """
+        Writes the statistics since the previous checkpoint to the sink
+        """
+        # the statistics of Locust keep changing, so a copy is kept for the next delta
+        current = copy.deepcopy(self.stats())
+        checkpoint = stats_delta(current, self.previous)
+        checkpoint.update(
+            {
+                "sequence": self.sequence,
+                "start_time": current["start_time"],
+                "time": time.time(),
+                "info": self.info,
+            }
+        )
+        self.sink.put(checkpoint_key(self.checkpoint_id, self.sequence), checkpoint)
+        self.previous = current
+        self.sequence += 1
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+import random
+import logging
+import gevent
+from gevent.pool import Group
+from locust import TaskSet
+from locust.exception import InterruptTaskSet, RescheduleTask, StopUser
+from locust.stats import calculate_response_time_percentile
+
+logger = logging.getLogger(__name__)
+
+# arrivals that start more than this many ms after their intended time are late
+LATE_ARRIVAL_THRESHOLD = 10
+
+INTENDED_RESPONSE_TIME_PERCENTILES = [50, 95, 99]
+
+
+def is_taskset(task):
+    """
+    Returns whether a task of a user or TaskSet is a TaskSet class
+    """
+    return isinstance(task, type) and issubclass(task, TaskSet)
+
+
+def round_response_time(response_time):
+    """
+    Returns the response time rounded the same way as Locust does in its statistics
+    """
+    if response_time < 100:
+        return round(response_time)
+    elif response_time < 1000:
+        return round(response_time, -1)
+    elif response_time < 10000:
+        return round(response_time, -2)
+    return round(response_time, -3)
+
+
+class ArrivalRateExecutor(object):
+    """
+    Runs tasks at a constant arrival rate (open model) instead of with a fixed number
+    of users that wait between tasks (closed model).
+
+    Each arrival runs one task of an idle user from a pool of at most max_in_flight
+    users, so the offered load does not drop when the target slows down. Arrivals
+    are dropped if all users are busy. Response times are also measured from the
+    time each arrival was intended to start, which includes any delay of the load
+    generator in starting it, to avoid coordinated omission.
+
+    A TaskSet of a user runs one of its tasks per arrival, scheduled by the TaskSet
+    itself. TaskSets nested in a TaskSet run until they are interrupted, so they are
+    not supported.
+
+    on_start of a new user runs in the greenlet of its first arrival, so a slow
+    on_start doesn't delay other arrivals. Users that raise StopUser are stopped and
+    removed from the pool.
+    """
+
+    def __init__(
+        self, environment, arrival_rate, max_in_flight=100, seed=None, name_limiter=None
+    ):
+        self.environment = environment
+        self.name_limiter = name_limiter
+        self.arrival_rate = float(arrival_rate)
+        self.max_in_flight = max_in_flight
+        self.random = random.Random(seed)
+        self.user_classes = environment.user_classes
+        self.weights = [
+            getattr(user_class, "weight", 1) or 1 for user_class in self.user_classes
+        ]
+        self.users = []
+        self.idle_users = []
+        self.started_users = set()
+        self.tasksets = {}
+        self.group = Group()
+        self.greenlet = None
+        self.intended_times = {}
+        self.reset()
+
+    def start(self):
+        """
+        Starts scheduling arrivals in a greenlet
+        """
+        for user_class in self.user_classes:
+            for task in user_class.tasks:
+                if is_taskset(task) and any(is_taskset(t) for t in task.tasks):
+                    raise ValueError(
+                        "Nested TaskSets in {0} are not supported with arrival_rate".format(
+                            task.__name__
+                        )
+                    )
+        for user_class in self.user_classes:
+            if self.environment.host:
+                user_class.host = self.environment.host
+        self.environment.events.request.add_listener(self.on_request)
+        self.greenlet = gevent.spawn(self._run)
+
+    def stop(self):
+        """
+        Stops scheduling arrivals, kills the running tasks and stops the users
+        """
+        if self.greenlet:
+            self.greenlet.kill(block=True)
+        self.group.kill(block=True)
+        for user in list(self.users):
+            self._stop_user(user)
+        self.idle_users = []
+
+    def reset(self):
+        """
+        Resets the arrival statistics, e.g. after a warm-up
+        """
+        self.intended_response_times = {}
+        self.arrivals = 0
+        self.dropped = 0
+        self.late = 0
+        self.max_lateness = 0
+        self.max_in_flight_reached = 0
+
+    def _create_user(self):
+        user_class = self.random.choices(self.user_classes, weights=self.weights)[0]
+        user = user_class(self.environment)
+        self.users.append(user)
+        return user
+
+    def _stop_user(self, user):
+        # removed from the pool, with on_stop if its on_start ran
+        self.users.remove(user)
+        if user not in self.started_users:
+            return
+        self.started_users.discard(user)
+        try:
+            for taskset in self.tasksets.pop(user, {}).values():
+                taskset.on_stop()
+            user.on_stop()
+        except Exception as e:
+            logger.error("User on_stop exception {0}".format(repr(e)))
+
+    def _run(self):
+        start_time = time.time()
+        interval = 1.0 / self.arrival_rate
+        scheduled = 0
+        while True:
+            intended_time = start_time + scheduled * interval
+            delay = intended_time - time.time()
+            if delay > 0:
+                gevent.sleep(delay)
+
+            scheduled += 1
+            self.arrivals += 1
+            lateness = (time.time() - intended_time) * 1000
+            self.max_lateness = max(self.max_lateness, lateness)
+            if lateness > LATE_ARRIVAL_THRESHOLD:
+                self.late += 1
+
+            if self.idle_users:
+                user = self.idle_users.pop()
+            elif len(self.users) < self.max_in_flight:
+                user = self._create_user()
+            else:
+                self.dropped += 1
+                continue
+
+            self.group.spawn(self._execute, user, intended_time)
+            self.max_in_flight_reached = max(
+                self.max_in_flight_reached, len(self.users) - len(self.idle_users)
+            )
+
+    def _execute_taskset_task(self, user, taskset_class):
+        tasksets = self.tasksets.setdefault(user, {})
+        taskset = tasksets.get(taskset_class)
+        if taskset is None:
+            taskset = tasksets[taskset_class] = taskset_class(user)
+            taskset.on_start()
+        try:
+            if not taskset._task_queue:
+                taskset.schedule_task(taskset.get_next_task())
+            taskset.execute_next_task()
+        except InterruptTaskSet:
+            # the next arrival of this user starts the TaskSet again
+            del tasksets[taskset_class]
+            taskset.on_stop()
+
+    def _execute(self, user, intended_time):
+        current = gevent.getcurrent()
+        stopped = False
+        try:
+            if user not in self.started_users:
+                # the requests of on_start aren't responses to the arrival
+                self.started_users.add(user)
+                user.on_start()
+            self.intended_times[current] = intended_time
+            task = self.random.choice(user.tasks)
+            if is_taskset(task):
+                self._execute_taskset_task(user, task)
+            else:
+                task(user)
+        except RescheduleTask:
+            pass
+        except StopUser:
+            stopped = True
+        except Exception as e:
+            logger.error("Task exception {0}".format(repr(e)))
+            self.environment.events.user_error.fire(
+                user_instance=user, exception=e, tb=sys.exc_info()[2]
+            )
+        finally:
+            self.intended_times.pop(current, None)
+            if stopped:
+                self._stop_user(user)
+            else:
+                self.idle_users.append(user)
+
+    def on_request(self, request_type, name, response_time, response_length, **kwargs):
+        """
+        Locust request event listener recording response times from the intended
+        start time of the arrival that made the request
+        """
+        intended_time = self.intended_times.get(gevent.getcurrent())
+        if intended_time is None:
+            return
+        response_time = round_response_time((time.time() - intended_time) * 1000)
+        if self.name_limiter:
+            name = self.name_limiter.limit(request_type, name)
+        counts = self.intended_response_times.setdefault(
+            "{0}_{1}".format(request_type, name), {}
+        )
+        counts[response_time] = counts.get(response_time, 0) + 1
+
+    def stats(self):
+        """
+        Returns the arrival statistics in a dict
+        """
+        tasks = {}
+        for task, counts in self.intended_response_times.items():
+            num_requests = sum(counts.values())
+            tasks[task] = {
+                "response_times": counts,
+                "response_time_percentiles": {
+                    percentile: calculate_response_time_percentile(
+                        counts, num_requests, percentile / 100.0
+                    )
+                    for percentile in INTENDED_RESPONSE_TIME_PERCENTILES
+                },
+            }
+        return {
+            "arrival_rate": self.arrival_rate,
+            "max_in_flight": self.max_in_flight,
+            "arrivals": self.arrivals,
+            "dropped": self.dropped,
+            "late": self.late,
+            "max_lateness": self.max_lateness,
+            "max_in_flight_reached": self.max_in_flight_reached,
+            "intended_response_times": tasks,
+        }
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+import re
+from locust.stats import StatsError
+
+OTHER_FAILURES_KEY = "other"
+
+# number of keys of the failures in an "other" entry that are kept, so that errors
+# seen by several invocations are counted once when the entries are merged
+OTHER_ERROR_KEYS = 100
+
+# Patterns replacing the parts of error messages that are unique per request, so
+# that the same failure is counted as one entry
+DEFAULT_FAILURE_PATTERNS = [
+    (
+        r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}",
+        "<uuid>",
+    ),
+    (
+        r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:?\d{2})?",
+        "<timestamp>",
+    ),
+    (r"0x[0-9a-fA-F]+", "<hex>"),
+    (r"\b(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{16,}\b", "<hex>"),
+    (r"(?<=/)\d+(?=[/?#&'\"\s)]|$)", "<n>"),
+    (r"(?<=[=:])\d+(?=[&'\"\s),]|$)", "<n>"),
+    (r"\d{5,}", "<n>"),
+]
+
+
+class NormalisedError(str):
+    """
+    An error message that Locust stores as is, instead of the repr of a string
+    """
+
+    def __repr__(self):
+        return str(self)
+
+
+def compile_failure_patterns(patterns=None):
+    """
+    Returns a list of compiled (regex, replacement) tuples. The default patterns are
+    used if patterns is None.
+    """
+    if patterns is None:
+        patterns = DEFAULT_FAILURE_PATTERNS
+    return [(re.compile(pattern), replacement) for pattern, replacement in patterns]
+
+
+def normalise_error(error, patterns):
+    """
+    Returns the error message with the patterns replaced
+
+    arguments
+
+    error: error message string
+    patterns: list of compiled (regex, replacement) tuples
+    """
+    for pattern, replacement in patterns:
+        error = pattern.sub(replacement, error)
+    return error
+
+
+def failure_key(failure):
+    """
+    Returns the key of a serialized Locust error in the failures results
+    """
+    return "{0}_{1}_{2}".format(failure["method"], failure["name"], failure["error"])
+
+
+def merge_other_failures(others):
+    """
+    Merges "other" entries into a new one, adding up their occurrences and counting
+    the errors they have in common once. The number of distinct errors is a lower
+    bound once more than OTHER_ERROR_KEYS errors are in the entries.
+    """
+    error_keys = set()
+    for other in others:
+        error_keys.update(other.get("error_keys", []))
+    return {
+        "method": None,
+        "name": None,
+        "error": OTHER_FAILURES_KEY,
+        "occurrences": sum([other["occurrences"] for other in others]),
+        "distinct_errors": max(
+            [len(error_keys)] + [other["distinct_errors"] for other in others]
+        ),
+        "error_keys": sorted(error_keys)[:OTHER_ERROR_KEYS],
+    }
+
+
+def merge_failures(failures_list):
+    """
+    Merges a list of failures results into a new dict, adding up the occurrences of
+    failures with the same key
+    """
+    merged = {}
+    for failures in failures_list:
+        for key, failure in failures.items():
+            if key == OTHER_FAILURES_KEY and key in merged:
+                merged[key] = merge_other_failures([merged[key], failure])
+            elif key in merged:
+                merged[key]["occurrences"] += failure["occurrences"]
+            else:
+                merged[key] = dict(failure)
+    return merged
+
+
+def cap_failures(failures, max_failures):
+    """
+    Returns the max_failures most frequent failures. The rest are added up in an
+    "other" entry that counts their occurrences and number of distinct errors.
+    """
+    other = failures.get(OTHER_FAILURES_KEY)
+    top = [key for key in failures if key != OTHER_FAILURES_KEY]
+    if len(top) <= max_failures:
+        return dict(failures)
+
+    top.sort(key=lambda key: failures[key]["occurrences"], reverse=True)
+    capped = {key: failures[key] for key in top[:max_failures]}
+    dropped = top[max_failures:]
+
+    capped[OTHER_FAILURES_KEY] = merge_other_failures(
+        ([other] if other else [])
+        + [
+            {
+                "occurrences": sum([failures[key]["occurrences"] for key in dropped]),
+                "distinct_errors": len(dropped),
+                "error_keys": dropped,
+            }
+        ]
+    )
+    return capped
+
+
+def install_failure_normaliser(stats, patterns):
+    """
+    Normalises error messages as Locust records them, so that errors which only differ
+    by IDs or timestamps share one entry in memory
+
+    arguments
+
+    stats: a Locust RequestStats object
+    patterns: list of compiled (regex, replacement) tuples
+    """
+    log_error = stats.log_error
+
+    def normalised_log_error(method, name, error):
+        log_error(
+            method,
+            name,
+            NormalisedError(normalise_error(StatsError.parse_error(error), patterns)),
+        )
+
+    stats.log_error = normalised_log_error
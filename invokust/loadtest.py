@@ -6,10 +6,26 @@ import json
 import signal
 import logging
 import time
+import uuid
 from locust.env import Environment
 from locust.log import setup_logging
 from locust.stats import stats_printer
 from locust.util.timespan import parse_timespan
+from .profiler import SamplingProfiler
+from .monitor import GeneratorMonitor, MemoryGuard
+from .sampling import RequestSample
+from .executor import ArrivalRateExecutor
+from .cardinality import NameLimiter, compile_name_patterns
+from .checkpoint import Checkpointer
+from .sinks import create_sink
+from .warmup import DNSCache, get_target_hosts, warm_up_connection, with_session_warm_up
+from .failures import (
+    cap_failures,
+    compile_failure_patterns,
+    failure_key,
+    install_failure_normaliser,
+    merge_failures,
+)
 
 setup_logging("INFO", None)
 logger = logging.getLogger(__name__)
@@ -29,6 +45,18 @@ class LocustLoadTest(object):
         self.settings = settings
         self.start_time = None
         self.end_time = None
+        self.profiler = None
+        self.monitor = None
+        self.memory_guard = None
+        self.checkpointer = None
+        self.request_sample = None
+        self.name_limiter = None
+        self.executor = None
+        self.start_skew = None
+        self.dns_cache = None
+        self.warmup_stats = None
+        self.timelimit_greenlet = None
+        self.warmup_greenlet = None
         gevent.signal_handler(signal.SIGTERM, sig_term_handler)
 
     def stats(self):
@@ -44,11 +72,16 @@ class LocustLoadTest(object):
             "end_time": self.end_time,
         }
 
+        if self.settings.start_at:
+            statistics["start_at"] = self.settings.start_at
+            statistics["start_skew"] = self.start_skew
+
         for name, value in self.env.runner.stats.entries.items():
             locust_task_name = "{0}_{1}".format(name[1], name[0])
             statistics["requests"][locust_task_name] = {
                 "request_type": name[1],
                 "num_requests": value.num_requests,
+                "num_failures": value.num_failures,
                 "min_response_time": value.min_response_time,
                 "median_response_time": value.median_response_time,
                 "avg_response_time": value.avg_response_time,
@@ -65,15 +98,171 @@ class LocustLoadTest(object):
                 "total_rpm": value.total_rps * 60,
             }
 
-        for _, error in self.env.runner.errors.items():
-            error_dict = error.serialize()
-            locust_task_name = "{0}_{1}".format(
-                error_dict["method"], error_dict["name"]
-            )
-            statistics["failures"][locust_task_name] = error_dict
+        failures = [error.serialize() for error in self.env.runner.errors.values()]
+        statistics["failures"] = cap_failures(
+            merge_failures([{failure_key(f): f} for f in failures]),
+            self.settings.max_failures,
+        )
+
+        if self.name_limiter:
+            statistics["names"] = self.name_limiter.stats()
+
+        if self.warmup_stats:
+            statistics["warmup"] = self.warmup_stats
+
+        if self.executor:
+            statistics["arrivals"] = self.executor.stats()
+
+        if self.request_sample:
+            statistics["request_sample"] = self.request_sample.stats()
+
+        if self.monitor:
+            statistics["generator"] = self.monitor.stats()
+
+        if self.memory_guard:
+            statistics["memory"] = self.memory_guard.stats()
+
+        if self.profiler:
+            statistics["profile"] = self.profiler.stats(top=self.settings.profile_top)
 
         return statistics
 
+    def stop_monitors(self):
+        """
+        Stops the arrival rate executor, load generator monitor, checkpoints and
+        sampling profiler if they are running, and the pending run time limit and
+        end of the warm-up so they don't fire later in a reused Lambda container
+        """
+        for greenlet in [self.timelimit_greenlet, self.warmup_greenlet]:
+            if greenlet is not None:
+                greenlet.kill(block=False)
+        self.timelimit_greenlet = None
+        self.warmup_greenlet = None
+        if self.checkpointer:
+            self.checkpointer.stop()
+        if self.executor:
+            self.executor.stop()
+        if self.monitor:
+            self.monitor.stop()
+        if self.memory_guard:
+            self.memory_guard.stop()
+        if self.profiler:
+            self.profiler.stop()
+
+    def start_checkpoints(self):
+        """
+        Starts writing checkpoints of the statistics to the checkpoint sink if one is
+        set
+        """
+        if not self.settings.checkpoint_sink:
+            return
+        self.checkpointer = Checkpointer(
+            self.stats,
+            create_sink(self.settings.checkpoint_sink),
+            self.settings.checkpoint_id or uuid.uuid4().hex,
+            interval=self.settings.checkpoint_interval,
+            info=self.settings.checkpoint_info,
+        )
+        self.checkpointer.start()
+
+    def throttle_users(self):
+        """
+        Stops starting new users, or with an arrival rate limits the pool of users to
+        its current size, to stay within the memory budget
+        """
+        if self.executor:
+            self.executor.max_in_flight = max(1, len(self.executor.users))
+            logger.warning(
+                "Limited in flight tasks to %s to save memory"
+                % self.executor.max_in_flight
+            )
+        elif self.env.runner.spawning_greenlet:
+            self.env.runner.spawning_greenlet.kill(block=False)
+            logger.warning(
+                "Stopped spawning users at %s users to save memory"
+                % self.env.runner.user_count
+            )
+
+    def stop_early(self):
+        """
+        Stops the load test before the run time limit, keeping the results so far
+        """
+        logger.warning("Stopping the load test early to stay within the memory budget")
+        self.end_time = time.time()
+        self.env.runner.quit()
+
+    def warm_up_targets(self):
+        """
+        Resolves the target hosts and opens a connection to each of them, depending on
+        the settings, and records the time taken in the warm-up statistics. A host
+        that can't be resolved or reached is logged and the load test goes on.
+        """
+        targets = get_target_hosts(self.settings.host, self.settings.classes)
+
+        if self.settings.dns_cache:
+            self.dns_cache = DNSCache()
+            self.warmup_stats["resolve_time"] = {}
+            for _, hostname, _ in targets:
+                try:
+                    resolve_time = self.dns_cache.resolve(hostname)
+                except OSError as e:
+                    # the users resolve it themselves and record the failures
+                    logger.error("Resolving {0} failed: {1}".format(hostname, repr(e)))
+                    resolve_time = None
+                self.warmup_stats["resolve_time"][hostname] = resolve_time
+            self.dns_cache.install()
+            self.warmup_stats["addresses"] = self.dns_cache.stats()
+
+        if self.settings.warmup_connect:
+            self.warmup_stats["connect_time"] = {}
+            for scheme, hostname, port in targets:
+                try:
+                    connect_time = warm_up_connection(scheme, hostname, port)
+                except Exception as e:
+                    logger.error(
+                        "Warm-up connection to {0} failed: {1}".format(
+                            hostname, repr(e)
+                        )
+                    )
+                    connect_time = None
+                self.warmup_stats["connect_time"][hostname] = connect_time
+
+    def end_warmup(self):
+        """
+        Moves the statistics recorded so far into the warm-up statistics and resets
+        them, so that the load test statistics only cover the steady state
+        """
+        self.warmup_greenlet = None
+        now = time.time()
+        stats = self.env.runner.stats
+        self.warmup_stats.update(
+            {
+                "start_time": self.start_time,
+                "end_time": now,
+                "num_requests": stats.num_requests,
+                "num_requests_fail": stats.num_failures,
+                "requests": {
+                    "{0}_{1}".format(name[1], name[0]): {
+                        "num_requests": value.num_requests,
+                        "num_failures": value.num_failures,
+                        "median_response_time": value.median_response_time,
+                        "avg_response_time": value.avg_response_time,
+                        "max_response_time": value.max_response_time,
+                    }
+                    for name, value in stats.entries.items()
+                },
+            }
+        )
+        stats.reset_all()
+        if self.request_sample:
+            self.request_sample.reset()
+        if self.executor:
+            self.executor.reset()
+        self.start_time = now
+        logger.info("Warm-up finished after %s seconds" % self.settings.warmup_time)
+        # checkpoints only cover the statistics after the warm-up
+        self.start_checkpoints()
+
     def set_run_time_in_sec(self, run_time_str):
         try:
             self.run_time_in_sec = parse_timespan(run_time_str)
@@ -95,31 +284,50 @@ class LocustLoadTest(object):
         Run the load test.
         """
 
+        start_delay = 0
+        spawn_rate = self.settings.spawn_rate
+        if self.settings.start_at:
+            start_delay = max(0, self.settings.start_at - time.time())
+            spawn_rate = self.settings.num_users
+            logger.info("Waiting %s seconds to start all users at once" % start_delay)
+
         if self.settings.run_time:
             self.set_run_time_in_sec(run_time_str=self.settings.run_time)
+            if self.settings.warmup_time >= self.run_time_in_sec:
+                raise ValueError("warmup_time must be shorter than run_time")
 
             logger.info("Run time limit set to %s seconds" % self.run_time_in_sec)
 
             def timelimit_stop():
+                # running now, so it isn't killed by stop_monitors
+                self.timelimit_greenlet = None
+                if self.end_time:
+                    return
                 logger.info(
                     "Run time limit reached: %s seconds. Stopping Locust Runner."
                     % self.run_time_in_sec
                 )
                 self.env.runner.quit()
                 self.end_time = time.time()
+                self.stop_monitors()
                 logger.info(
                     "Locust completed %s requests with %s errors"
                     % (self.env.runner.stats.num_requests, len(self.env.runner.errors))
                 )
                 logger.info(json.dumps(self.stats()))
 
-            gevent.spawn_later(self.run_time_in_sec, timelimit_stop)
+            self.timelimit_greenlet = gevent.spawn_later(
+                self.run_time_in_sec + start_delay, timelimit_stop
+            )
 
         try:
             logger.info("Starting Locust with settings %s " % vars(self.settings))
 
+            user_classes = self.settings.classes
+            if self.settings.warmup_connect:
+                user_classes = [with_session_warm_up(c) for c in user_classes]
             self.env = Environment(
-                user_classes=self.settings.classes,
+                user_classes=user_classes,
                 host=self.settings.host,
                 tags=self.settings.tags,
                 exclude_tags=self.settings.exclude_tags,
@@ -128,17 +336,89 @@ class LocustLoadTest(object):
             )
 
             self.env.create_local_runner()
+
+            if (
+                self.settings.dns_cache
+                or self.settings.warmup_connect
+                or self.settings.warmup_time
+            ):
+                self.warmup_stats = {"warmup_time": self.settings.warmup_time}
+                self.warm_up_targets()
+
+            name_patterns = []
+            if self.settings.template_names or self.settings.name_patterns:
+                name_patterns = compile_name_patterns(self.settings.name_patterns)
+            self.name_limiter = NameLimiter(
+                self.env.runner.stats,
+                name_patterns,
+                max_names=self.settings.max_names,
+            )
+            self.name_limiter.install()
+            install_failure_normaliser(
+                self.env.runner.stats,
+                compile_failure_patterns(self.settings.failure_patterns),
+            )
             gevent.spawn(stats_printer(self.env.stats))
 
-            self.env.runner.start(
-                user_count=self.settings.num_users, spawn_rate=self.settings.spawn_rate
+            if self.settings.start_at:
+                gevent.sleep(max(0, self.settings.start_at - time.time()))
+
+            if self.settings.request_sample_size:
+                self.request_sample = RequestSample(self.settings.request_sample_size)
+                self.env.events.request.add_listener(self.request_sample.on_request)
+
+            if self.settings.profile:
+                self.profiler = SamplingProfiler(
+                    interval=self.settings.profile_interval
+                )
+                self.profiler.start()
+
+            self.monitor = GeneratorMonitor(
+                interval=self.settings.monitor_interval,
+                cpu_threshold=self.settings.saturation_cpu_percent,
+                loop_lag_threshold=self.settings.saturation_loop_lag,
             )
+            self.monitor.start()
+
+            self.memory_guard = MemoryGuard(
+                budget=self.settings.memory_budget,
+                interval=self.settings.memory_interval,
+                throttle_percent=self.settings.memory_throttle_percent,
+                stop_percent=self.settings.memory_stop_percent,
+                on_throttle=self.throttle_users,
+                on_stop=self.stop_early,
+            )
+            self.memory_guard.start()
+
+            if self.settings.arrival_rate:
+                self.executor = ArrivalRateExecutor(
+                    self.env,
+                    self.settings.arrival_rate,
+                    max_in_flight=self.settings.max_in_flight,
+                    name_limiter=self.name_limiter,
+                )
+                self.executor.start()
+            else:
+                self.env.runner.start(
+                    user_count=self.settings.num_users, spawn_rate=spawn_rate
+                )
 
             self.start_time = time.time()
+            if self.settings.start_at:
+                self.start_skew = self.start_time - self.settings.start_at
+            if self.settings.warmup_time:
+                self.warmup_greenlet = gevent.spawn_later(
+                    self.settings.warmup_time, self.end_warmup
+                )
+            else:
+                self.start_checkpoints()
             self.env.runner.greenlet.join()
 
         except Exception as e:
             logger.error("Locust exception {0}".format(repr(e)))
 
         finally:
+            self.stop_monitors()
+            if self.dns_cache:
+                self.dns_cache.uninstall()
             self.env.events.quitting.fire()
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+import gevent
+import psutil
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _mean(values):
+    return float(sum(values)) / max(len(values), 1)
+
+
+class GeneratorMonitor(object):
+    """
+    Measures how hard the load generator itself is working during a load test.
+
+    A greenlet wakes up every interval and records the process CPU utilisation, how
+    late the event loop woke it up (event loop lag) and how long a newly spawned
+    greenlet waits before it runs (scheduling delay). When the generator is
+    saturated these delays are added to every response time that Locust measures.
+    """
+
+    def __init__(self, interval=1.0, cpu_threshold=90, loop_lag_threshold=50):
+        self.interval = interval
+        self.cpu_threshold = cpu_threshold
+        self.loop_lag_threshold = loop_lag_threshold
+        self.cpu_percent = []
+        self.loop_lag = []
+        self.scheduling_delay = []
+        self.start_time = None
+        self.start_cpu_time = None
+        self.end_time = None
+        self.end_cpu_time = None
+        self.greenlet = None
+
+    def start(self):
+        """
+        Starts monitoring in a greenlet
+        """
+        self.start_time = time.time()
+        self.start_cpu_time = time.process_time()
+        self.greenlet = gevent.spawn(self._monitor_loop)
+
+    def stop(self):
+        """
+        Stops monitoring
+        """
+        if self.greenlet is not None and self.end_time is None:
+            self.greenlet.kill(block=False)
+            self.end_time = time.time()
+            self.end_cpu_time = time.process_time()
+
+    def _monitor_loop(self):
+        while True:
+            wall_start = time.time()
+            cpu_start = time.process_time()
+            gevent.sleep(self.interval)
+            wall_time = time.time() - wall_start
+            cpu_time = time.process_time() - cpu_start
+
+            self.loop_lag.append(max(0, wall_time - self.interval) * 1000)
+            self.cpu_percent.append(cpu_time / wall_time * 100)
+
+            spawn_time = time.time()
+            run_time = gevent.spawn(time.time).get()
+            self.scheduling_delay.append((run_time - spawn_time) * 1000)
+
+    def is_saturated(self):
+        """
+        Returns True if the CPU or event loop lag thresholds were exceeded
+        """
+        return (
+            self.get_cpu_percent() > self.cpu_threshold
+            or _percentile(self.loop_lag, 0.95) > self.loop_lag_threshold
+        )
+
+    def get_cpu_percent(self):
+        """
+        Returns the average process CPU utilisation over the whole run
+        """
+        end_time = self.end_time or time.time()
+        end_cpu_time = self.end_cpu_time or time.process_time()
+        try:
+            return (
+                (end_cpu_time - self.start_cpu_time)
+                / (end_time - self.start_time)
+                * 100
+            )
+        except (TypeError, ZeroDivisionError):
+            return 0
+
+    def stats(self):
+        """
+        Returns the load generator statistics in a dict
+        """
+        return {
+            "cpu_percent": self.get_cpu_percent(),
+            "cpu_percent_max": max(self.cpu_percent, default=0),
+            "loop_lag_avg": _mean(self.loop_lag),
+            "loop_lag_p95": _percentile(self.loop_lag, 0.95),
+            "loop_lag_max": max(self.loop_lag, default=0),
+            "scheduling_delay_avg": _mean(self.scheduling_delay),
+            "scheduling_delay_max": max(self.scheduling_delay, default=0),
+            "samples": len(self.loop_lag),
+            "saturated": self.is_saturated(),
+        }
+
+
+def get_peak_rss():
+    """
+    Returns the peak resident memory of the process in MB, or None if it is not
+    available on this platform
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak_rss / 1048576.0 if sys.platform == "darwin" else peak_rss / 1024.0
+
+
+class MemoryGuard(object):
+    """
+    Samples the resident memory (RSS) of the load generator during a load test and
+    acts before it reaches the memory budget, e.g. the memory size of a Lambda
+    function, where the process would be killed and all results lost.
+
+    When the RSS reaches throttle_percent of the budget on_throttle is called once,
+    to stop adding users. When it reaches stop_percent on_stop is called once, to end
+    the load test early with the results so far.
+    """
+
+    def __init__(
+        self,
+        budget=None,
+        interval=0.5,
+        throttle_percent=80,
+        stop_percent=90,
+        on_throttle=None,
+        on_stop=None,
+    ):
+        self.budget = budget
+        self.interval = interval
+        self.throttle_percent = throttle_percent
+        self.stop_percent = stop_percent
+        self.on_throttle = on_throttle
+        self.on_stop = on_stop
+        self.process = psutil.Process()
+        self.rss = None
+        self.rss_max = 0
+        self.samples = 0
+        self.throttled = False
+        self.stopped_early = False
+        self.greenlet = None
+
+    def start(self):
+        """
+        Starts sampling in a greenlet
+        """
+        self.greenlet = gevent.spawn(self._sample_loop)
+
+    def stop(self):
+        """
+        Stops sampling
+        """
+        if self.greenlet is not None:
+            self.greenlet.kill(block=False)
+            self.greenlet = None
+
+    def _sample_loop(self):
+        while True:
+            self.sample()
+            gevent.sleep(self.interval)
+
+    def sample(self):
+        """
+        Records the current RSS and calls the callbacks if a threshold is reached
+        """
+        self.rss = self.process.memory_info().rss / 1048576.0
+        self.rss_max = max(self.rss_max, self.rss)
+        self.samples += 1
+        if not self.budget:
+            return
+
+        percent = self.rss / self.budget * 100
+        if percent >= self.stop_percent and not self.stopped_early:
+            self.stopped_early = True
+            logger.warning(
+                "Memory use {0:.0f}MB reached {1}% of the {2}MB budget".format(
+                    self.rss, self.stop_percent, self.budget
+                )
+            )
+            if self.on_stop:
+                self.on_stop()
+        elif percent >= self.throttle_percent and not self.throttled:
+            self.throttled = True
+            logger.warning(
+                "Memory use {0:.0f}MB reached {1}% of the {2}MB budget".format(
+                    self.rss, self.throttle_percent, self.budget
+                )
+            )
+            if self.on_throttle:
+                self.on_throttle()
+
+    def stats(self):
+        """
+        Returns the memory statistics in a dict. The peak is the highest RSS sampled
+        during this load test and the headroom is the budget minus the peak. The
+        container peak is the peak of the whole process, which in a warm Lambda
+        container includes earlier invocations.
+        """
+        peak_rss = self.rss_max
+        return {
+            "budget_mb": self.budget,
+            "rss_mb": self.rss,
+            "peak_rss_mb": peak_rss,
+            "container_peak_rss_mb": get_peak_rss(),
+            "headroom_mb": self.budget - peak_rss if self.budget else None,
+            "headroom_percent": (
+                (self.budget - peak_rss) / self.budget * 100 if self.budget else None
+            ),
+            "samples": self.samples,
+            "throttled": self.throttled,
+            "stopped_early": self.stopped_early,
+        }
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import logging
+from gevent import monkey
+
+logger = logging.getLogger(__name__)
+
+# Locust monkey patches threading and time, so the original implementations are
+# needed to sample from a real OS thread that keeps running while greenlets block.
+_start_new_thread = monkey.get_original("_thread", "start_new_thread")
+_get_ident = monkey.get_original("_thread", "get_ident")
+_sleep = monkey.get_original("time", "sleep")
+_time = monkey.get_original("time", "time")
+
+_GEVENT_HUB_FILE = os.path.join("gevent", "hub.py")
+
+
+def _function_key(code):
+    return "{0}:{1}({2})".format(code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def _is_idle(frame):
+    """
+    Returns True if the frame is the gevent hub waiting for IO, i.e. no greenlet is
+    using the CPU
+    """
+    return frame.f_code.co_filename.endswith(_GEVENT_HUB_FILE)
+
+
+class SamplingProfiler(object):
+    """
+    A low overhead statistical profiler for the greenlets running in a Locust load
+    test.
+
+    All greenlets run in the thread that starts the profiler, so a native thread
+    periodically samples the stack of whichever greenlet currently holds that thread.
+    Samples where the gevent hub is waiting for IO are counted as idle.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = 0
+        self.idle_samples = 0
+        self.self_samples = {}
+        self.cumulative_samples = {}
+        self.start_time = None
+        self.end_time = None
+        self._running = False
+        self._thread_ident = None
+
+    def start(self):
+        """
+        Starts sampling the current thread
+        """
+        self._thread_ident = _get_ident()
+        self._running = True
+        self.start_time = _time()
+        _start_new_thread(self._sample_loop, ())
+        logger.info("Sampling profiler started, interval: %ss" % self.interval)
+
+    def stop(self):
+        """
+        Stops sampling
+        """
+        if self._running:
+            self._running = False
+            self.end_time = _time()
+
+    def _sample_loop(self):
+        while self._running:
+            frame = sys._current_frames().get(self._thread_ident)
+            if frame is not None:
+                self._record(frame)
+            _sleep(self.interval)
+
+    def _record(self, frame):
+        self.samples += 1
+
+        if _is_idle(frame):
+            self.idle_samples += 1
+            return
+
+        key = _function_key(frame.f_code)
+        self.self_samples[key] = self.self_samples.get(key, 0) + 1
+
+        seen = set()
+        while frame is not None:
+            key = _function_key(frame.f_code)
+            if key not in seen:
+                seen.add(key)
+                self.cumulative_samples[key] = self.cumulative_samples.get(key, 0) + 1
+            frame = frame.f_back
+
+    def stats(self, top=20):
+        """
+        Returns the top functions by self and cumulative time in a dict
+
+        Arguments
+
+            top: number of functions to return for each of self and cumulative time
+        """
+        end_time = self.end_time or _time()
+        sample_time = end_time - self.start_time if self.start_time else 0
+        seconds_per_sample = sample_time / self.samples if self.samples else 0
+
+        # copies, as the sampling thread may still be updating the counters
+        self_counts = dict(self.self_samples)
+        cumulative_counts = dict(self.cumulative_samples)
+
+        hottest = set(sorted(self_counts, key=self_counts.get, reverse=True)[:top])
+        hottest.update(
+            sorted(cumulative_counts, key=cumulative_counts.get, reverse=True)[:top]
+        )
+
+        functions = {}
+        for key in hottest:
+            self_samples = self_counts.get(key, 0)
+            cumulative_samples = cumulative_counts.get(key, 0)
+            functions[key] = {
+                "self_samples": self_samples,
+                "cumulative_samples": cumulative_samples,
+                "self_time": self_samples * seconds_per_sample,
+                "cumulative_time": cumulative_samples * seconds_per_sample,
+            }
+
+        return {
+            "interval": self.interval,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "sample_time": sample_time,
+            "functions": functions,
+        }
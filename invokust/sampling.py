@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import time
+import heapq
+import random
+
+REQUEST_SAMPLE_FIELDS = [
+    "priority",
+    "timestamp",
+    "request_type",
+    "name",
+    "response_time",
+    "response_length",
+    "status",
+    "failed",
+]
+
+
+class RequestSample(object):
+    """
+    A fixed size uniform random sample of individual requests.
+
+    Every request is given a random priority and the requests with the lowest
+    priorities are kept (bottom-k sampling). Memory use is constant and samples from
+    many load tests can be merged into a uniform sample of all their requests by
+    keeping the lowest priorities again, see merge_request_samples.
+    """
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.random = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        """
+        Empties the sample, e.g. after a warm-up
+        """
+        self.seen = 0
+        # max heap of (-priority, record) so the highest kept priority is at the top
+        self.heap = []
+
+    def on_request(
+        self,
+        request_type,
+        name,
+        response_time,
+        response_length,
+        response=None,
+        exception=None,
+        start_time=None,
+        **kwargs
+    ):
+        """
+        Locust request event listener
+        """
+        self.seen += 1
+        priority = self.random.random()
+        if len(self.heap) >= self.size and priority >= -self.heap[0][0]:
+            return
+
+        record = [
+            priority,
+            start_time or time.time() - (response_time or 0) / 1000.0,
+            request_type,
+            name,
+            response_time,
+            response_length,
+            getattr(response, "status_code", None),
+            exception is not None,
+        ]
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, (-priority, record))
+        else:
+            heapq.heapreplace(self.heap, (-priority, record))
+
+    def stats(self):
+        """
+        Returns the sample in a dict
+        """
+        return {
+            "size": self.size,
+            "seen": self.seen,
+            "fields": REQUEST_SAMPLE_FIELDS,
+            "records": sorted(record for _, record in self.heap),
+        }
+
+
+def merge_request_samples(samples, size=None):
+    """
+    Merges samples from RequestSample.stats() into a uniform sample of all of their
+    requests
+
+    arguments
+
+    samples: A list of samples from RequestSample.stats()
+    size: Size of the merged sample, defaults to the largest sample size
+    """
+    if size is None:
+        size = max([sample["size"] for sample in samples], default=0)
+    records = heapq.nsmallest(
+        size,
+        [record for sample in samples for record in sample["records"]],
+        key=lambda record: record[0],
+    )
+    return {
+        "size": size,
+        "seen": sum([sample["seen"] for sample in samples]),
+        "fields": REQUEST_SAMPLE_FIELDS,
+        "records": records,
+    }
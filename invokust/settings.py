@@ -15,6 +15,32 @@ def create_settings(
     reset_stats=False,
     run_time="3m",
     loglevel="INFO",
+    profile=False,
+    profile_interval=0.01,
+    profile_top=20,
+    monitor_interval=1.0,
+    saturation_cpu_percent=90,
+    saturation_loop_lag=50,
+    failure_patterns=None,
+    max_failures=50,
+    template_names=False,
+    name_patterns=None,
+    max_names=500,
+    request_sample_size=0,
+    start_at=None,
+    arrival_rate=None,
+    max_in_flight=100,
+    dns_cache=False,
+    warmup_connect=False,
+    warmup_time=0,
+    memory_budget=None,
+    memory_interval=0.5,
+    memory_throttle_percent=80,
+    memory_stop_percent=90,
+    checkpoint_sink=None,
+    checkpoint_id=None,
+    checkpoint_interval=30,
+    checkpoint_info=None,
 ):
     """
     Returns a settings object to configure the locust load test.
@@ -29,6 +55,32 @@ def create_settings(
         spawn_rate: number of users per second to start
         reset_stats: Whether to reset stats after all users are hatched
         run_time: The length of time to run the test for. Cannot exceed the duration limit set by lambda
+        profile: Whether to run a sampling profiler on the load generator during the test
+        profile_interval: Seconds between profiler samples
+        profile_top: Number of hottest functions to include in the profile results
+        monitor_interval: Seconds between load generator CPU and event loop lag samples
+        saturation_cpu_percent: CPU utilisation above which the load generator is saturated
+        saturation_loop_lag: 95th percentile event loop lag (ms) above which the load generator is saturated
+        failure_patterns: List of [regex, replacement] used to normalise error messages. Defaults replace IDs, UUIDs and timestamps
+        max_failures: Number of most frequent failures to return, the rest are counted in an "other" entry
+        template_names: Turn request names into templates with the default patterns, which replace numeric, hex and UUID path segments and query string values
+        name_patterns: List of [regex, replacement] used to turn request names into templates instead of the default patterns
+        max_names: Number of distinct request names to record, requests with further names are counted in an "<other>" entry. 0 disables the limit
+        request_sample_size: Number of individual requests to keep in a uniform random sample. 0 disables sampling
+        start_at: Unix timestamp to wait for before spawning all users at once, to start many load tests at the same time
+        arrival_rate: Tasks to start per second regardless of response times (open model) instead of running num_users users
+        max_in_flight: Maximum number of concurrently running tasks with arrival_rate, further arrivals are dropped
+        dns_cache: Whether to resolve the target hosts before the load test and answer DNS lookups from memory
+        warmup_connect: Whether to open a connection to each target host before the load test
+        warmup_time: Seconds at the start of run_time whose statistics are reported separately from the rest
+        memory_budget: Memory (MB) the load generator may use, e.g. the Lambda function memory size. None only samples memory use
+        memory_interval: Seconds between memory use samples
+        memory_throttle_percent: Percentage of memory_budget at which no more users are started
+        memory_stop_percent: Percentage of memory_budget at which the load test is stopped early with the results so far
+        checkpoint_sink: URL of a sink (see sinks.py) to write the statistics since the previous checkpoint to periodically. None disables checkpoints
+        checkpoint_id: ID the checkpoints of the load test are stored under
+        checkpoint_interval: Seconds between checkpoints
+        checkpoint_info: Dict of details added to each checkpoint, e.g. the Lambda function memory_limit
 
     If from_environment is set to True then this function will attempt to set
     the attributes from environment variables. The environment variables are
@@ -54,6 +106,52 @@ def create_settings(
     settings.run_time = run_time
     settings.spawn_rate = spawn_rate
 
+    # parameters to profile the load generator
+    settings.profile = profile
+    settings.profile_interval = profile_interval
+    settings.profile_top = profile_top
+
+    # parameters to detect load generator saturation
+    settings.monitor_interval = monitor_interval
+    settings.saturation_cpu_percent = saturation_cpu_percent
+    settings.saturation_loop_lag = saturation_loop_lag
+
+    # parameters to limit the size of failure results
+    settings.failure_patterns = failure_patterns
+    settings.max_failures = max_failures
+
+    # parameters to limit the number of request names
+    settings.template_names = template_names
+    settings.name_patterns = name_patterns
+    settings.max_names = max_names
+
+    # parameters to sample individual requests
+    settings.request_sample_size = request_sample_size
+
+    # parameters to start many load tests at the same time
+    settings.start_at = start_at
+
+    # parameters to run tasks at a constant arrival rate
+    settings.arrival_rate = arrival_rate
+    settings.max_in_flight = max_in_flight
+
+    # parameters to warm up before measuring
+    settings.dns_cache = dns_cache
+    settings.warmup_connect = warmup_connect
+    settings.warmup_time = warmup_time
+
+    # parameters to stay within the memory budget
+    settings.memory_budget = memory_budget
+    settings.memory_interval = memory_interval
+    settings.memory_throttle_percent = memory_throttle_percent
+    settings.memory_stop_percent = memory_stop_percent
+
+    # parameters to write checkpoints of the statistics during the load test
+    settings.checkpoint_sink = checkpoint_sink
+    settings.checkpoint_id = checkpoint_id
+    settings.checkpoint_interval = checkpoint_interval
+    settings.checkpoint_info = checkpoint_info
+
     if from_environment:
         for attribute in [
             "locustfile",
@@ -63,12 +161,21 @@ def create_settings(
             "num_users",
             "spawn_rate",
             "loglevel",
+            "reset_stats",
+            "warmup_time",
+            "memory_budget",
         ]:
             var_name = "LOCUST_{0}".format(attribute.upper())
             var_value = os.environ.get(var_name)
             if var_value:
                 setattr(settings, attribute, var_value)
 
+        if isinstance(settings.reset_stats, str):
+            settings.reset_stats = settings.reset_stats.lower() in ["true", "1", "yes"]
+        settings.warmup_time = float(settings.warmup_time)
+        if settings.memory_budget:
+            settings.memory_budget = float(settings.memory_budget)
+
     if settings.locustfile is None and settings.classes is None:
         raise Exception("One of locustfile or classes must be specified")
 
@@ -85,7 +192,11 @@ def create_settings(
                 # This needs fixing
                 settings.classes[idx] = eval(val)
 
-    for attribute in ["classes", "host", "num_users", "spawn_rate"]:
+    required_attributes = ["classes", "host"]
+    if not settings.arrival_rate:
+        required_attributes += ["num_users", "spawn_rate"]
+
+    for attribute in required_attributes:
         val = getattr(settings, attribute, None)
         if not val:
             raise Exception(
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import logging
+import threading
+from boto3.session import Session
+
+logger = logging.getLogger(__name__)
+
+
+def result_key(invocation_id):
+    """
+    Returns the key that the results of an invocation are stored under in a sink
+    """
+    return "{0}.json".format(invocation_id)
+
+
+class LocalDirectorySink(object):
+    """
+    Stores results as JSON files in a local directory. Useful for testing, or with a
+    directory shared between the load generators and the orchestrator.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.url = path
+        os.makedirs(path, exist_ok=True)
+
+    def put(self, key, results):
+        # written to a temporary file first so a partial file is never listed
+        temporary_path = os.path.join(self.path, ".{0}.tmp".format(key))
+        with open(temporary_path, "w") as f:
+            json.dump(results, f)
+        os.replace(temporary_path, os.path.join(self.path, key))
+
+    def list_keys(self, prefix=""):
+        return [
+            name
+            for name in os.listdir(self.path)
+            if name.endswith(".json")
+            and name.startswith(prefix)
+            and not name.startswith(".")
+        ]
+
+    def get(self, key):
+        with open(os.path.join(self.path, key)) as f:
+            return json.load(f)
+
+    def delete(self, key):
+        try:
+            os.remove(os.path.join(self.path, key))
+        except FileNotFoundError:
+            pass
+
+
+class S3Sink(object):
+    """
+    Stores results as JSON objects in an S3 bucket, or an S3 compatible object store
+    with an s3_client created with endpoint_url
+    """
+
+    def __init__(self, bucket, prefix="", s3_client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url = "s3://{0}/{1}".format(bucket, prefix)
+        self.client = s3_client or Session().client("s3")
+
+    def put(self, key, results):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.prefix + key,
+            Body=json.dumps(results).encode("utf-8"),
+            ContentType="application/json",
+        )
+
+    def list_keys(self, prefix=""):
+        keys = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            for item in page.get("Contents", []):
+                keys.append(item["Key"][len(self.prefix) :])
+        return keys
+
+    def get(self, key):
+        response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        return json.loads(response["Body"].read().decode("utf-8"))
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+
+def create_sink(url):
+    """
+    Returns a sink for a URL: s3://bucket/prefix/ for S3, or a local directory path
+    (optionally file://path)
+    """
+    if url.startswith("s3://"):
+        bucket, _, prefix = url[len("s3://") :].partition("/")
+        return S3Sink(bucket, prefix)
+    if url.startswith("file://"):
+        url = url[len("file://") :]
+    return LocalDirectorySink(url)
+
+
+class ResultsCollector(object):
+    """
+    Polls a sink for the results of asynchronous invocations and hands them to the
+    threads waiting for them. Results of invocations that nobody is waiting for are
+    left in the sink.
+
+    Only the keys starting with prefix are listed, so a load test that gives its
+    invocation IDs a prefix of its own doesn't list the results and checkpoints of
+    other load tests in the same sink.
+    """
+
+    def __init__(self, sink, poll_interval=1, prefix=""):
+        self.sink = sink
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.results = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def expect(self, invocation_id):
+        """
+        Registers an invocation whose results will be waited for
+        """
+        with self.lock:
+            self.pending[invocation_id] = threading.Event()
+
+    def forget(self, invocation_id):
+        """
+        Stops waiting for the results of an invocation
+        """
+        with self.lock:
+            self.pending.pop(invocation_id, None)
+            self.results.pop(invocation_id, None)
+
+    def wait(self, invocation_id, timeout=None):
+        """
+        Waits for the results of an invocation. Returns the results, or None if they
+        didn't arrive within the timeout.
+        """
+        with self.lock:
+            event = self.pending[invocation_id]
+        event.wait(timeout)
+        with self.lock:
+            del self.pending[invocation_id]
+            return self.results.pop(invocation_id, None)
+
+    def poll(self):
+        """
+        Collects the results of pending invocations from the sink
+        """
+        for key in self.sink.list_keys(self.prefix):
+            invocation_id = key[: -len(".json")]
+            with self.lock:
+                event = self.pending.get(invocation_id)
+            if event is None or event.is_set():
+                continue
+            results = self.sink.get(key)
+            self.sink.delete(key)
+            with self.lock:
+                self.results[invocation_id] = results
+                event.set()
+
+    def _poll_loop(self):
+        while not self.stop_event.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error("Polling the results sink failed: {0}".format(repr(e)))
+
+    def start(self):
+        """
+        Starts polling in a thread
+        """
+        self.thread = threading.Thread(name="results_collector", target=self._poll_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops polling
+        """
+        self.stop_event.set()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+import ssl
+import time
+import socket
+import logging
+import requests
+import gevent.socket
+from gevent import monkey
+from urllib.parse import urlsplit
+from locust.clients import HttpSession
+from locust.contrib.fasthttp import FastHttpSession
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def get_target_hosts(host, user_classes):
+    """
+    Returns a list of (scheme, hostname, port) tuples of the load test host and the
+    hosts set on user classes
+    """
+    urls = [host] + [getattr(user_class, "host", None) for user_class in user_classes]
+    targets = []
+    for url in urls:
+        if not url:
+            continue
+        parts = urlsplit(url)
+        if not parts.hostname:
+            continue
+        target = (
+            parts.scheme,
+            parts.hostname,
+            parts.port or DEFAULT_PORTS.get(parts.scheme, 80),
+        )
+        if target not in targets:
+            targets.append(target)
+    return targets
+
+
+class DNSCache(object):
+    """
+    Resolves hostnames once before the load test and answers later lookups from
+    memory.
+
+    The addresses are resolved with the blocking resolver of the standard library,
+    before any users are running, instead of the gevent thread pool resolver which
+    can fail with LoopExit errors on AWS Lambda. Lookups of other hostnames, or with
+    flags, are passed on to the original getaddrinfo.
+    """
+
+    def __init__(self):
+        self.addresses = {}
+        self.getaddrinfo = None
+        self.gevent_getaddrinfo = None
+
+    def resolve(self, hostname):
+        """
+        Resolves a hostname and caches all of its addresses. Returns the resolve time
+        in ms.
+        """
+        start_time = time.time()
+        blocking_getaddrinfo = monkey.get_original("socket", "getaddrinfo")
+        self.addresses[hostname] = blocking_getaddrinfo(hostname, None)
+        return (time.time() - start_time) * 1000
+
+    def lookup(self, host, port, family=0, type=0, proto=0, flags=0):
+        """
+        getaddrinfo replacement that returns the cached addresses of a hostname
+        """
+        if isinstance(port, str) and port.isdigit():
+            port = int(port)
+        if (
+            host in self.addresses
+            and not flags
+            and (port is None or isinstance(port, int))
+        ):
+            results = []
+            for address in self.addresses[host]:
+                a_family, a_type, a_proto, canonname, sockaddr = address
+                if (
+                    (not family or a_family == family)
+                    and (not type or a_type == type)
+                    and (not proto or a_proto == proto)
+                ):
+                    sockaddr = (sockaddr[0], port or 0) + sockaddr[2:]
+                    results.append((a_family, a_type, a_proto, canonname, sockaddr))
+            if results:
+                return results
+        return self.getaddrinfo(host, port, family, type, proto, flags)
+
+    def install(self):
+        """
+        Replaces getaddrinfo of the socket and gevent.socket modules with lookup
+        """
+        self.getaddrinfo = socket.getaddrinfo
+        self.gevent_getaddrinfo = gevent.socket.getaddrinfo
+        socket.getaddrinfo = self.lookup
+        gevent.socket.getaddrinfo = self.lookup
+
+    def uninstall(self):
+        """
+        Restores the original getaddrinfo functions
+        """
+        if self.getaddrinfo:
+            socket.getaddrinfo = self.getaddrinfo
+            gevent.socket.getaddrinfo = self.gevent_getaddrinfo
+            self.getaddrinfo = None
+
+    def stats(self):
+        """
+        Returns the cached addresses of each hostname in a dict
+        """
+        return {
+            hostname: sorted(set(address[4][0] for address in addresses))
+            for hostname, addresses in self.addresses.items()
+        }
+
+
+def warm_up_connection(scheme, hostname, port, timeout=10):
+    """
+    Opens and closes a connection to a target, including the TLS handshake for
+    https, to check that it can be reached. The connection isn't kept, see
+    warm_up_session for the connections of the users. Returns the connect time in
+    ms.
+    """
+    start_time = time.time()
+    sock = socket.create_connection((hostname, port), timeout=timeout)
+    try:
+        if scheme == "https":
+            context = ssl.create_default_context()
+            sock = context.wrap_socket(sock, server_hostname=hostname)
+    finally:
+        sock.close()
+    return (time.time() - start_time) * 1000
+
+
+def warm_up_session(user, timeout=10):
+    """
+    Opens a connection in the connection pool of the HTTP client of a user with a
+    HEAD request to its host, which isn't recorded in the statistics. Users of
+    HttpUser and FastHttpUser are supported, other users are left alone.
+    """
+    client = getattr(user, "client", None)
+    if not user.host:
+        return
+    try:
+        if isinstance(client, HttpSession):
+            # the request method of requests skips the request event of Locust
+            requests.Session.request(client, "HEAD", user.host, timeout=timeout)
+        elif isinstance(client, FastHttpSession):
+            client.client.urlopen(user.host, method="HEAD")
+    except Exception as e:
+        logger.warning("Warm-up request to {0} failed: {1}".format(user.host, repr(e)))
+
+
+def with_session_warm_up(user_class):
+    """
+    Returns a subclass of a user class whose users warm up their HTTP client with
+    warm_up_session before their on_start
+    """
+
+    def on_start(self):
+        warm_up_session(self)
+        user_class.on_start(self)
+
+    return type(
+        user_class.__name__,
+        (user_class,),
+        {"on_start": on_start, "__module__": user_class.__module__},
+    )
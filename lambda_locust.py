@@ -6,24 +6,49 @@ sys.path.insert(0, "python-packages")
 
 import logging
 import json
-from invokust.aws_lambda import get_lambda_runtime_info
+from invokust.aws_lambda import coordinator_handler, get_lambda_runtime_info
+from invokust.sinks import create_sink, result_key
 from invokust import LocustLoadTest, create_settings
 
 logging.basicConfig(level=logging.INFO)
 
 
 def handler(event=None, context=None):
+    # coordinators of fan_out_load_test invoke load invocations of this function
+    if event and "coordinator" in event:
+        return json.dumps(coordinator_handler(event, context))
+
+    # asynchronous invocations return their results through a sink
+    event = dict(event or {})
+    results_sink = event.pop("results_sink", None)
+    invocation_id = event.pop("invocation_id", None)
+
     try:
         if event:
             settings = create_settings(**event)
         else:
             settings = create_settings(from_environment=True)
 
+        if context and settings.memory_budget is None:
+            settings.memory_budget = int(context.memory_limit_in_mb)
+        if context and settings.checkpoint_sink:
+            # lets the orchestrator account for recovered invocations, keeping the
+            # details set by the caller
+            settings.checkpoint_info = dict(settings.checkpoint_info or {})
+            settings.checkpoint_info.setdefault(
+                "memory_limit", context.memory_limit_in_mb
+            )
+            settings.checkpoint_info.setdefault(
+                "aws_request_id", context.aws_request_id
+            )
+
         loadtest = LocustLoadTest(settings)
         loadtest.run()
 
     except Exception as e:
         logging.error("Locust exception {0}".format(repr(e)))
+        if results_sink:
+            create_sink(results_sink).put(result_key(invocation_id), {"error": repr(e)})
 
     else:
         locust_stats = loadtest.stats()
@@ -33,4 +58,6 @@ def handler(event=None, context=None):
         json_results = json.dumps(loadtest_results)
 
         logging.info(json_results)
+        if results_sink:
+            create_sink(results_sink).put(result_key(invocation_id), loadtest_results)
         return json_results
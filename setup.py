@@ -14,7 +14,7 @@ setup(
     url="https://github.com/FutureSharks/invokust",
     download_url="https://github.com/FutureSharks/invokust/archive/0.77.tar.gz",
     license="MIT",
-    scripts=["invokr.py"],
+    scripts=["invokr.py", "invokr_compare.py"],
     packages=[
         "invokust",
         "invokust.aws_lambda",
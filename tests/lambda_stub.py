@@ -0,0 +1,105 @@
+import io
+import json
+import time
+import threading
+from botocore.exceptions import ClientError
+from invokust.sinks import create_sink, result_key
+
+
+def locust_result(num_requests=100, num_requests_fail=0, memory_limit=128, **kwargs):
+    """
+    Returns a result in the format of the Lambda function in lambda_locust.py
+    """
+    result = {
+        "requests": {
+            "GET_/": {
+                "request_type": "GET",
+                "num_requests": num_requests,
+                "num_failures": num_requests_fail,
+                "min_response_time": 10,
+                "median_response_time": 20,
+                "avg_response_time": 20,
+                "max_response_time": 30,
+                "response_times": {10: num_requests // 2, 30: num_requests // 2},
+                "total_rps": num_requests / 10.0,
+                "total_rpm": num_requests * 6.0,
+            }
+        },
+        "failures": {},
+        "num_requests": num_requests,
+        "num_requests_fail": num_requests_fail,
+        "start_time": time.time() - 10,
+        "end_time": time.time(),
+        "remaining_time": 290000,
+        "memory_limit": memory_limit,
+        "aws_request_id": "stub",
+    }
+    result.update(kwargs)
+    return result
+
+
+class StubLambdaClient(object):
+    """
+    A stand-in for the boto3 Lambda client that calls a function instead of invoking
+    a Lambda function
+    """
+
+    def __init__(self, handler=None, latency=0.05, memory_size=128, timeout=300):
+        self.handler = handler or (lambda payload, client: locust_result())
+        self.latency = latency
+        self.memory_size = memory_size
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.invocations = []
+        self.event_invoke_configs = {}
+        self.event_invoke_config_history = []
+
+    def invoke(self, FunctionName, Payload, **kwargs):
+        payload = json.loads(Payload)
+        with self.lock:
+            self.invocations.append((FunctionName, payload, kwargs))
+        if kwargs.get("InvocationType") == "Event":
+            threading.Thread(target=self.invoke_event, args=(payload,)).start()
+            return {"StatusCode": 202, "Payload": io.BytesIO(b"")}
+        time.sleep(self.latency)
+        result = self.handler(payload, self)
+        return {
+            "StatusCode": 200,
+            "Payload": io.BytesIO(json.dumps(json.dumps(result)).encode("utf-8")),
+        }
+
+    def invoke_event(self, payload):
+        # writes the results to the sink like lambda_locust.py does
+        payload = dict(payload)
+        time.sleep(self.latency)
+        sink = create_sink(payload.pop("results_sink"))
+        key = result_key(payload.pop("invocation_id"))
+        try:
+            sink.put(key, self.handler(payload, self))
+        except Exception as e:
+            sink.put(key, {"error": repr(e)})
+
+    def get_function_configuration(self, FunctionName):
+        return {
+            "MemorySize": self.memory_size,
+            "Timeout": self.timeout,
+            "LastUpdateStatus": "Successful",
+        }
+
+    def update_function_configuration(self, FunctionName, MemorySize):
+        self.memory_size = MemorySize
+
+    def get_function_event_invoke_config(self, FunctionName):
+        if FunctionName not in self.event_invoke_configs:
+            raise ClientError(
+                {"Error": {"Code": "ResourceNotFoundException", "Message": ""}},
+                "GetFunctionEventInvokeConfig",
+            )
+        return dict(self.event_invoke_configs[FunctionName], LastModified=0)
+
+    def put_function_event_invoke_config(self, FunctionName, **kwargs):
+        self.event_invoke_configs[FunctionName] = kwargs
+        self.event_invoke_config_history.append((FunctionName, kwargs))
+
+    def delete_function_event_invoke_config(self, FunctionName):
+        del self.event_invoke_configs[FunctionName]
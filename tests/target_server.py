@@ -0,0 +1,15 @@
+from gevent.pywsgi import WSGIServer
+
+
+def start_target_server(app=None):
+    """
+    Starts a local HTTP server in a greenlet and returns the server and its URL
+    """
+
+    def default_app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"ok"]
+
+    server = WSGIServer(("127.0.0.1", 0), app or default_app, log=None)
+    server.start()
+    return server, "http://127.0.0.1:{0}".format(server.server_port)
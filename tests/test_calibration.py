@@ -0,0 +1,79 @@
+from unittest import TestCase
+from invokust.aws_lambda import calibrate_users
+from lambda_stub import StubLambdaClient, locust_result
+
+
+def handler(payload, client):
+    # throughput scales with users up to 20 users and the CPU saturates at 50
+    num_users = payload["num_users"]
+    rpm = min(num_users, 20) * 600
+    return locust_result(
+        num_requests=int(rpm / 6),
+        generator={
+            "cpu_percent": num_users * 2,
+            "loop_lag_p95": 1,
+            "saturated": num_users >= 50,
+        },
+    )
+
+
+class TestCalibration(TestCase):
+    def test_throughput_stops_scaling(self):
+        lambda_client = StubLambdaClient(handler, latency=0)
+        calibration = calibrate_users(
+            "lambda_locust",
+            {"locustfile": "locustfile.py"},
+            user_levels=[5, 10, 20, 40, 50],
+            probe_time=2,
+            probe_warmup_time=1,
+            target_rpm=100000,
+            lambda_client=lambda_client,
+            print_stats_delay=0.1,
+        )
+
+        assert calibration["num_users"] == 20
+        assert round(calibration["rpm_per_invocation"]) == 12000
+        assert calibration["threads"] == 9
+        # stopped at 40 users without probing 50
+        assert [p["num_users"] for p in calibration["probes"]] == [5, 10, 20, 40]
+        payload = lambda_client.invocations[0][1]
+        assert payload["run_time"] == "2s"
+        assert payload["warmup_time"] == 1
+        assert payload["spawn_rate"] == payload["num_users"] == 5
+
+    def test_saturated(self):
+        calibration = calibrate_users(
+            "lambda_locust",
+            {},
+            user_levels=[10, 50, 100],
+            probe_time=2,
+            probe_warmup_time=1,
+            lambda_client=StubLambdaClient(handler, latency=0),
+            print_stats_delay=0.1,
+        )
+
+        assert calibration["num_users"] == 10
+        assert calibration["threads"] is None
+        assert calibration["probes"][-1]["saturated"]
+
+    def test_failing_requests(self):
+        def failing_handler(payload, client):
+            # the target fails 5% of the requests from 20 users
+            result = handler(payload, client)
+            if payload["num_users"] >= 20:
+                result["num_requests_fail"] = result["num_requests"] // 20
+            return result
+
+        calibration = calibrate_users(
+            "lambda_locust",
+            {},
+            user_levels=[5, 10, 20, 40],
+            probe_time=2,
+            probe_warmup_time=1,
+            lambda_client=StubLambdaClient(failing_handler, latency=0),
+            print_stats_delay=0.1,
+        )
+
+        assert calibration["num_users"] == 10
+        assert [p["num_users"] for p in calibration["probes"]] == [5, 10, 20]
+        assert calibration["probes"][-1]["failure_ratio"] == 0.05
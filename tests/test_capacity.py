@@ -0,0 +1,64 @@
+from unittest import TestCase
+from invokust.aws_lambda import capacity_search
+from invokust.aws_lambda.capacity import evaluate_slos
+from lambda_stub import StubLambdaClient, locust_result
+
+THREADS = 2
+
+
+def handler(payload, client):
+    # response times go up when the target receives more than 3000 requests/minute
+    rpm = payload["arrival_rate"] * THREADS * 60
+    result = locust_result(num_requests=100)
+    result["requests"]["GET_/"]["response_times"] = (
+        {50: 100} if rpm <= 3000 else {50: 80, 900: 20}
+    )
+    return result
+
+
+class TestCapacitySearch(TestCase):
+    def test_evaluate_slos(self):
+        step_stats = {
+            "num_requests": 100,
+            "failure_ratio": 0.02,
+            "dropped_ratio": 0,
+            "p95": 300,
+            "p99": 800,
+        }
+        violations = evaluate_slos(step_stats, max_p95=500, max_p99=500)
+
+        assert violations == [{"slo": "p99", "limit": 500, "value": 800}]
+        assert evaluate_slos(step_stats, max_failure_ratio=0.01)[0]["slo"] == (
+            "failure_ratio"
+        )
+
+    def test_capacity_search_finds_boundary(self):
+        lambda_client = StubLambdaClient(handler, latency=0.05)
+        capacity_results = capacity_search(
+            "lambda_locust",
+            [1200, 2400, 4800],
+            threads=THREADS,
+            ramp_time=0,
+            time_limit=0.1,
+            lambda_payload={"run_time": "1s"},
+            mode="rpm",
+            max_p95=500,
+            binary_search_steps=2,
+            lambda_client=lambda_client,
+            print_stats_delay=0.1,
+        )
+
+        steps = [
+            (s["level"], s["search"], s["passed"]) for s in capacity_results["steps"]
+        ]
+        assert steps == [
+            (1200, "step", True),
+            (2400, "step", True),
+            (4800, "step", False),
+            (3600, "binary", False),
+            (3000, "binary", True),
+        ]
+        assert capacity_results["max_passing_level"] == 3000
+        assert capacity_results["min_failing_level"] == 3600
+        assert capacity_results["steps"][2]["violations"][0]["slo"] == "p95"
+        assert capacity_results["steps"][2]["stats"]["p95"] == 900
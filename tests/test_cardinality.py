@@ -0,0 +1,102 @@
+import uuid
+import itertools
+from unittest import TestCase
+from locust import HttpUser, constant, task
+
+from invokust import LocustLoadTest, create_settings
+from invokust.aws_lambda import results_aggregator
+from invokust.cardinality import OVERFLOW_NAME, NameLimiter, compile_name_patterns
+from lambda_stub import locust_result
+from target_server import start_target_server
+
+counter = itertools.count()
+
+
+class UnnamedUser(HttpUser):
+    wait_time = constant(0.02)
+
+    @task
+    def get_item(self):
+        self.client.get("/item/{0}?ref={1}".format(next(counter), uuid.uuid4()))
+
+
+class TestCardinality(TestCase):
+    def test_template(self):
+        limiter = NameLimiter(None, compile_name_patterns())
+
+        assert limiter.template("/item/123") == "/item/<n>"
+        assert limiter.template("/user/42/orders/7.json") == "/user/<n>/orders/<n>.json"
+        assert (
+            limiter.template("/doc/3f2504e0-4f89-11d3-9a0c-0305e82c3301")
+            == "/doc/<uuid>"
+        )
+        assert limiter.template("/blob/5d41402abc4b2a76b9719d911017c592") == (
+            "/blob/<hex>"
+        )
+        assert limiter.template("/search?q=shoes&page=2") == "/search?q=<v>&page=<v>"
+        assert limiter.template("/v2/Login step") == "/v2/Login step"
+
+    def test_names_templated(self):
+        server, host = start_target_server()
+        settings = create_settings(
+            classes=[UnnamedUser],
+            host=host,
+            num_users=2,
+            spawn_rate=2,
+            run_time="2s",
+            template_names=True,
+        )
+        loadtest = LocustLoadTest(settings)
+        loadtest.run()
+        server.stop()
+        stats = loadtest.stats()
+
+        assert list(stats["requests"]) == ["GET_/item/<n>?ref=<v>"]
+        assert stats["names"]["templated_requests"] == stats["num_requests"]
+        assert stats["names"]["overflow_requests"] == 0
+
+    def test_names_capped(self):
+        server, host = start_target_server()
+        settings = create_settings(
+            classes=[UnnamedUser],
+            host=host,
+            num_users=2,
+            spawn_rate=2,
+            run_time="2s",
+            max_names=5,
+        )
+        loadtest = LocustLoadTest(settings)
+        loadtest.run()
+        server.stop()
+        stats = loadtest.stats()
+        names = stats["names"]
+
+        # the overflow entry is added to the limit
+        assert len(stats["requests"]) == 6
+        overflow = stats["requests"]["GET_" + OVERFLOW_NAME]
+        assert names["overflow_requests"] == overflow["num_requests"]
+        assert names["overflow_requests"] == stats["num_requests"] - 5
+        assert len(names["overflow_examples"]) == 10
+        # request names aren't templated by default
+        assert names["templated_requests"] == 0
+        assert all(["<n>" not in name for name in stats["requests"]])
+
+    def test_aggregate_names(self):
+        names = {
+            "max_names": 5,
+            "names": 6,
+            "templated_requests": 0,
+            "overflow_requests": 10,
+            "overflow_examples": ["/item/6", "/item/7"],
+        }
+        agg_results = results_aggregator(
+            [
+                locust_result(names=names),
+                locust_result(names=dict(names, overflow_examples=["/item/7"])),
+                locust_result(names=dict(names, overflow_requests=0)),
+            ]
+        )
+
+        assert agg_results["names"]["overflow_requests"] == 20
+        assert agg_results["names"]["overflow_invocations"] == 2
+        assert agg_results["names"]["overflow_examples"] == ["/item/6", "/item/7"]
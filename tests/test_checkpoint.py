@@ -0,0 +1,137 @@
+import time
+import tempfile
+from unittest import TestCase
+from locust import HttpUser, constant, task
+from invokust import LocustLoadTest, create_settings
+from invokust.aws_lambda import LambdaLoadTest, results_aggregator
+from invokust.checkpoint import checkpoint_key, merge_checkpoints, stats_delta
+from invokust.sinks import LocalDirectorySink, create_sink
+from lambda_stub import StubLambdaClient, locust_result
+from target_server import start_target_server
+
+
+class WebsiteUser(HttpUser):
+    wait_time = constant(0.05)
+
+    @task
+    def get_home_page(self):
+        self.client.get("/")
+
+
+def failing_handler(payload, client):
+    # writes two checkpoints and then fails like a timed out invocation
+    sink = create_sink(payload["checkpoint_sink"])
+    start_time = time.time() - 60
+    previous = None
+    for sequence, num_requests in enumerate([100, 300]):
+        current = locust_result(num_requests=num_requests)
+        sink.put(
+            checkpoint_key(payload["checkpoint_id"], sequence),
+            dict(
+                stats_delta(current, previous),
+                sequence=sequence,
+                start_time=start_time,
+                time=start_time + 30 * (sequence + 1),
+                info={"memory_limit": 128},
+            ),
+        )
+        previous = current
+    raise Exception("Task timed out")
+
+
+class CountingSink(LocalDirectorySink):
+    def __init__(self, path):
+        super().__init__(path)
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return super().get(key)
+
+
+def successful_handler(payload, client):
+    sink = create_sink(payload["checkpoint_sink"])
+    sink.put(checkpoint_key(payload["checkpoint_id"], 0), {})
+    return locust_result()
+
+
+class TestCheckpoints(TestCase):
+    def test_load_test_checkpoints(self):
+        server, host = start_target_server()
+        sink = LocalDirectorySink(tempfile.mkdtemp())
+        settings = create_settings(
+            classes=[WebsiteUser],
+            host=host,
+            num_users=2,
+            spawn_rate=2,
+            run_time="3s",
+            checkpoint_sink=sink.url,
+            checkpoint_id="test",
+            checkpoint_interval=0.5,
+        )
+        loadtest = LocustLoadTest(settings)
+        loadtest.run()
+        server.stop()
+        stats = loadtest.stats()
+
+        checkpoints = [sink.get(key) for key in sink.list_keys("checkpoint-test-")]
+        assert len(checkpoints) >= 4
+        recovered = merge_checkpoints(checkpoints)
+        task = recovered["requests"]["GET_/"]
+        assert 0 < recovered["num_requests"] <= stats["num_requests"]
+        assert task["num_requests"] == recovered["num_requests"]
+        assert sum(task["response_times"].values()) == task["num_requests"]
+        assert recovered["recovered_checkpoints"] == len(checkpoints)
+
+    def test_failed_invocation_recovered(self):
+        lambda_client = StubLambdaClient(failing_handler, latency=0.1)
+        load_test = LambdaLoadTest(
+            "lambda_locust",
+            threads=1,
+            ramp_time=0,
+            time_limit=1,
+            lambda_payload={"run_time": "1s"},
+            print_stats_delay=0.1,
+            lambda_client=lambda_client,
+            checkpoint_sink=tempfile.mkdtemp(),
+        )
+        load_test.run()
+        results = load_test.get_locust_results()
+
+        assert results
+        assert load_test.get_summary_stats()["recovered_invocation_count"] == len(
+            results
+        )
+        assert load_test.checkpoint_sink.list_keys() == []
+        assert results[0]["num_requests"] == 300
+        assert results[0]["requests"]["GET_/"]["response_times"] == {10: 150, 30: 150}
+        assert results[0]["requests"]["GET_/"]["total_rps"] == 5
+
+        agg_results = results_aggregator(results)
+        assert agg_results["num_requests"] == 300 * len(results)
+        assert agg_results["recovered"]["invocations"] == len(results)
+        assert agg_results["recovered"]["checkpoints"] == 2 * len(results)
+        assert agg_results["gb_seconds"] > 0
+
+    def test_successful_invocation_checkpoints_deleted(self):
+        sink = CountingSink(tempfile.mkdtemp())
+        load_test = LambdaLoadTest(
+            "lambda_locust",
+            threads=1,
+            ramp_time=0,
+            time_limit=1,
+            lambda_payload={"run_time": "1s"},
+            print_stats_delay=0.1,
+            lambda_client=StubLambdaClient(successful_handler, latency=0.1),
+            checkpoint_sink=sink,
+        )
+        # a checkpoint written after its invocation was recovered
+        late_checkpoint = checkpoint_key(load_test.run_id + "-late", 2)
+        sink.put(late_checkpoint, {})
+        sink.put(checkpoint_key("other", 0), {})
+        load_test.run()
+
+        assert load_test.get_locust_results()
+        # deleted without being read
+        assert sink.gets == 0
+        assert sink.list_keys() == [checkpoint_key("other", 0)]
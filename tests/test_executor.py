@@ -0,0 +1,185 @@
+import gevent
+from unittest import TestCase
+from locust import HttpUser, TaskSet, constant, task
+from locust.exception import StopUser
+from invokust import LocustLoadTest, create_settings
+from invokust.aws_lambda import LambdaLoadTest, results_aggregator
+from lambda_stub import StubLambdaClient, locust_result
+from target_server import start_target_server
+
+
+class SlowUser(HttpUser):
+    wait_time = constant(1)
+
+    @task
+    def get_slow_page(self):
+        self.client.get("/slow")
+
+
+class PageTasks(TaskSet):
+    @task
+    def get_page(self):
+        self.client.get("/page")
+
+
+class TaskSetUser(HttpUser):
+    wait_time = constant(1)
+    tasks = [PageTasks]
+    started = 0
+    stopped = 0
+
+    def on_start(self):
+        TaskSetUser.started += 1
+
+    def on_stop(self):
+        TaskSetUser.stopped += 1
+
+
+class SlowStartUser(HttpUser):
+    wait_time = constant(1)
+
+    def on_start(self):
+        gevent.sleep(1)
+
+    @task
+    def get_page(self):
+        self.client.get("/page")
+
+
+class StoppingUser(HttpUser):
+    wait_time = constant(1)
+    users = []
+    stopped = 0
+
+    def on_stop(self):
+        StoppingUser.stopped += 1
+
+    @task
+    def get_page(self):
+        StoppingUser.users.append(self)
+        self.client.get("/page")
+        raise StopUser()
+
+
+def slow_app(environ, start_response):
+    gevent.sleep(0.2)
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"ok"]
+
+
+def run_arrival_rate_test(arrival_rate, max_in_flight, user_class=SlowUser):
+    server, host = start_target_server(slow_app)
+    settings = create_settings(
+        classes=[user_class],
+        host=host,
+        run_time="2s",
+        arrival_rate=arrival_rate,
+        max_in_flight=max_in_flight,
+    )
+    loadtest = LocustLoadTest(settings)
+    loadtest.run()
+    server.stop()
+    return loadtest.stats()
+
+
+class TestArrivalRateExecutor(TestCase):
+    def test_arrival_rate_independent_of_response_times(self):
+        stats = run_arrival_rate_test(arrival_rate=20, max_in_flight=100)
+        arrivals = stats["arrivals"]
+
+        # a closed model user with a 1s wait time would make 2 requests
+        assert 30 <= arrivals["arrivals"] <= 41
+        assert arrivals["dropped"] == 0
+        assert 3 <= arrivals["max_in_flight_reached"] <= 10
+        assert stats["num_requests"] >= 30
+        latency = arrivals["intended_response_times"]["GET_/slow"]
+        assert latency["response_time_percentiles"][50] >= 200
+
+    def test_arrivals_dropped_when_pool_is_busy(self):
+        stats = run_arrival_rate_test(arrival_rate=20, max_in_flight=1)
+        arrivals = stats["arrivals"]
+
+        assert arrivals["max_in_flight_reached"] == 1
+        assert arrivals["dropped"] > arrivals["arrivals"] / 2
+        assert stats["num_requests"] <= 10
+
+    def test_slow_on_start_does_not_delay_arrivals(self):
+        stats = run_arrival_rate_test(
+            arrival_rate=20, max_in_flight=100, user_class=SlowStartUser
+        )
+        arrivals = stats["arrivals"]
+
+        assert 30 <= arrivals["arrivals"] <= 41
+        assert arrivals["max_lateness"] < 500
+        assert stats["num_requests"] >= 15
+
+    def test_stopped_users_not_reused(self):
+        StoppingUser.users = []
+        StoppingUser.stopped = 0
+        stats = run_arrival_rate_test(
+            arrival_rate=10, max_in_flight=100, user_class=StoppingUser
+        )
+
+        # every arrival needs a new user
+        assert len(StoppingUser.users) >= 15
+        assert len(set(map(id, StoppingUser.users))) == len(StoppingUser.users)
+        assert StoppingUser.stopped == len(StoppingUser.users)
+        assert stats["arrivals"]["dropped"] == 0
+
+    def test_taskset_tasks_run_per_arrival(self):
+        server, host = start_target_server(slow_app)
+        settings = create_settings(
+            classes=[TaskSetUser],
+            host=host,
+            run_time="2s",
+            arrival_rate=10,
+            max_in_flight=100,
+        )
+        loadtest = LocustLoadTest(settings)
+        loadtest.run()
+        server.stop()
+        stats = loadtest.stats()
+
+        assert stats["requests"]["GET_/page"]["num_requests"] >= 15
+        assert TaskSetUser.started == TaskSetUser.stopped > 0
+
+    def test_arrival_rate_split_across_threads(self):
+        def handler(payload, client):
+            return locust_result(
+                arrivals={
+                    "arrival_rate": payload["arrival_rate"],
+                    "max_in_flight": 100,
+                    "arrivals": 100,
+                    "dropped": 10,
+                    "late": 1,
+                    "max_lateness": 12,
+                    "max_in_flight_reached": 5,
+                    "intended_response_times": {
+                        "GET_/": {"response_times": {"20": 90, "40": 10}}
+                    },
+                }
+            )
+
+        lambda_client = StubLambdaClient(handler)
+        load_test = LambdaLoadTest(
+            "lambda_locust",
+            threads=4,
+            ramp_time=0,
+            time_limit=0.1,
+            lambda_payload={"run_time": "1s"},
+            lambda_client=lambda_client,
+            print_stats_delay=0.1,
+            arrival_rate=100,
+        )
+        load_test.run()
+        agg_results = results_aggregator(load_test.get_locust_results())
+
+        assert lambda_client.invocations[0][1]["arrival_rate"] == 25
+        arrivals = agg_results["arrivals"]
+        assert arrivals["arrivals"] == 100 * len(lambda_client.invocations)
+        assert arrivals["dropped_ratio"] == 0.1
+        latency = arrivals["intended_response_times"]["GET_/"]
+        assert latency["response_time_counts"][40] == 10 * len(
+            lambda_client.invocations
+        )
+        assert latency["response_time_percentiles"][95] == 40
@@ -0,0 +1,126 @@
+import uuid
+from unittest import TestCase
+from locust import HttpUser, constant, task
+from invokust import LocustLoadTest, create_settings
+from invokust.aws_lambda import results_aggregator
+from invokust.failures import (
+    cap_failures,
+    compile_failure_patterns,
+    normalise_error,
+)
+from target_server import start_target_server
+
+
+def not_found_app(environ, start_response):
+    start_response("404 Not Found", [("Content-Type", "text/plain")])
+    return [b"not found"]
+
+
+class ItemUser(HttpUser):
+    wait_time = constant(0.05)
+
+    @task
+    def get_item(self):
+        item_id = uuid.uuid4()
+        with self.client.get(
+            "/items/{0}".format(item_id), name="/items/[id]", catch_response=True
+        ) as response:
+            response.failure("item {0} not found".format(item_id))
+
+
+def failure(error, occurrences):
+    return {"method": "GET", "name": "/", "error": error, "occurrences": occurrences}
+
+
+def locust_result(failures):
+    return {
+        "requests": {},
+        "failures": failures,
+        "num_requests": 0,
+        "num_requests_fail": 0,
+        "remaining_time": 1000,
+        "memory_limit": 128,
+    }
+
+
+class TestFailures(TestCase):
+    def test_normalise_error(self):
+        patterns = compile_failure_patterns()
+
+        assert (
+            normalise_error(
+                "HTTPError('404 Client Error: Not Found for url: http://host/items/123?id=4')",
+                patterns,
+            )
+            == "HTTPError('404 Client Error: Not Found for url: http://host/items/<n>?id=<n>')"
+        )
+        assert (
+            normalise_error(
+                "request 123e4567-e89b-12d3-a456-426614174000 at 2024-01-02T03:04:05Z",
+                patterns,
+            )
+            == "request <uuid> at <timestamp>"
+        )
+        assert (
+            normalise_error("order 1234", compile_failure_patterns([])) == "order 1234"
+        )
+        assert (
+            normalise_error("order 1234", compile_failure_patterns([[r"\d+", "#"]]))
+            == "order #"
+        )
+
+    def test_cap_failures(self):
+        failures = {str(n): failure(str(n), n) for n in range(1, 11)}
+        capped = cap_failures(failures, 3)
+
+        assert sorted(capped) == ["10", "8", "9", "other"]
+        assert capped["other"]["occurrences"] == sum(range(1, 8))
+        assert capped["other"]["distinct_errors"] == 7
+
+    def test_other_failures_counted_once(self):
+        failures = {str(n): failure(str(n), 1) for n in range(1, 6)}
+        # the same errors are left out by both invocations
+        agg_results = results_aggregator(
+            [
+                locust_result(cap_failures(failures, 2)),
+                locust_result(cap_failures(failures, 2)),
+            ],
+            max_failures=2,
+        )
+        other = agg_results["failures"]["other"]
+
+        assert other["occurrences"] == 6
+        assert other["distinct_errors"] == 3
+
+    def test_aggregated_failures_capped_and_not_mutated(self):
+        first = {"a": failure("a", 5), "b": failure("b", 1)}
+        second = {"a": failure("a", 2), "c": failure("c", 3)}
+        agg_results = results_aggregator(
+            [locust_result(first), locust_result(second)], max_failures=2
+        )
+
+        assert agg_results["failures"]["a"]["occurrences"] == 7
+        assert agg_results["failures"]["c"]["occurrences"] == 3
+        assert agg_results["failures"]["other"]["occurrences"] == 1
+        assert first["a"]["occurrences"] == 5
+
+    def test_errors_with_ids_share_one_entry(self):
+        server, host = start_target_server(not_found_app)
+        settings = create_settings(
+            classes=[ItemUser],
+            host=host,
+            num_users=2,
+            spawn_rate=2,
+            run_time="2s",
+        )
+        loadtest = LocustLoadTest(settings)
+        loadtest.run()
+        server.stop()
+        stats = loadtest.stats()
+
+        assert stats["num_requests_fail"] > 5
+        assert len(loadtest.env.runner.errors) == 1
+        assert len(stats["failures"]) == 1
+        assert list(stats["failures"].values())[0]["error"] == (
+            "CatchResponseError('item <uuid> not found')"
+        )
@@ -0,0 +1,109 @@
+from unittest import TestCase
+from invokust.aws_lambda import coordinator_handler, fan_out_load_test
+from invokust.aws_lambda.fan_out import split_threads
+from lambda_stub import StubLambdaClient, locust_result
+
+
+class TestFanOut(TestCase):
+    def test_split_threads(self):
+        assert split_threads(10, 3) == [4, 3, 3]
+        assert split_threads(2, 3) == [1, 1, 0]
+
+    def test_coordinators_merged(self):
+        load_client = StubLambdaClient(
+            lambda payload, client: locust_result(num_requests=20), latency=0.2
+        )
+
+        def coordinator(payload, client):
+            if payload["coordinator"]["threads"] == 1:
+                raise Exception("coordinator failed")
+            return coordinator_handler(payload, lambda_client=load_client)
+
+        coordinator_client = StubLambdaClient(coordinator, latency=0.1)
+        fan_out_results = fan_out_load_test(
+            "lambda_locust",
+            3,
+            5,
+            0,
+            1,
+            {"run_time": "1s"},
+            coordinator_function_name="lambda_coordinator",
+            start_lead_time=1,
+            lambda_client=coordinator_client,
+            print_stats_delay=0.1,
+        )
+
+        assert [c[0] for c in coordinator_client.invocations] == [
+            "lambda_coordinator"
+        ] * 3
+        assert set(c[0] for c in load_client.invocations) == {"lambda_locust"}
+        coordinators = fan_out_results["coordinators"]
+        assert [c["coordinator"] for c in coordinators] == [0, 1, 2]
+        assert [c["summary"]["threads"] for c in coordinators[:2]] == [2, 2]
+        assert "coordinator failed" in coordinators[2]["error"]
+
+        summary = fan_out_results["summary"]
+        partial = fan_out_results["partial"]
+        assert summary["coordinator_errors"] == 1
+        assert partial["lambda_invocations"] == summary["lambda_invocation_count"]
+        assert partial["lambda_invocations"] == len(load_client.invocations)
+        assert partial["num_requests"] == 20 * len(load_client.invocations)
+
+    def test_coordinator_timeout_from_function(self):
+        # the coordinator would be killed before the load test ends
+        with self.assertRaises(ValueError):
+            fan_out_load_test(
+                "lambda_locust",
+                2,
+                2,
+                0,
+                240,
+                {"run_time": "3m"},
+                lambda_client=StubLambdaClient(timeout=300),
+            )
+
+    def test_coordinator_response_capped(self):
+        def handler(payload, client):
+            return locust_result(
+                failures={
+                    "GET_/_error {0}".format(n): {
+                        "method": "GET",
+                        "name": "/",
+                        "error": "error {0}".format(n),
+                        "occurrences": 1,
+                    }
+                    for n in range(20)
+                },
+                generator={
+                    "cpu_percent": 100,
+                    "cpu_percent_max": 100,
+                    "loop_lag_avg": 1,
+                    "loop_lag_max": 1,
+                    "scheduling_delay_max": 1,
+                    "saturated": True,
+                },
+            )
+
+        results = coordinator_handler(
+            {
+                "coordinator": {
+                    "function_name": "lambda_locust",
+                    "threads": 2,
+                    "ramp_time": 0,
+                    "time_limit": 1,
+                    "lambda_payload": {"run_time": "1s"},
+                    "lambda_timeout": 300000,
+                    "print_stats_delay": 0.1,
+                    "max_failures": 5,
+                }
+            },
+            lambda_client=StubLambdaClient(handler, latency=0.2),
+        )
+        partial = results["partial"]
+
+        assert len(partial["failures"]) == 6
+        assert partial["failures"]["other"]["occurrences"] == 15 * (
+            partial["lambda_invocations"]
+        )
+        generator = partial["generator"]
+        assert generator["saturated_invocations"] == partial["lambda_invocations"]
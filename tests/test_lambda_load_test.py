@@ -0,0 +1,265 @@
+import time
+import threading
+from unittest import TestCase
+from invokust.aws_lambda import (
+    InvocationTracer,
+    LambdaLoadTest,
+    results_aggregator,
+    results_aggregator_by_target,
+)
+from lambda_stub import StubLambdaClient, locust_result
+
+
+class TestLambdaLoadTestTargets(TestCase):
+    def test_load_spread_across_targets(self):
+        eu_client = StubLambdaClient(latency=0.2)
+        us_client = StubLambdaClient(
+            lambda payload, client: locust_result(num_requests=50), latency=0.2
+        )
+        load_test = LambdaLoadTest(
+            None,
+            threads=3,
+            ramp_time=0,
+            time_limit=1,
+            lambda_payload={"run_time": "1s"},
+            print_stats_delay=0.1,
+            targets=[
+                {
+                    "function_name": "lambda_locust",
+                    "region": "eu-west-1",
+                    "weight": 2,
+                    "lambda_client": eu_client,
+                },
+                {
+                    "function_name": "lambda_locust",
+                    "region": "us-east-1",
+                    "lambda_client": us_client,
+                },
+            ],
+        )
+        load_test.run()
+        results = load_test.get_locust_results()
+
+        eu_threads = set(
+            r["target"]["name"] for r in results if r["target"]["region"] == "eu-west-1"
+        )
+        assert eu_threads == {"eu-west-1/lambda_locust"}
+        assert len(eu_client.invocations) > len(us_client.invocations) > 0
+
+        by_region = results_aggregator_by_target(results, key="region")
+        assert set(by_region) == {"eu-west-1", "us-east-1"}
+        assert by_region["us-east-1"]["num_requests"] == 50 * len(us_client.invocations)
+        assert sum(r["num_requests"] for r in by_region.values()) == sum(
+            r["num_requests"] for r in results
+        )
+
+    def test_target_thread_limit(self):
+        lambda_client = StubLambdaClient(latency=0.2)
+        load_test = LambdaLoadTest(
+            None,
+            threads=5,
+            ramp_time=0,
+            time_limit=1,
+            lambda_payload={"run_time": "1s"},
+            print_stats_delay=0.1,
+            targets=[
+                {
+                    "function_name": "lambda_locust",
+                    "max_threads": 2,
+                    "lambda_client": lambda_client,
+                }
+            ],
+        )
+        load_test.start_time -= 10
+        for _ in range(5):
+            load_test.start_new_thread()
+        thread_count = load_test.get_thread_count()
+        thread_required = load_test.thread_required()
+        load_test.stop_threads()
+
+        assert thread_count == 2
+        assert load_test.targets[0]["thread_count"] == 2
+        assert thread_required is False
+
+
+class TestLambdaLoadTestHandoff(TestCase):
+    def test_handoff_overlap(self):
+        lambda_client = StubLambdaClient(latency=2)
+        load_test = LambdaLoadTest(
+            "lambda_locust",
+            threads=1,
+            ramp_time=0,
+            time_limit=3.5,
+            lambda_payload={"num_users": 10, "spawn_rate": 1, "run_time": "2s"},
+            lambda_client=lambda_client,
+            print_stats_delay=0.1,
+            handoff_overlap=1,
+        )
+        load_test.run()
+
+        payloads = [payload for _, payload, _ in lambda_client.invocations]
+        assert len(payloads) >= 3
+        assert "start_at" not in payloads[0]
+        # each handoff invocation starts when the previous one is expected to end
+        self.assertAlmostEqual(payloads[2]["start_at"] - payloads[1]["start_at"], 2)
+        assert len(load_test.get_locust_results()) == len(payloads)
+        # rpm is measured over the 10 second load test of each result
+        assert load_test.calculate_rpm() == 600
+
+    def test_handoff_load_stays_flat(self):
+        lock = threading.Lock()
+        loads = []
+
+        def handler(payload, client):
+            # waits for start_at like LocustLoadTest and records when it ran users
+            load_start_time = max(time.time(), payload.get("start_at", 0))
+            time.sleep(load_start_time - time.time())
+            with lock:
+                # invoked from the handoff thread of its thread
+                loads.append(
+                    (
+                        threading.current_thread().name,
+                        load_start_time,
+                        load_start_time + 1,
+                    )
+                )
+            time.sleep(1)
+            return locust_result()
+
+        load_test = LambdaLoadTest(
+            "lambda_locust",
+            threads=2,
+            ramp_time=0,
+            time_limit=2.5,
+            lambda_payload={"num_users": 10, "run_time": "1s"},
+            lambda_client=StubLambdaClient(handler, latency=0.05),
+            print_stats_delay=0.1,
+            handoff_overlap=0.5,
+        )
+        load_test.run()
+
+        threads = set([thread for thread, _, _ in loads])
+        assert len(threads) == 2
+        # from when both threads run until the first of them ends
+        start_time = max([min([s for t, s, _ in loads if t == n]) for n in threads])
+        end_time = min([max([e for t, _, e in loads if t == n]) for n in threads])
+        boundaries = [s for _, s, _ in loads] + [e for _, _, e in loads]
+        sample_time = start_time
+        while sample_time < end_time:
+            # leaves out the time around each handoff, shifted by the latency
+            if all([abs(sample_time - b) > 0.1 for b in boundaries]):
+                running = [s for _, s, e in loads if s <= sample_time < e]
+                assert len(running) == 2
+            sample_time += 0.05
+
+    def test_handoff_overlap_longer_than_run_time(self):
+        with self.assertRaises(ValueError):
+            LambdaLoadTest(
+                "lambda_locust",
+                threads=1,
+                ramp_time=0,
+                time_limit=1,
+                lambda_payload={"num_users": 10, "run_time": "3m"},
+                lambda_client=StubLambdaClient(),
+                handoff_overlap=180,
+            )
+
+
+class TestLambdaLoadTestSynchronisedStart(TestCase):
+    def test_all_threads_start_at_same_time(self):
+        def handler(payload, client):
+            time.sleep(max(0, payload.get("start_at", 0) - time.time()))
+            return locust_result(start_skew=0.01 if "start_at" in payload else None)
+
+        lambda_client = StubLambdaClient(handler, latency=0.1)
+        load_test = LambdaLoadTest(
+            "lambda_locust",
+            threads=4,
+            ramp_time=0,
+            time_limit=0.1,
+            lambda_payload={"num_users": 10, "run_time": "1s"},
+            lambda_client=lambda_client,
+            print_stats_delay=0.1,
+            start_lead_time=1,
+        )
+        load_test.run()
+
+        payloads = [payload for _, payload, _ in lambda_client.invocations]
+        assert len(payloads) == 4
+        assert set(payload["start_at"] for payload in payloads) == {load_test.start_at}
+
+        agg_results = results_aggregator(load_test.get_locust_results())
+        assert agg_results["start_skew"]["invocations"] == 4
+        assert agg_results["start_skew"]["spread"] == 0
+
+    def test_lead_time_longer_than_timeout(self):
+        with self.assertRaises(ValueError):
+            LambdaLoadTest(
+                "lambda_locust",
+                threads=1,
+                ramp_time=0,
+                time_limit=1,
+                lambda_payload={"run_time": "3m"},
+                lambda_timeout=200000,
+                lambda_client=StubLambdaClient(),
+                start_lead_time=30,
+            )
+
+
+class TestLambdaLoadTestTracing(TestCase):
+    def test_invocations_traced(self):
+        lambda_client = StubLambdaClient(
+            lambda payload, client: locust_result(remaining_time=300000 - 150),
+            latency=0.2,
+        )
+        tracer = InvocationTracer()
+        load_test = LambdaLoadTest(
+            "lambda_locust",
+            threads=2,
+            ramp_time=0,
+            time_limit=1,
+            lambda_payload={"run_time": "1s"},
+            lambda_client=lambda_client,
+            print_stats_delay=0.1,
+            start_lead_time=0.1,
+            tracer=tracer,
+        )
+        load_test.run()
+        trace = tracer.trace_events()["traceEvents"]
+        phases = tracer.stats()["phases"]
+
+        lanes = [e["args"]["name"] for e in trace if e["name"] == "thread_name"]
+        assert sorted(lanes) == ["thread_1", "thread_2"]
+        invokes = [e for e in trace if e["name"] == "invoke"]
+        executions = [e for e in trace if e["name"] == "lambda_execution"]
+        assert len(invokes) == len(executions) == len(lambda_client.invocations)
+        for invoke, execution in zip(invokes, executions):
+            assert invoke["tid"] == execution["tid"]
+            assert invoke["ts"] <= execution["ts"]
+            assert execution["ts"] + execution["dur"] <= invoke["ts"] + invoke["dur"]
+        assert phases["lambda_execution"]["percentiles"][50] == 150
+        assert 40 <= phases["overhead"]["percentiles"][50] <= 100
+        assert phases["decode"]["count"] == len(invokes)
+
+    def test_lane_released_when_invocation_raises(self):
+        # results without remaining_time make invoke_lambda raise
+        lambda_client = StubLambdaClient(
+            lambda payload, client: {"num_requests": 1}, latency=0
+        )
+        tracer = InvocationTracer()
+        load_test = LambdaLoadTest(
+            "lambda_locust",
+            threads=1,
+            ramp_time=0,
+            time_limit=1,
+            lambda_payload={"run_time": "1s"},
+            lambda_client=lambda_client,
+            tracer=tracer,
+        )
+        target = load_test.targets[0]
+        for _ in range(2):
+            with self.assertRaises(KeyError):
+                load_test.invoke_lambda(target, "thread_1", {"run_time": "1s"})
+
+        assert tracer.busy_lanes == set()
+        assert list(tracer.lanes) == [("thread_1", 0)]
@@ -0,0 +1,50 @@
+from unittest import TestCase
+from invokust.aws_lambda import RollingStats
+
+
+def locust_result(response_times, num_failures=0):
+    return {
+        "requests": {
+            "GET_/": {
+                "num_requests": sum(response_times.values()),
+                "num_failures": num_failures,
+                "response_times": response_times,
+            }
+        }
+    }
+
+
+class TestRollingStats(TestCase):
+    def test_percentiles_merged_across_results(self):
+        rolling_stats = RollingStats(window=60)
+        rolling_stats.start_time = 0
+        rolling_stats.add_result(locust_result({"10": 90}), timestamp=100)
+        rolling_stats.add_result(locust_result({"500": 10}, 5), timestamp=110)
+        stats = rolling_stats.get_stats(timestamp=120)["GET_/"]
+
+        assert stats["p50"] == 10
+        assert stats["p95"] == 500
+        assert stats["fail_ratio"] == 0.05
+        assert stats["rps"] == 100 / 60.0
+
+    def test_results_expire_from_window(self):
+        rolling_stats = RollingStats(window=60)
+        rolling_stats.start_time = 0
+        rolling_stats.add_result(locust_result({"500": 10}), timestamp=100)
+        rolling_stats.add_result(locust_result({"10": 10}), timestamp=150)
+        rolling_stats.add_result(locust_result({"20": 10}), timestamp=170)
+        stats = rolling_stats.get_stats(timestamp=170)["GET_/"]
+
+        assert stats["p99"] == 20
+        assert len(rolling_stats.results) == 2
+        assert rolling_stats.tasks["GET_/"]["response_times"] == {10: 10, 20: 10}
+
+        assert rolling_stats.get_stats(timestamp=300) == {}
+
+    def test_render(self):
+        rolling_stats = RollingStats(window=60)
+        rolling_stats.add_result(locust_result({"10": 10}))
+        table = rolling_stats.render()
+
+        assert "GET" in table
+        assert "P99" in table
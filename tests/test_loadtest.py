@@ -1,8 +1,10 @@
 import os
+import time
 from unittest import TestCase
 from invokust.settings import create_settings
 from invokust import LocustLoadTest
 from locust import HttpUser, between, task
+from target_server import start_target_server
 
 
 class WebsiteUser(HttpUser):
@@ -33,3 +35,26 @@ class TestLocustLoadTest(TestCase):
         assert stats["num_requests"] > 10
         assert stats["end_time"] > stats["start_time"]
         assert stats["requests"]["GET_/"]["total_rpm"] > 0
+
+    def test_synchronised_start(self):
+        server, host = start_target_server()
+        start_at = time.time() + 2
+        settings = create_settings(
+            classes=[WebsiteUser],
+            host=host,
+            num_users=5,
+            spawn_rate=1,
+            run_time="2s",
+            start_at=start_at,
+        )
+
+        loadtest = LocustLoadTest(settings)
+        loadtest.run()
+        server.stop()
+        stats = loadtest.stats()
+
+        assert stats["start_at"] == start_at
+        assert 0 <= stats["start_skew"] < 0.5
+        # all users are spawned at once instead of at the spawn rate
+        assert stats["num_requests"] >= 5
+        assert stats["end_time"] - stats["start_time"] < 2.5
@@ -0,0 +1,132 @@
+import time
+import gevent
+from unittest import TestCase
+from locust import HttpUser, constant, task
+from invokust import LocustLoadTest, create_settings
+from invokust.monitor import GeneratorMonitor, MemoryGuard
+from invokust.aws_lambda import results_aggregator
+from target_server import start_target_server
+
+
+def result(request_id, saturated):
+    return {
+        "requests": {},
+        "failures": {},
+        "num_requests": 0,
+        "num_requests_fail": 0,
+        "remaining_time": 1000,
+        "memory_limit": 128,
+        "aws_request_id": request_id,
+        "generator": {
+            "cpu_percent": 95 if saturated else 20,
+            "cpu_percent_max": 100 if saturated else 30,
+            "loop_lag_avg": 80 if saturated else 1,
+            "loop_lag_p95": 120 if saturated else 2,
+            "loop_lag_max": 200 if saturated else 3,
+            "scheduling_delay_avg": 10 if saturated else 0.1,
+            "scheduling_delay_max": 40 if saturated else 0.2,
+            "samples": 10,
+            "saturated": saturated,
+        },
+    }
+
+
+class TestGeneratorMonitor(TestCase):
+    def test_idle_generator_not_saturated(self):
+        monitor = GeneratorMonitor(interval=0.1)
+        monitor.start()
+        gevent.sleep(0.5)
+        monitor.stop()
+        stats = monitor.stats()
+
+        assert stats["samples"] >= 3
+        assert stats["cpu_percent"] < 50
+        assert stats["saturated"] is False
+
+    def test_busy_generator_saturated(self):
+        monitor = GeneratorMonitor(interval=0.1)
+        monitor.start()
+        # 1s of CPU time with short pauses, about 98% utilisation
+        for _ in range(5):
+            end = time.process_time() + 0.2
+            while time.process_time() < end:
+                pass
+            gevent.sleep(0.001)
+        monitor.stop()
+        stats = monitor.stats()
+
+        assert stats["loop_lag_max"] > 50
+        assert stats["cpu_percent"] > 90
+        assert stats["saturated"] is True
+
+    def test_saturated_invocations_flagged(self):
+        agg_results = results_aggregator(
+            [result("a", False), result("b", True), result("c", False)]
+        )
+
+        assert agg_results["generator"]["saturated_invocations"] == 1
+        assert agg_results["generator"]["saturated_invocation_ids"] == ["b"]
+        assert agg_results["generator"]["loop_lag_max"] == 200
+
+
+class WebsiteUser(HttpUser):
+    wait_time = constant(0.1)
+
+    @task
+    def get_home_page(self):
+        self.client.get("/")
+
+
+class TestMemoryGuard(TestCase):
+    def test_thresholds(self):
+        calls = []
+        rss = MemoryGuard().process.memory_info().rss / 1048576.0
+        # the current memory use is 85% of the budget
+        guard = MemoryGuard(
+            budget=rss / 0.85,
+            on_throttle=lambda: calls.append("throttle"),
+            on_stop=lambda: calls.append("stop"),
+        )
+        guard.sample()
+        guard.sample()
+        stats = guard.stats()
+
+        assert calls == ["throttle"]
+        assert stats["throttled"] is True
+        assert stats["stopped_early"] is False
+        assert stats["peak_rss_mb"] > 0
+        assert stats["container_peak_rss_mb"] > 0
+        assert stats["headroom_mb"] == stats["budget_mb"] - stats["peak_rss_mb"]
+        assert stats["headroom_mb"] <= stats["budget_mb"] * 0.2
+
+    def test_load_test_stopped_early(self):
+        server, host = start_target_server()
+        settings = create_settings(
+            classes=[WebsiteUser],
+            host=host,
+            num_users=5,
+            spawn_rate=5,
+            run_time="10s",
+            memory_budget=1,
+        )
+        loadtest = LocustLoadTest(settings)
+        start_time = time.time()
+        loadtest.run()
+        server.stop()
+        stats = loadtest.stats()
+
+        assert time.time() - start_time < 5
+        assert stats["memory"]["stopped_early"] is True
+        assert stats["memory"]["headroom_mb"] < 0
+        assert stats["end_time"] is not None
+
+        agg_results = results_aggregator(
+            [
+                dict(result("a", False), memory=stats["memory"]),
+                dict(result("b", False), memory=dict(stats["memory"], budget_mb=None)),
+            ]
+        )
+        assert agg_results["memory"]["stopped_invocations"] == 2
+        assert (
+            agg_results["memory"]["headroom_mb_min"] == stats["memory"]["headroom_mb"]
+        )
@@ -0,0 +1,67 @@
+import time
+from unittest import TestCase
+from invokust.profiler import SamplingProfiler
+from invokust.aws_lambda import results_aggregator
+
+
+def busy_function(seconds):
+    end = time.time() + seconds
+    total = 0
+    while time.time() < end:
+        total += sum(range(100))
+    return total
+
+
+class TestSamplingProfiler(TestCase):
+    def test_samples_busy_function(self):
+        profiler = SamplingProfiler(interval=0.005)
+        profiler.start()
+        busy_function(0.5)
+        profiler.stop()
+        stats = profiler.stats(top=5)
+
+        assert stats["samples"] > 10
+        assert stats["sample_time"] > 0.4
+        busy = [key for key in stats["functions"] if key.endswith("(busy_function)")]
+        assert len(busy) == 1
+        assert stats["functions"][busy[0]]["cumulative_samples"] > stats["samples"] / 2
+        assert stats["functions"][busy[0]]["cumulative_time"] > 0.2
+
+    def test_profiles_merged_across_invocations(self):
+        def result(functions):
+            return {
+                "requests": {},
+                "failures": {},
+                "num_requests": 0,
+                "num_requests_fail": 0,
+                "remaining_time": 1000,
+                "memory_limit": 128,
+                "profile": {
+                    "interval": 0.01,
+                    "samples": 10,
+                    "idle_samples": 2,
+                    "sample_time": 0.1,
+                    "functions": functions,
+                },
+            }
+
+        def function(samples):
+            return {
+                "self_samples": samples,
+                "cumulative_samples": samples,
+                "self_time": samples * 0.01,
+                "cumulative_time": samples * 0.01,
+            }
+
+        agg_results = results_aggregator(
+            [
+                result({"a": function(5), "b": function(3)}),
+                result({"a": function(4), "c": function(1)}),
+            ],
+            profile_top=1,
+        )
+
+        assert agg_results["profile"]["samples"] == 20
+        assert agg_results["profile"]["idle_samples"] == 4
+        assert list(agg_results["profile"]["functions"]) == ["a"]
+        assert agg_results["profile"]["functions"]["a"]["self_samples"] == 9
@@ -0,0 +1,76 @@
+import json
+from unittest import TestCase
+from invokust.aws_lambda import (
+    finalize_aggregate,
+    merge_partial_aggregates,
+    partial_aggregate,
+    results_aggregator,
+)
+from lambda_stub import locust_result
+
+
+def create_results():
+    results = []
+    for i in range(6):
+        result = locust_result(num_requests=100 + i * 10, aws_request_id=str(i))
+        result["requests"]["GET_/item/<n>"] = dict(
+            result["requests"]["GET_/"], response_times={i * 100 + 10: 5, 20: 5}
+        )
+        result["failures"] = {
+            "GET_/_error {0}".format(n): {
+                "method": "GET",
+                "name": "/",
+                "error": "error {0}".format(n),
+                "occurrences": n + i,
+            }
+            for n in range(i)
+        }
+        result["start_skew"] = i / 10.0
+        result["request_sample"] = {
+            "size": 3,
+            "seen": 10,
+            "fields": [],
+            "records": [[i / 10.0 + r / 100.0, i, r] for r in range(3)],
+        }
+        results.append(result)
+    return results
+
+
+class TestResultsAggregator(TestCase):
+    def test_tree_reduce(self):
+        results = create_results()
+        single_pass = results_aggregator(results, max_failures=2)
+
+        # partial aggregates of each pair, written to JSON and merged in two levels
+        partials = [
+            json.loads(json.dumps(partial_aggregate(results[i : i + 2])))
+            for i in range(0, len(results), 2)
+        ]
+        merged = merge_partial_aggregates(
+            [partials[2], merge_partial_aggregates(partials[:2])]
+        )
+        tree = finalize_aggregate(merged, max_failures=2)
+
+        for key in ["num_requests", "lambda_invocations", "failures", "gb_seconds"]:
+            assert tree[key] == single_pass[key]
+        assert tree["request_sample"] == single_pass["request_sample"]
+        assert tree["start_skew"]["spread"] == single_pass["start_skew"]["spread"]
+        for task in ["GET_/", "GET_/item/<n>"]:
+            for key in ["num_requests", "response_time_percentiles", "response_times"]:
+                assert tree["requests"][task][key] == single_pass["requests"][task][key]
+            # sums are only equal up to floating point rounding
+            self.assertAlmostEqual(
+                tree["requests"][task]["total_rps"],
+                single_pass["requests"][task]["total_rps"],
+            )
+        # the failures limit is applied after merging
+        assert len(tree["failures"]) == 3
+        assert tree["failures"]["other"]["distinct_errors"] == 3
+
+    def test_avg_response_time_weighted_by_requests(self):
+        slow = locust_result(num_requests=900)
+        slow["requests"]["GET_/"]["avg_response_time"] = 100
+        agg_results = results_aggregator([locust_result(num_requests=100), slow])
+
+        # (100 * 20 + 900 * 100) / 1000, not the mean of 20 and 100
+        assert agg_results["requests"]["GET_/"]["avg_response_time"] == 92
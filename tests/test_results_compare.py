@@ -0,0 +1,104 @@
+import json
+import random
+import tempfile
+from unittest import TestCase
+from invokust.aws_lambda import results_aggregator, compare_results, load_results
+from invokust.aws_lambda.results_compare import mann_whitney_u, kolmogorov_smirnov
+
+
+def locust_result(response_times, num_requests_fail=0, total_rps=10):
+    num_requests = sum(response_times.values())
+    return {
+        "requests": {
+            "GET_/": {
+                "request_type": "GET",
+                "num_requests": num_requests,
+                "min_response_time": min(response_times),
+                "median_response_time": 0,
+                "avg_response_time": sum(k * v for k, v in response_times.items())
+                / num_requests,
+                "max_response_time": max(response_times),
+                "response_times": response_times,
+                "total_rps": total_rps,
+                "total_rpm": total_rps * 60,
+            }
+        },
+        "failures": {},
+        "num_requests": num_requests,
+        "num_requests_fail": num_requests_fail,
+        "remaining_time": 1000,
+        "memory_limit": 128,
+    }
+
+
+def response_times(mean, count, seed):
+    rng = random.Random(seed)
+    counts = {}
+    for _ in range(count):
+        value = int(rng.gauss(mean, 10))
+        counts[value] = counts.get(value, 0) + 1
+    return counts
+
+
+class TestResultsCompare(TestCase):
+    def test_median_is_not_mean_of_medians(self):
+        agg_results = results_aggregator(
+            [locust_result({10: 1}), locust_result({100: 99})]
+        )
+
+        assert agg_results["requests"]["GET_/"]["median_response_time"] == 100
+        assert agg_results["requests"]["GET_/"]["response_time_percentiles"][99] == 100
+
+    def test_statistical_tests(self):
+        same = response_times(100, 1000, 1)
+        u, p_value = mann_whitney_u(same, response_times(100, 1000, 2))
+        assert p_value > 0.01
+        u, p_value = mann_whitney_u(same, response_times(110, 1000, 3))
+        assert p_value < 0.01
+        d, p_value = kolmogorov_smirnov(same, response_times(130, 1000, 4))
+        assert d > 0.5
+        assert p_value < 0.01
+
+    def test_no_regression_for_same_distribution(self):
+        baseline = results_aggregator([locust_result(response_times(100, 2000, 1))])
+        candidate = results_aggregator([locust_result(response_times(100, 2000, 2))])
+        comparison = compare_results(baseline, candidate)
+
+        assert comparison["regressions"] == []
+
+    def test_regressions_detected(self):
+        baseline = results_aggregator([locust_result(response_times(100, 2000, 1))])
+        candidate = results_aggregator(
+            [
+                locust_result(
+                    response_times(150, 2000, 2), num_requests_fail=200, total_rps=5
+                )
+            ]
+        )
+        comparison = compare_results(baseline, candidate)
+
+        assert sorted(r["type"] for r in comparison["regressions"]) == [
+            "failure_ratio",
+            "latency",
+            "throughput",
+        ]
+        throughput = [
+            r for r in comparison["regressions"] if r["type"] == "throughput"
+        ][0]
+        assert throughput["threshold_only"] is True
+
+    def test_load_results_after_json_round_trip(self):
+        agg_results = results_aggregator([locust_result(response_times(100, 500, 1))])
+        with tempfile.TemporaryDirectory() as directory:
+            with open(directory + "/results.json", "w") as f:
+                json.dump(agg_results, f)
+            with open(directory + "/invokr.log", "w") as f:
+                f.write(
+                    "INFO Aggregated results: {0}\n".format(json.dumps(agg_results))
+                )
+
+            from_json = load_results(directory + "/results.json")
+            from_log = load_results(directory + "/invokr.log")
+
+        assert compare_results(from_json, from_log)["regressions"] == []
+        assert from_log["num_requests"] == 500
@@ -0,0 +1,64 @@
+from unittest import TestCase
+from locust import HttpUser, constant, task
+from invokust import LocustLoadTest, create_settings
+from invokust.sampling import RequestSample, merge_request_samples
+from target_server import start_target_server
+
+
+class WebsiteUser(HttpUser):
+    wait_time = constant(0.05)
+
+    @task
+    def get_home_page(self):
+        self.client.get("/")
+
+
+def fill_sample(sample, name, count):
+    for response_time in range(count):
+        sample.on_request("GET", name, response_time, 10)
+
+
+class TestRequestSample(TestCase):
+    def test_sample_size_is_constant(self):
+        sample = RequestSample(100, seed=1)
+        fill_sample(sample, "/", 10000)
+        stats = sample.stats()
+
+        assert stats["seen"] == 10000
+        assert len(stats["records"]) == 100
+        mean = sum(r[4] for r in stats["records"]) / 100.0
+        assert 3500 < mean < 6500
+
+    def test_merged_sample_is_uniform(self):
+        small = RequestSample(500, seed=1)
+        fill_sample(small, "/small", 1000)
+        large = RequestSample(500, seed=2)
+        fill_sample(large, "/large", 9000)
+        merged = merge_request_samples([small.stats(), large.stats()])
+
+        assert merged["seen"] == 10000
+        assert len(merged["records"]) == 500
+        from_large = len([r for r in merged["records"] if r[3] == "/large"])
+        assert 400 < from_large < 500
+
+    def test_load_test_request_sample(self):
+        server, host = start_target_server()
+        settings = create_settings(
+            classes=[WebsiteUser],
+            host=host,
+            num_users=1,
+            spawn_rate=1,
+            run_time="2s",
+            request_sample_size=5,
+        )
+        loadtest = LocustLoadTest(settings)
+        loadtest.run()
+        server.stop()
+        request_sample = loadtest.stats()["request_sample"]
+
+        assert request_sample["seen"] == loadtest.stats()["num_requests"]
+        assert len(request_sample["records"]) == 5
+        record = dict(zip(request_sample["fields"], request_sample["records"][0]))
+        assert record["status"] == 200
+        assert record["name"] == "/"
+        assert record["failed"] is False
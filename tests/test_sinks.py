@@ -0,0 +1,142 @@
+import os
+import time
+import tempfile
+from unittest import TestCase
+from invokust.aws_lambda import LambdaLoadTest, results_aggregator
+from invokust.sinks import (
+    LocalDirectorySink,
+    ResultsCollector,
+    S3Sink,
+    create_sink,
+    result_key,
+)
+from lambda_stub import StubLambdaClient, locust_result
+
+
+class TestSinks(TestCase):
+    def test_local_directory_sink(self):
+        sink = LocalDirectorySink(os.path.join(tempfile.mkdtemp(), "results"))
+        sink.put(result_key("a"), {"num_requests": 1})
+
+        assert sink.list_keys() == ["a.json"]
+        assert sink.get("a.json") == {"num_requests": 1}
+        sink.delete("a.json")
+        sink.delete("a.json")
+        assert sink.list_keys() == []
+
+    def test_create_sink(self):
+        path = tempfile.mkdtemp()
+        sink = create_sink("s3://bucket/invokust/")
+
+        assert isinstance(sink, S3Sink)
+        assert (sink.bucket, sink.prefix) == ("bucket", "invokust/")
+        assert create_sink("file://" + path).path == path
+        assert create_sink(path).path == path
+
+    def test_collector_only_takes_pending_results(self):
+        sink = LocalDirectorySink(tempfile.mkdtemp())
+        collector = ResultsCollector(sink, prefix="run-")
+        collector.expect("run-a")
+        # results of another load test are outside the prefix and never listed
+        collector.expect("other-a")
+        sink.put(result_key("run-a"), {"num_requests": 1})
+        sink.put(result_key("run-b"), {"num_requests": 2})
+        sink.put(result_key("other-a"), {"num_requests": 3})
+        collector.poll()
+
+        assert collector.wait("run-a", timeout=0) == {"num_requests": 1}
+        assert collector.wait("other-a", timeout=0) is None
+        assert sorted(sink.list_keys()) == ["other-a.json", "run-b.json"]
+        collector.expect("run-c")
+        assert collector.wait("run-c", timeout=0.1) is None
+
+
+class TestEventInvocations(TestCase):
+    def test_results_collected_from_sink(self):
+        lambda_client = StubLambdaClient(
+            lambda payload, client: locust_result(num_requests=25), latency=0.3
+        )
+        load_test = LambdaLoadTest(
+            "lambda_locust",
+            threads=2,
+            ramp_time=0,
+            time_limit=1,
+            lambda_payload={"run_time": "1s"},
+            print_stats_delay=0.1,
+            lambda_client=lambda_client,
+            results_sink=tempfile.mkdtemp(),
+            sink_poll_interval=0.05,
+        )
+        load_test.run()
+        results = load_test.get_locust_results()
+
+        assert results
+        assert load_test.lambda_invocation_errors == 0
+        for _, payload, kwargs in lambda_client.invocations:
+            assert kwargs["InvocationType"] == "Event"
+            assert payload["results_sink"] == load_test.results_sink.url
+            assert payload["invocation_id"].startswith(load_test.run_id + "-")
+        assert results_aggregator(results)["num_requests"] == 25 * len(results)
+        assert load_test.results_sink.list_keys() == []
+        # a retried invocation would add its results twice
+        assert lambda_client.event_invoke_config_history == [
+            (
+                "lambda_locust",
+                {"MaximumRetryAttempts": 0, "MaximumEventAgeInSeconds": 60},
+            )
+        ]
+        # the function had no configuration before the load test
+        assert lambda_client.event_invoke_configs == {}
+
+    def test_failed_invocation_counted(self):
+        def handler(payload, client):
+            raise Exception("failed")
+
+        load_test = LambdaLoadTest(
+            "lambda_locust",
+            threads=1,
+            ramp_time=0,
+            time_limit=1,
+            lambda_payload={"run_time": "1s"},
+            print_stats_delay=0.1,
+            lambda_client=StubLambdaClient(handler, latency=0.1),
+            results_sink=tempfile.mkdtemp(),
+            sink_poll_interval=0.05,
+        )
+        load_test.run()
+
+        assert load_test.get_locust_results() == []
+        assert load_test.lambda_invocation_errors > 0
+
+    def test_late_results_deleted_and_configuration_restored(self):
+        def handler(payload, client):
+            time.sleep(1.5)
+            return locust_result()
+
+        lambda_client = StubLambdaClient(handler, latency=0)
+        previous = {
+            "MaximumRetryAttempts": 2,
+            "MaximumEventAgeInSeconds": 3600,
+            "DestinationConfig": {"OnFailure": {"Destination": "arn"}},
+        }
+        lambda_client.event_invoke_configs["lambda_locust"] = previous
+        load_test = LambdaLoadTest(
+            "lambda_locust",
+            threads=1,
+            ramp_time=0,
+            time_limit=0.5,
+            lambda_payload={"run_time": "1s"},
+            lambda_timeout=1000,
+            print_stats_delay=0.1,
+            lambda_client=lambda_client,
+            results_sink=tempfile.mkdtemp(),
+            sink_poll_interval=0.05,
+            results_timeout=0.2,
+        )
+        load_test.run()
+
+        assert load_test.get_locust_results() == []
+        assert load_test.lambda_invocation_errors == 1
+        # the results arrived after the invocation timed out
+        assert load_test.results_sink.list_keys() == []
+        assert lambda_client.event_invoke_configs == {"lambda_locust": previous}
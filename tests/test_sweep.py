@@ -0,0 +1,60 @@
+from unittest import TestCase
+from invokust.aws_lambda import memory_sweep, results_aggregator
+from lambda_stub import StubLambdaClient, locust_result
+
+REQUESTS_BY_MEMORY_SIZE = {512: 400, 1024: 1000, 2048: 1200}
+
+
+def handler(payload, client):
+    return locust_result(
+        num_requests=REQUESTS_BY_MEMORY_SIZE[client.memory_size],
+        memory_limit=client.memory_size,
+    )
+
+
+class TestMemorySweep(TestCase):
+    def test_cost_uses_1ms_billing(self):
+        agg_results = results_aggregator(
+            [locust_result(memory_limit=1024, remaining_time=299999)]
+        )
+
+        assert agg_results["gb_seconds"] == 0.001
+        assert agg_results["requests_per_gb_second"] == 100000
+        assert agg_results["approximate_cost"] == 0.001 * 0.0000166667 + 0.0000002
+
+    def test_sweep_finds_most_efficient_memory_size(self):
+        lambda_client = StubLambdaClient(handler, latency=0.1, memory_size=128)
+        sweep_results = memory_sweep(
+            "lambda_locust",
+            [512, 1024, 2048],
+            threads=1,
+            ramp_time=0,
+            time_limit=1,
+            lambda_payload={"run_time": "1s"},
+            lambda_client=lambda_client,
+            print_stats_delay=0.5,
+        )
+
+        assert [r["configuration"] for r in sweep_results] == [1024, 512, 2048]
+        assert sweep_results[0]["results"]["requests_per_dollar"] > 0
+        assert lambda_client.memory_size == 128
+
+    def test_sweep_aliases(self):
+        lambda_client = StubLambdaClient(latency=0.1)
+        sweep_results = memory_sweep(
+            "lambda_locust",
+            ["small", "large"],
+            threads=1,
+            ramp_time=0,
+            time_limit=1,
+            lambda_payload={"run_time": "1s"},
+            lambda_client=lambda_client,
+            print_stats_delay=0.5,
+        )
+
+        assert set(r["lambda_function_name"] for r in sweep_results) == {
+            "lambda_locust:small",
+            "lambda_locust:large",
+        }
+        function_names = set(i[0] for i in lambda_client.invocations)
+        assert function_names == {"lambda_locust:small", "lambda_locust:large"}
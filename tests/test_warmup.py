@@ -0,0 +1,136 @@
+import socket
+import gevent
+from unittest import TestCase
+from locust import HttpUser, constant, task
+from invokust import LocustLoadTest, create_settings
+from invokust.warmup import DNSCache, get_target_hosts
+from target_server import start_target_server
+
+
+class WebsiteUser(HttpUser):
+    wait_time = constant(0.05)
+
+    @task
+    def get_home_page(self):
+        self.client.get("/")
+
+
+class TestWarmup(TestCase):
+    def test_get_target_hosts(self):
+        assert get_target_hosts("https://example.com", [WebsiteUser]) == [
+            ("https", "example.com", 443)
+        ]
+
+    def test_dns_cache(self):
+        dns_cache = DNSCache()
+        dns_cache.addresses["target.invalid"] = [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.1.2.3", 0)),
+            (socket.AF_INET, socket.SOCK_DGRAM, 17, "", ("10.1.2.3", 0)),
+        ]
+        original_getaddrinfo = socket.getaddrinfo
+        dns_cache.install()
+        try:
+            addresses = socket.getaddrinfo("target.invalid", 443, 0, socket.SOCK_STREAM)
+        finally:
+            dns_cache.uninstall()
+
+        assert addresses == [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.1.2.3", 443))
+        ]
+        assert socket.getaddrinfo is original_getaddrinfo
+        assert dns_cache.stats() == {"target.invalid": ["10.1.2.3"]}
+
+    def test_warmup_excluded_from_stats(self):
+        server, host = start_target_server()
+        settings = create_settings(
+            classes=[WebsiteUser],
+            host=host.replace("127.0.0.1", "localhost"),
+            num_users=2,
+            spawn_rate=2,
+            run_time="3s",
+            dns_cache=True,
+            warmup_connect=True,
+            warmup_time=1,
+        )
+        loadtest = LocustLoadTest(settings)
+        loadtest.run()
+        server.stop()
+        stats = loadtest.stats()
+        warmup = stats["warmup"]
+
+        assert "localhost" in warmup["addresses"]
+        assert warmup["connect_time"]["localhost"] > 0
+        assert warmup["num_requests"] > 0
+        assert warmup["requests"]["GET_/"]["num_requests"] == warmup["num_requests"]
+        assert stats["start_time"] == warmup["end_time"]
+        assert 0.9 < warmup["end_time"] - warmup["start_time"] < 1.5
+        # the steady state runs twice as long as the warm-up
+        assert stats["num_requests"] > warmup["num_requests"]
+
+    def test_user_sessions_warmed_up(self):
+        methods = []
+
+        def app(environ, start_response):
+            methods.append(environ["REQUEST_METHOD"])
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [b"ok"]
+
+        server, host = start_target_server(app)
+        settings = create_settings(
+            classes=[WebsiteUser],
+            host=host,
+            num_users=3,
+            spawn_rate=3,
+            run_time="1s",
+            warmup_connect=True,
+        )
+        loadtest = LocustLoadTest(settings)
+        loadtest.run()
+        server.stop()
+        stats = loadtest.stats()
+
+        # one HEAD request per user opens its connection, without being recorded
+        assert methods.count("HEAD") == 3
+        assert list(stats["requests"]) == ["GET_/"]
+        assert stats["num_requests"] == methods.count("GET")
+
+    def test_unresolvable_host_logged(self):
+        server, host = start_target_server()
+        settings = create_settings(
+            classes=[
+                type("OtherUser", (WebsiteUser,), {"host": "http://host.invalid"})
+            ],
+            host=host,
+            num_users=1,
+            spawn_rate=1,
+            run_time="1s",
+            dns_cache=True,
+        )
+        loadtest = LocustLoadTest(settings)
+        loadtest.run()
+        server.stop()
+        stats = loadtest.stats()
+
+        assert stats["warmup"]["resolve_time"]["host.invalid"] is None
+        assert stats["num_requests"] > 0
+
+    def test_pending_warmup_cancelled_when_stopped_early(self):
+        server, host = start_target_server()
+        settings = create_settings(
+            classes=[WebsiteUser],
+            host=host,
+            num_users=2,
+            spawn_rate=2,
+            run_time="5s",
+            warmup_time=2,
+            memory_budget=1,
+        )
+        loadtest = LocustLoadTest(settings)
+        loadtest.run()
+        server.stop()
+        num_requests = loadtest.stats()["num_requests"]
+        gevent.sleep(2.5)
+
+        assert loadtest.stats()["memory"]["stopped_early"] is True
+        assert "end_time" not in loadtest.warmup_stats
+        assert loadtest.stats()["num_requests"] == num_requests